@@ -0,0 +1,111 @@
+import concurrent.futures
+import hash_algorithms
+
+# 常见种子值，会与用户给出的种子范围合并
+COMMON_SEEDS = (31, 33, 131, 1313, 13131, 131313, 5381, 65599)
+# 分隔符处理方式
+SEPARATOR_MODES = ('keep', 'backslash', 'slash')
+# 不使用种子的算法
+SEEDLESS_ALGOS = {'wdfpck_hash', 'CRC32Hash'}
+# 内部已统一大小写和分隔符的算法
+NORMALIZING_ALGOS = {'wdfpck_hash'}
+# 先用少量样本预筛，有命中的配置才跑全量
+PROBE_SIZE = 32
+# 每个任务包含的配置数
+CONFIGS_PER_TASK = 64
+
+def apply_separator(path, mode):
+    if mode == 'backslash':
+        return path.replace('/', '\\')
+    if mode == 'slash':
+        return path.replace('\\', '/')
+    return path
+
+def build_configs(algo_names=None, seeds=None):
+    """
+    展开 算法 × 大小写 × 分隔符 × 种子 的全部组合，
+    对不受某一维度影响的算法去掉重复组合。
+    返回 [(algo, case_sensitive, separator, seed)]。
+    """
+    algo_names = algo_names or hash_algorithms.get_algorithm_names()
+    seeds = list(dict.fromkeys(list(COMMON_SEEDS) + list(seeds or [])))
+    configs = []
+    for algo in algo_names:
+        cases = (False,) if algo in NORMALIZING_ALGOS else (False, True)
+        seps = ('keep',) if algo in NORMALIZING_ALGOS else SEPARATOR_MODES
+        algo_seeds = (None,) if algo in SEEDLESS_ALGOS else seeds
+        for case_sensitive in cases:
+            for sep in seps:
+                for seed in algo_seeds:
+                    configs.append((algo, case_sensitive, sep, seed))
+    return configs
+
+def count_hits(samples, config):
+    algo, case_sensitive, sep, seed = config
+    hits = 0
+    for path, target in samples:
+        if hash_algorithms.calc_hash(algo, apply_separator(path, sep), case_sensitive, seed) == target:
+            hits += 1
+    return hits
+
+def evaluate_configs(samples, configs):
+    """
+    评估一组配置（在子进程中执行），返回 [(config, 命中数)]。
+    先用前 PROBE_SIZE 条样本预筛，无命中的配置直接记0。
+    """
+    probe = samples[:PROBE_SIZE]
+    results = []
+    for config in configs:
+        hits = count_hits(probe, config)
+        if hits and len(samples) > len(probe):
+            hits = count_hits(samples, config)
+        results.append((config, hits))
+    return results
+
+def detect_algorithm(samples, seeds=None, algo_names=None, threshold=0.95, workers=None, on_progress=None):
+    """
+    从 (路径, 哈希) 样本中自动识别哈希算法、大小写、分隔符和种子。
+    并行扫描全部配置组合，某个配置命中率达到 threshold 后提前结束。
+    返回按命中率排序的结果列表 [{algo, case_sensitive, separator, seed, hits, total, rate}]。
+    """
+    samples = [(p, h) for p, h in samples if h is not None]
+    if not samples:
+        return []
+    configs = build_configs(algo_names, seeds)
+    tasks = [configs[i:i + CONFIGS_PER_TASK] for i in range(0, len(configs), CONFIGS_PER_TASK)]
+    results = []
+    done = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(evaluate_configs, samples, task) for task in tasks]
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                chunk = future.result()
+                results.extend(chunk)
+                done += len(chunk)
+                if on_progress:
+                    on_progress(done, len(configs))
+                if any(hits / len(samples) >= threshold for _, hits in chunk):
+                    break
+        finally:
+            # 提前结束时取消尚未开始的任务
+            for future in futures:
+                future.cancel()
+    table = []
+    for (algo, case_sensitive, sep, seed), hits in results:
+        if hits:
+            table.append({'algo': algo, 'case_sensitive': case_sensitive, 'separator': sep, 'seed': seed,
+                          'hits': hits, 'total': len(samples), 'rate': hits / len(samples)})
+    table.sort(key=lambda r: (-r['rate'], r['algo'], r['separator'], str(r['seed'])))
+    return table
+
+def format_table(table, limit=20):
+    """将识别结果格式化为文本表格"""
+    lines = [f"{'算法':<12}{'大小写':<8}{'分隔符':<11}{'种子':<10}{'命中':>12}{'命中率':>10}"]
+    for r in table[:limit]:
+        seed = '-' if r['seed'] is None else r['seed']
+        case = '区分' if r['case_sensitive'] else '不区分'
+        lines.append(f"{r['algo']:<12}{case:<8}{r['separator']:<11}{seed!s:<10}"
+                     f"{r['hits']:>6}/{r['total']:<5}{r['rate'] * 100:>9.2f}%")
+    if not table:
+        lines.append('无命中配置')
+    return '\n'.join(lines)
@@ -0,0 +1,70 @@
+import os
+import concurrent.futures
+import numpy as np
+import hash_algorithms
+
+# 非向量化算法样本数超过该值时分片交给多进程计算
+PARALLEL_MIN_SAMPLES = 50000
+HASH_CHUNK = 20000
+# 结果分块交给界面线程，每块的行数
+DEFAULT_CHUNK_ROWS = 2000
+
+def hash_paths(paths, algo_name, case_sensitive, seed, workers=None):
+    """批量计算路径哈希，返回 uint32 数组；逐条计算的算法在样本较多时分片多进程计算"""
+    if algo_name == 'wdfpck_hash' or len(paths) < PARALLEL_MIN_SAMPLES:
+        return np.asarray(hash_algorithms.calc_hash_batch(algo_name, paths, case_sensitive, seed), dtype=np.uint32)
+    chunks = [paths[i:i + HASH_CHUNK] for i in range(0, len(paths), HASH_CHUNK)]
+    workers = workers or os.cpu_count() or 1
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = pool.map(hash_algorithms.calc_hash_batch, [algo_name] * len(chunks), chunks,
+                         [case_sensitive] * len(chunks), [seed] * len(chunks))
+        return np.concatenate([np.asarray(p, dtype=np.uint32) for p in parts])
+
+class UidIndex:
+    """
+    WDF索引的uid有序表，只建一次，之后任意数量的uid一次 searchsorted 查完。
+    同一uid出现多次时取列表中最前面的一条。
+    """
+    def __init__(self, entries):
+        uids = np.fromiter((e['uid'] for e in entries), dtype=np.uint32, count=len(entries))
+        self.order = np.argsort(uids, kind='stable')
+        self.uids = uids[self.order]
+        self.entries = entries
+
+    def __len__(self):
+        return len(self.uids)
+
+    def lookup(self, uids):
+        """返回每个uid在 entries 中的下标，未命中为-1"""
+        uids = np.asarray(uids, dtype=np.uint32)
+        if not len(self.uids):
+            return np.full(len(uids), -1, dtype=np.int64)
+        pos = np.searchsorted(self.uids, uids)
+        pos[pos >= len(self.uids)] = 0
+        return np.where(self.uids[pos] == uids, self.order[pos], -1)
+
+def compare_samples(samples, entries, algo_name, case_sensitive, seed, index=None):
+    """
+    样本比对：全部样本一次批量哈希，再与WDF索引一次性连接。
+    samples: [(路径, 目标哈希或None)]，没有目标哈希的以计算结果为目标。
+    返回 (rows, uids, matched)：
+      rows 为界面行 (path, calc_hash, target_hash, match, wdf_uid, offset, size, space)，
+      uids 为计算出的哈希数组，matched 为命中目标哈希的样本数。
+    """
+    paths = [path for path, _ in samples]
+    uids = hash_paths(paths, algo_name, case_sensitive, seed)
+    targets = np.array([uid if target is None else target for (_, target), uid in zip(samples, uids.tolist())],
+                       dtype=np.uint64)
+    is_match = targets == uids
+    index = index or UidIndex(entries)
+    found = index.lookup(uids)
+    rows = []
+    for path, uid, target, match, i in zip(paths, uids.tolist(), targets.tolist(), is_match.tolist(), found.tolist()):
+        e = entries[i] if i >= 0 else None
+        rows.append((path, hex(uid), hex(target), '√' if match else '×', f'0x{uid:08X}',
+                     e['offset'] if e else '', e['size'] if e else '', e['space'] if e else ''))
+    return rows, uids, int(is_match.sum())
+
+def iter_chunks(rows, chunk_rows=DEFAULT_CHUNK_ROWS):
+    for start in range(0, len(rows), chunk_rows):
+        yield rows[start:start + chunk_rows]
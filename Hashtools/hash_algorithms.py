@@ -41,6 +41,227 @@ def wdfpck_hash(string, seed=None, case_sensitive=False):
     v = x ^ y
     return v & 0xFFFFFFFF
 
+# 批量哈希每次处理的行数，控制字矩阵的内存占用
+BATCH_CHUNK = 65536
+
+# wdfpck_hash 初始状态与结尾魔数
+WDFPCK_V0 = 0xF4FA8928
+WDFPCK_X0 = 0x37A8470E
+WDFPCK_Y0 = 0x7758B42B
+WDFPCK_TAIL = (0x9BE74448, 0x66F42C48)
+
+def wdfpck_adjust(string):
+    # 与 wdfpck_hash 相同的预处理：转小写、/转为\、utf-8编码
+    return string.lower().replace('/', '\\').encode('utf-8')
+
+def pack_words(encoded):
+    """
+    将一批已编码的字节串打包为补零的 uint32 字矩阵。
+    返回 (矩阵, 每行有效字数)，每行有效字数同标量版：遇到第一个全零字停止。
+    矩阵至少比最长行多留两列，用于放置结尾魔数。
+    """
+    import numpy as np
+    lens = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+    max_words = int((lens.max() + 3) // 4) if len(encoded) else 0
+    width = max_words + 2
+    flat = np.zeros(len(encoded) * width * 4, dtype=np.uint8)
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    if data.size:
+        # 每个字节的目标位置 = 行起点 + 行内偏移
+        starts = np.cumsum(lens) - lens
+        row_base = np.arange(len(encoded), dtype=np.int64) * (width * 4)
+        dest = np.repeat(row_base - starts, lens) + np.arange(data.size, dtype=np.int64)
+        flat[dest] = data
+    m = flat.view('<u4').reshape(len(encoded), width).astype(np.uint32)
+    # 第 max_words 列恒为0，argmax 必能找到停止位置
+    n_words = np.argmax(m[:, :max_words + 1] == 0, axis=1)
+    return m, n_words
+
+def wdfpck_rounds(m, n_words, x, y, v):
+    """
+    对字矩阵逐列执行 wdfpck_hash 轮运算（原地补结尾魔数），返回最终哈希数组。
+    x, y, v 为每行的起始状态（uint32 数组），支持从前缀快照继续计算。
+    """
+    import numpy as np
+    rows = np.arange(m.shape[0])
+    m[rows, n_words] = WDFPCK_TAIL[0]
+    m[rows, n_words + 1] = WDFPCK_TAIL[1]
+    x = x.copy()
+    y = y.copy()
+    v = v.copy()
+    for idx in range(m.shape[1]):
+        v = (v << np.uint32(1)) | (v >> np.uint32(31))  # rol v,1
+        ebx = np.uint32(0x267B0B11) ^ v
+        active = idx < n_words + 2
+        eax = np.where(active, m[:, idx], np.uint32(0))
+        x ^= eax
+        y_x = y ^ eax
+        edx2 = ((ebx + x) | np.uint32(0x804021)) & np.uint32(0x7DFEFBFF)
+        edx3 = edx2 * np.uint32(2)
+        eax2 = y_x * edx2 + edx3
+        eax2 += np.where(eax2 < edx3, np.uint32(2), np.uint32(0))
+        y = np.where(active, eax2, y)
+    return x ^ y
+
+def wdfpck_hash_batch(strings, seed=None, case_sensitive=False):
+    """
+    wdfpck_hash 的批量版本：一次性对整组路径做 rol/xor/乘法轮运算。
+    结果与逐条调用 wdfpck_hash 逐位一致，返回 numpy.uint32 数组。
+    """
+    import numpy as np
+    strings = list(strings)
+    result = np.empty(len(strings), dtype=np.uint32)
+    for start in range(0, len(strings), BATCH_CHUNK):
+        chunk = strings[start:start + BATCH_CHUNK]
+        m, n_words = pack_words([wdfpck_adjust(s)[:256] for s in chunk])
+        x = np.full(len(chunk), WDFPCK_X0, dtype=np.uint32)
+        y = np.full(len(chunk), WDFPCK_Y0, dtype=np.uint32)
+        v = np.full(len(chunk), WDFPCK_V0, dtype=np.uint32)
+        result[start:start + len(chunk)] = wdfpck_rounds(m, n_words, x, y, v)
+    return result
+
+class WdfpckHasher:
+    """
+    可续算的 wdfpck_hash：按4字节一组吸收路径，保存运行状态 (v, x, y)。
+    对4字节对齐的公共前缀做一次快照，即可从快照出发计算大量不同后缀，
+    只为不同的尾部付出代价。结果与 wdfpck_hash 逐位一致。
+    """
+    def __init__(self, prefix=''):
+        self.v = WDFPCK_V0
+        self.x = WDFPCK_X0
+        self.y = WDFPCK_Y0
+        self.words = 0          # 已吸收的字数（最多64个，即256字节）
+        self.stopped = False    # 遇到全零字后标量版停止读取
+        self.pending = b''      # 尚未凑满4字节的尾部
+        if prefix:
+            self.update(prefix)
+
+    def copy(self):
+        other = WdfpckHasher.__new__(WdfpckHasher)
+        other.v, other.x, other.y = self.v, self.x, self.y
+        other.words, other.stopped, other.pending = self.words, self.stopped, self.pending
+        return other
+
+    def snapshot(self):
+        # 快照即独立副本，之后对原对象的 update 不影响快照
+        return self.copy()
+
+    @property
+    def aligned(self):
+        return not self.pending
+
+    def round(self, word):
+        v = ((self.v << 1) | (self.v >> 31)) & 0xFFFFFFFF  # rol v,1
+        ebx = 0x267B0B11 ^ v
+        self.x ^= word
+        y = self.y ^ word
+        edx2 = ((ebx + self.x) | 0x804021) & 0x7DFEFBFF
+        edx3 = (edx2 * 2) & 0xFFFFFFFF
+        eax2 = (y * edx2 + edx3) & 0xFFFFFFFF
+        if eax2 < edx3:
+            eax2 = (eax2 + 2) & 0xFFFFFFFF
+        self.v = v
+        self.y = eax2
+
+    def feed_word(self, word):
+        if self.stopped or self.words >= 256 // 4:
+            return
+        if word == 0:
+            self.stopped = True
+            return
+        self.round(word)
+        self.words += 1
+
+    def update_bytes(self, data):
+        data = self.pending + data
+        aligned = len(data) - len(data) % 4
+        for i in range(0, aligned, 4):
+            self.feed_word(int.from_bytes(data[i:i+4], 'little'))
+        self.pending = data[aligned:]
+        return self
+
+    def update(self, string):
+        return self.update_bytes(wdfpck_adjust(string))
+
+    def digest(self):
+        h = self.copy()
+        if h.pending:
+            h.feed_word(int.from_bytes(h.pending.ljust(4, b'\0'), 'little'))
+        for word in WDFPCK_TAIL:
+            h.round(word)
+        return (h.x ^ h.y) & 0xFFFFFFFF
+
+    def finish(self, suffix=''):
+        """从当前状态续算一个后缀，返回完整路径的哈希（不修改自身）"""
+        return self.copy().update(suffix).digest()
+
+    def finish_batch(self, suffixes):
+        """从当前状态批量续算多个后缀，返回 numpy.uint32 数组"""
+        import numpy as np
+        suffixes = list(suffixes)
+        result = np.empty(len(suffixes), dtype=np.uint32)
+        if self.stopped or self.words >= 256 // 4:
+            result.fill(self.digest())
+            return result
+        budget = 256 - self.words * 4
+        for start in range(0, len(suffixes), BATCH_CHUNK):
+            chunk = suffixes[start:start + BATCH_CHUNK]
+            m, n_words = pack_words([(self.pending + wdfpck_adjust(s))[:budget] for s in chunk])
+            x = np.full(len(chunk), self.x, dtype=np.uint32)
+            y = np.full(len(chunk), self.y, dtype=np.uint32)
+            v = np.full(len(chunk), self.v, dtype=np.uint32)
+            result[start:start + len(chunk)] = wdfpck_rounds(m, n_words, x, y, v)
+        return result
+
+def prefix_key(data):
+    # 取到最后一个分隔符为止、向下对齐到4字节的前缀（不超过256字节）
+    end = min(data.rfind(b'\\') + 1, 256)
+    return data[:end - end % 4]
+
+def prefix_state(key, cache):
+    """
+    前缀树：取 key 对应的快照，不存在时从上一级目录的快照续算并缓存。
+    """
+    state = cache.get(key)
+    if state is None:
+        if key:
+            parent = prefix_key(key[:-1])
+            state = prefix_state(parent, cache).copy().update_bytes(key[len(parent):])
+        else:
+            state = WdfpckHasher()
+        cache[key] = state
+    return state
+
+def wdfpck_hash_prefixed(strings, cache=None):
+    """
+    前缀树驱动的批量 wdfpck_hash：按目录前缀自动复用快照，
+    每条路径只对前缀之后的尾部做向量化轮运算。
+    cache: 可选的 {前缀字节: WdfpckHasher} 字典，跨多次调用复用快照。
+    结果与 wdfpck_hash 逐位一致，返回 numpy.uint32 数组。
+    """
+    import numpy as np
+    if cache is None:
+        cache = {}
+    strings = list(strings)
+    result = np.empty(len(strings), dtype=np.uint32)
+    for start in range(0, len(strings), BATCH_CHUNK):
+        chunk = strings[start:start + BATCH_CHUNK]
+        states = []
+        tails = []
+        for s in chunk:
+            data = wdfpck_adjust(s)[:256]
+            key = prefix_key(data)
+            state = cache.get(key) or prefix_state(key, cache)
+            states.append(state)
+            # 已停止的快照不再吸收尾部，直接进入结尾魔数
+            tails.append(b'' if state.stopped else data[len(key):])
+        x = np.array([st.x for st in states], dtype=np.uint32)
+        y = np.array([st.y for st in states], dtype=np.uint32)
+        v = np.array([st.v for st in states], dtype=np.uint32)
+        m, n_words = pack_words(tails)
+        result[start:start + len(chunk)] = wdfpck_rounds(m, n_words, x, y, v)
+    return result
+
 def BKDRHash(string, seed=131, case_sensitive=False):
     if not case_sensitive:
         string = string.lower()
@@ -77,3 +298,14 @@ def calc_hash(algo_name, string, case_sensitive, seed):
         return DJBHash(string, seed, case_sensitive)
     else:
         raise ValueError(f'未知算法: {algo_name}')
+
+def calc_hash_batch(algo_name, strings, case_sensitive, seed):
+    """
+    批量计算哈希，返回 numpy.uint32 数组，顺序与 strings 一致。
+    wdfpck_hash 走向量化实现，其余算法逐条调用 calc_hash。
+    """
+    import numpy as np
+    if algo_name == 'wdfpck_hash':
+        return wdfpck_hash_batch(strings, None, case_sensitive)
+    values = [calc_hash(algo_name, s, case_sensitive, seed) for s in strings]
+    return np.array(values, dtype=np.uint32)
@@ -5,6 +5,13 @@ import hash_algorithms
 import utils
 import wdf_parser
 import wdf_exporter
+import name_index
+import algo_detect
+import wdf_extract
+import wdf_vfs
+import wdf_cache
+import compare_engine
+import virtual_grid
 
 class HashToolApp:
     def __init__(self, root):
@@ -13,6 +20,8 @@ class HashToolApp:
         self.root.geometry('1400x900')
         self.create_widgets()
         self.wdf_entries = []
+        self.index_dir = None
+        self.uid_index = None
 
     def create_widgets(self):
         # 样本输入区
@@ -24,6 +33,10 @@ class HashToolApp:
         btn_import.pack(side='right', padx=5)
         btn_import_wdf = ttk.Button(frame_input, text='导入WDF包', command=self.import_wdf)
         btn_import_wdf.pack(side='right', padx=5)
+        btn_import_wdf_dir = ttk.Button(frame_input, text='导入WDF目录', command=self.import_wdf_dir)
+        btn_import_wdf_dir.pack(side='right', padx=5)
+        btn_index_dir = ttk.Button(frame_input, text='名称索引目录', command=self.choose_index_dir)
+        btn_index_dir.pack(side='right', padx=5)
 
         # 算法选择区
         frame_algo = ttk.LabelFrame(self.root, text='2. 哈希算法选择区')
@@ -39,6 +52,16 @@ class HashToolApp:
         self.entry_seed = ttk.Entry(frame_algo, width=8)
         self.entry_seed.insert(0, '131')
         self.entry_seed.pack(side='left', padx=5)
+        ttk.Label(frame_algo, text='分隔符:').pack(side='left', padx=5)
+        self.combo_separator = ttk.Combobox(frame_algo, values=algo_detect.SEPARATOR_MODES, state='readonly', width=10)
+        self.combo_separator.current(0)
+        self.combo_separator.pack(side='left', padx=5)
+        ttk.Label(frame_algo, text='种子范围:').pack(side='left', padx=5)
+        self.entry_seed_range = ttk.Entry(frame_algo, width=12)
+        self.entry_seed_range.insert(0, '0-1000')
+        self.entry_seed_range.pack(side='left', padx=5)
+        btn_detect = ttk.Button(frame_algo, text='自动识别', command=self.start_detect)
+        btn_detect.pack(side='left', padx=5)
 
         # 操作区
         frame_ops = ttk.Frame(self.root)
@@ -62,11 +85,11 @@ class HashToolApp:
         frame_result.pack(side='left', fill='both', expand=True)
 
         columns = ('path', 'calc_hash', 'target_hash', 'match', 'wdf_uid', 'wdf_offset', 'wdf_size', 'wdf_space')
-        self.tree = ttk.Treeview(frame_result, columns=columns, show='headings', height=18)
-        for col, txt in zip(columns, ['路径/文件名', '算法结果', '目标哈希', '匹配', 'WDF_UID', '偏移', '大小', '空间']):
-            self.tree.heading(col, text=txt)
-            self.tree.column(col, width=120 if col!='path' else 180, anchor='center')
-        self.tree.pack(fill='both', expand=True)
+        titles = ['路径/文件名', '算法结果', '目标哈希', '匹配', 'WDF_UID', '偏移', '大小', '空间']
+        # 结果表只渲染可见的一屏，数据在 grid.model 中，排序/筛选/导出都直接用模型
+        self.grid = virtual_grid.VirtualGrid(frame_result, [(col, txt, 120 if col != 'path' else 180)
+                                                            for col, txt in zip(columns, titles)])
+        self.grid.pack(fill='both', expand=True)
         self.label_stats = ttk.Label(frame_result, text='命中率统计:')
         self.label_stats.pack(anchor='w', padx=5, pady=2)
 
@@ -97,12 +120,12 @@ class HashToolApp:
         filepath = filedialog.askopenfilename(filetypes=[('WDF Files', '*.wdf'), ('All Files', '*.*')])
         if filepath:
             try:
-                entries = wdf_parser.parse_wdf_index(filepath)
+                # 包未变化时直接用旁路缓存中的索引
+                with wdf_cache.WdfCache(filepath) as cache:
+                    entries = cache.to_dicts()
                 self.wdf_entries = entries
                 self.wdf_path = filepath
-                self.tree.delete(*self.tree.get_children())
-                for e in entries:
-                    self.tree.insert('', 'end', values=('', '', '', '', f'0x{e['uid']:08X}', e['offset'], e['size'], e['space']))
+                self.show_entries(entries)
                 self.label_stats.config(text=f'WDF资源数: {len(entries)}')
                 self.label_progress.config(text='WDF索引导入完成')
                 self.append_log(f"导入WDF包: {filepath}，共{len(entries)}条资源")
@@ -110,6 +133,51 @@ class HashToolApp:
                 messagebox.showerror('WDF解析失败', str(ex))
                 self.append_log(f"导入WDF包失败: {filepath}，错误: {ex}")
 
+    def import_wdf_dir(self):
+        # 挂载目录下全部WDF包，同一uid以后面的包为准（补丁包覆盖基础包）
+        dirpath = filedialog.askdirectory(title='选择WDF目录')
+        if dirpath:
+            try:
+                try:
+                    seed = int(self.entry_seed.get())
+                except ValueError:
+                    seed = None
+                with wdf_vfs.WdfNamespace.mount_dir(dirpath, algo_name=self.combo_algo.get(),
+                                                    case_sensitive=self.var_case.get(), seed=seed) as ns:
+                    entries = ns.to_dicts()
+                    count, shadowed = len(ns.archives), ns.shadowed
+                self.wdf_entries = entries
+                self.wdf_path = dirpath
+                self.show_entries(entries)
+                self.label_stats.config(text=f'WDF资源数: {len(entries)}（{count} 个包）')
+                self.label_progress.config(text='WDF索引导入完成')
+                self.append_log(f"导入WDF目录: {dirpath}，{count} 个包共{len(entries)}条资源，被覆盖 {shadowed} 条")
+            except Exception as ex:
+                messagebox.showerror('WDF解析失败', str(ex))
+                self.append_log(f"导入WDF目录失败: {dirpath}，错误: {ex}")
+
+    def show_entries(self, entries):
+        names = self.lookup_names([e['uid'] for e in entries])
+        self.grid.set_rows([(name or '', '', '', '', f"0x{e['uid']:08X}", e['offset'], e['size'], e['space'])
+                            for name, e in zip(names, entries)])
+
+    def choose_index_dir(self):
+        dirpath = filedialog.askdirectory(title='选择名称索引目录')
+        if dirpath:
+            self.index_dir = dirpath
+            self.append_log(f"名称索引目录: {dirpath}")
+
+    def lookup_names(self, uids):
+        # 用当前算法配置对应的反查索引找回名称，未设置索引目录时全部为空
+        if not self.index_dir:
+            return [None] * len(uids)
+        try:
+            seed = int(self.entry_seed.get())
+        except ValueError:
+            seed = None
+        with name_index.open_name_index(self.index_dir, self.combo_algo.get(), self.var_case.get(), seed) as index:
+            return index.lookup(uids)
+
     def export_wdf_index(self):
         if not self.wdf_entries:
             messagebox.showinfo('无WDF索引', '请先导入WDF包')
@@ -120,7 +188,10 @@ class HashToolApp:
             messagebox.showinfo('导出成功', f'已导出 {len(self.wdf_entries)} 条WDF索引')
 
     def start_compare(self):
-        samples = utils.parse_samples(self.text_samples.get('1.0', tk.END))
+        # 样本路径按所选分隔符处理后再哈希，与自动识别时的计算方式一致
+        separator = self.combo_separator.get()
+        samples = [(algo_detect.apply_separator(p, separator), h)
+                   for p, h in utils.parse_samples(self.text_samples.get('1.0', tk.END))]
         algo_name = self.combo_algo.get()
         case_sensitive = self.var_case.get()
         try:
@@ -131,48 +202,98 @@ class HashToolApp:
         self.progress['maximum'] = len(samples)
         self.progress['value'] = 0
         self.label_progress.config(text=f'已处理 0/{len(samples)} 条')
-        self.tree.delete(*self.tree.get_children())
-        self.append_log(f"开始比对: 样本数={len(samples)}，算法={algo_name}，区分大小写={case_sensitive}，种子={seed}")
+        self.grid.clear()
+        self.append_log(f"开始比对: 样本数={len(samples)}，算法={algo_name}，区分大小写={case_sensitive}，"
+                        f"分隔符={separator}，种子={seed}")
         threading.Thread(target=self.compare_thread, args=(samples, algo_name, case_sensitive, seed), daemon=True).start()
 
+    def start_detect(self):
+        samples = [(p, h) for p, h in utils.parse_samples(self.text_samples.get('1.0', tk.END)) if h is not None]
+        if not samples:
+            messagebox.showinfo('无样本', '自动识别需要带目标哈希的样本（路径,哈希）')
+            return
+        try:
+            lo, _, hi = self.entry_seed_range.get().partition('-')
+            seeds = range(int(lo), int(hi or lo) + 1)
+        except ValueError:
+            messagebox.showerror('参数错误', '种子范围格式应为 起始-结束')
+            return
+        self.progress['value'] = 0
+        self.label_progress.config(text='自动识别中...')
+        self.append_log(f"开始自动识别: 样本数={len(samples)}，种子范围={seeds.start}-{seeds.stop - 1}")
+        threading.Thread(target=self.detect_thread, args=(samples, seeds), daemon=True).start()
+
+    def detect_thread(self, samples, seeds):
+        def on_progress(done, total):
+            self.root.after(0, lambda: self.progress.configure(maximum=total, value=done))
+        try:
+            table = algo_detect.detect_algorithm(samples, seeds, on_progress=on_progress)
+        except Exception as ex:
+            self.root.after(0, self.detect_failed, ex)
+            return
+        self.root.after(0, self.show_detect_result, table)
+
+    def detect_failed(self, ex):
+        self.label_progress.config(text='自动识别失败')
+        self.append_log(f"自动识别失败: {ex}")
+
+    def show_detect_result(self, table):
+        self.append_log(algo_detect.format_table(table))
+        self.label_progress.config(text='自动识别完成')
+        if not table:
+            return
+        # 采用命中率最高的配置
+        best = table[0]
+        self.combo_algo.set(best['algo'])
+        self.var_case.set(best['case_sensitive'])
+        self.combo_separator.set(best['separator'])
+        if best['seed'] is not None:
+            self.entry_seed.delete(0, tk.END)
+            self.entry_seed.insert(0, str(best['seed']))
+        self.label_stats.config(text=f"自动识别: {best['algo']} 分隔符={best['separator']} 命中率 {best['rate'] * 100:.2f}%")
+
     def compare_thread(self, samples, algo_name, case_sensitive, seed):
-        matched = 0
-        for idx, (path, target_hash) in enumerate(samples):
-            # 如果没有目标哈希，自动用算法计算
-            if target_hash is None:
-                target_hash = hash_algorithms.calc_hash(algo_name, path, case_sensitive, seed)
-            calc_hash = hash_algorithms.calc_hash(algo_name, path, case_sensitive, seed)
-            is_match = (calc_hash == target_hash)
-            # 查找WDF索引中是否有该uid
-            wdf_info = next((e for e in self.wdf_entries if e['uid'] == calc_hash), None)
-            wdf_uid = f'0x{calc_hash:08X}'
-            wdf_offset = wdf_info['offset'] if wdf_info else ''
-            wdf_size = wdf_info['size'] if wdf_info else ''
-            wdf_space = wdf_info['space'] if wdf_info else ''
-            self.tree.insert('', 'end', values=(path, hex(calc_hash), hex(target_hash), '√' if is_match else '×', wdf_uid, wdf_offset, wdf_size, wdf_space))
-            if is_match:
-                matched += 1
-            self.progress['value'] = idx + 1
-            self.label_progress.config(text=f'已处理 {idx+1}/{len(samples)} 条')
-            self.root.update_idletasks()
-        rate = matched / len(samples) * 100 if samples else 0
-        self.label_stats.config(text=f'命中率统计: {matched}/{len(samples)} ({rate:.2f}%)')
+        # 全部样本一次批量哈希，与只建一次的uid有序表一次性连接，结果分块交给界面线程
+        try:
+            if self.uid_index is None or self.uid_index.entries is not self.wdf_entries:
+                self.uid_index = compare_engine.UidIndex(self.wdf_entries)
+            rows, uids, matched = compare_engine.compare_samples(
+                samples, self.wdf_entries, algo_name, case_sensitive, seed, self.uid_index)
+        except Exception as ex:
+            self.root.after(0, self.append_log, f"比对失败: {ex}")
+            return
+        done = 0
+        for chunk in compare_engine.iter_chunks(rows):
+            done += len(chunk)
+            self.root.after(0, self.show_compare_chunk, chunk, done, len(samples))
+        self.root.after(0, self.finish_compare, matched, len(samples))
+        if self.index_dir and samples:
+            added = name_index.update_name_index(self.index_dir, [p for p, _ in samples], algo_name, case_sensitive, seed, uids)
+            self.root.after(0, self.append_log, f"名称索引新增 {added} 条")
+
+    def show_compare_chunk(self, chunk, done, total):
+        self.grid.extend(chunk)
+        self.progress['value'] = done
+        self.label_progress.config(text=f'已处理 {done}/{total} 条')
+
+    def finish_compare(self, matched, total):
+        rate = matched / total * 100 if total else 0
+        self.label_stats.config(text=f'命中率统计: {matched}/{total} ({rate:.2f}%)')
         self.label_progress.config(text='比对完成')
-        self.append_log(f"比对完成: 命中{matched}/{len(samples)} ({rate:.2f}%)")
+        self.append_log(f"比对完成: 命中{matched}/{total} ({rate:.2f}%)")
 
     def clear_results(self):
-        self.tree.delete(*self.tree.get_children())
+        self.grid.clear()
         self.label_stats.config(text='命中率统计:')
         self.progress['value'] = 0
         self.label_progress.config(text='未开始')
         self.wdf_entries = []
 
     def export_unmatched(self):
-        unmatched = []
-        for item in self.tree.get_children():
-            vals = self.tree.item(item, 'values')
-            if vals[3] == '×':
-                unmatched.append(f'{vals[0]},{vals[2]}')
+        # 直接取模型中的整列数据（不受当前筛选影响）
+        model = self.grid.model
+        unmatched = [f'{path},{target}' for path, target, match in
+                     zip(model.column('path'), model.column('target_hash'), model.column('match')) if match == '×']
         if unmatched:
             filepath = filedialog.asksaveasfilename(defaultextension='.txt', filetypes=[('Text Files', '*.txt')])
             if filepath:
@@ -200,9 +321,10 @@ class HashToolApp:
             return
         try:
             self.append_log(f"开始导出资源到: {out_dir}")
-            wdf_exporter.export_by_lst(self.wdf_path, self.lst_path, out_dir, algo_name, case_sensitive, seed)
+            stats = wdf_exporter.export_by_lst(self.wdf_path, self.lst_path, out_dir, algo_name, case_sensitive, seed, self.index_dir)
             messagebox.showinfo('导出完成', f'资源导出已完成！')
             self.append_log(f"导出完成: 资源已导出到 {out_dir}")
+            self.append_log(wdf_extract.format_stats(stats))
         except Exception as ex:
             messagebox.showerror('导出失败', str(ex))
             self.append_log(f"导出失败: {ex}")
@@ -0,0 +1,178 @@
+import os
+import mmap
+import struct
+import numpy as np
+from hash_algorithms import calc_hash_batch
+
+# 反查索引文件格式：
+#   文件头(64字节) + 名称字节区(blob) + 对齐 + uid表(u4) + 起点表(u8) + 长度表(u4)
+#   uid表按升序排列，同一uid可对应多个名称（相邻多行）
+#   名称只追加不移动，合并新名称时旧的字节区原样保留
+INDEX_MAGIC = b'UIDX'
+INDEX_VERSION = 1
+INDEX_HEADER_FMT = '<4sHHqIIQ32s'  # magic, version, case, seed, count, 保留, blob_size, algo
+INDEX_HEADER_SIZE = struct.calcsize(INDEX_HEADER_FMT)
+
+def index_file_name(algo_name, case_sensitive, seed):
+    """
+    每种算法/大小写模式/种子各用一个索引文件。
+    wdfpck_hash 不使用种子，统一记为0。
+    """
+    if algo_name == 'wdfpck_hash' or seed is None:
+        seed = 0
+    case_tag = 'cs' if case_sensitive else 'ci'
+    return f'{algo_name}_{case_tag}_{seed}.uidx'
+
+class NameIndex:
+    """
+    持久化的 uid→路径 反查索引，以 mmap 方式只读打开。
+    整个WDF索引的反查只需一次向量化 searchsorted。
+    """
+    def __init__(self, path, algo_name='wdfpck_hash', case_sensitive=False, seed=0):
+        self.path = path
+        self.algo_name = algo_name
+        self.case_sensitive = case_sensitive
+        self.seed = seed or 0
+        self._file = None
+        self._mm = None
+        self.blob = b''
+        self.uids = np.empty(0, dtype=np.uint32)
+        self.starts = np.empty(0, dtype=np.uint64)
+        self.lens = np.empty(0, dtype=np.uint32)
+        if os.path.isfile(path):
+            self.load()
+
+    def __len__(self):
+        return len(self.uids)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def load(self):
+        self.close()
+        self._file = open(self.path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, case_flag, seed, count, _, blob_size, algo = struct.unpack_from(INDEX_HEADER_FMT, self._mm, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self.close()
+            raise ValueError(f'不是有效的反查索引文件: {self.path}')
+        self.algo_name = algo.rstrip(b'\0').decode('utf-8')
+        self.case_sensitive = bool(case_flag)
+        self.seed = seed
+        self.blob = memoryview(self._mm)[INDEX_HEADER_SIZE:INDEX_HEADER_SIZE + blob_size]
+        table = (INDEX_HEADER_SIZE + blob_size + 7) // 8 * 8
+        self.starts = np.frombuffer(self._mm, dtype='<u8', count=count, offset=table)
+        self.uids = np.frombuffer(self._mm, dtype='<u4', count=count, offset=table + count * 8)
+        self.lens = np.frombuffer(self._mm, dtype='<u4', count=count, offset=table + count * 12)
+
+    def close(self):
+        # 先释放所有指向 mmap 的视图，再关闭映射
+        self.blob = b''
+        self.uids = np.empty(0, dtype=np.uint32)
+        self.starts = np.empty(0, dtype=np.uint64)
+        self.lens = np.empty(0, dtype=np.uint32)
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def name_at(self, row):
+        start = int(self.starts[row])
+        return bytes(self.blob[start:start + int(self.lens[row])]).decode('utf-8')
+
+    def names_of(self, uid):
+        """返回某个uid对应的全部已知名称"""
+        left = np.searchsorted(self.uids, uid, side='left')
+        right = np.searchsorted(self.uids, uid, side='right')
+        return [self.name_at(row) for row in range(left, right)]
+
+    def lookup_rows(self, uids):
+        """
+        批量反查，返回每个uid在索引中的首行号，未命中为-1。
+        """
+        uids = np.asarray(uids, dtype=np.uint32)
+        rows = np.searchsorted(self.uids, uids, side='left')
+        found = rows < len(self.uids)
+        found[found] = self.uids[rows[found]] == uids[found]
+        return np.where(found, rows, -1)
+
+    def lookup(self, uids):
+        """
+        批量反查，返回与 uids 等长的名称列表，未命中为 None（多名称时取第一个）。
+        """
+        return [self.name_at(row) if row >= 0 else None for row in self.lookup_rows(uids).tolist()]
+
+    def merge(self, paths, uids):
+        """
+        增量合并新名称：已有名称不重复写入，旧字节区原样保留，
+        新行按uid有序插入。返回新增的名称数。
+        """
+        uids = np.asarray(uids, dtype=np.uint32)
+        # 批内去重，并剔除索引中已存在的 (uid, 路径)
+        seen = set()
+        new_paths = []
+        new_uids = []
+        left = np.searchsorted(self.uids, uids, side='left').tolist()
+        right = np.searchsorted(self.uids, uids, side='right').tolist()
+        for path, uid, lo, hi in zip(paths, uids.tolist(), left, right):
+            if (uid, path) in seen:
+                continue
+            seen.add((uid, path))
+            if lo < hi and path in (self.name_at(row) for row in range(lo, hi)):
+                continue
+            new_paths.append(path)
+            new_uids.append(uid)
+        if not new_paths:
+            return 0
+        encoded = [p.encode('utf-8') for p in new_paths]
+        add_uids = np.array(new_uids, dtype=np.uint32)
+        add_lens = np.array([len(b) for b in encoded], dtype=np.uint32)
+        add_starts = len(self.blob) + np.cumsum(add_lens, dtype=np.uint64) - add_lens
+        order = np.argsort(add_uids, kind='stable')
+        add_uids, add_starts, add_lens = add_uids[order], add_starts[order], add_lens[order]
+        # 有序插入：新行放在相同uid的旧行之后
+        pos = np.searchsorted(self.uids, add_uids, side='right')
+        uids_out = np.insert(self.uids, pos, add_uids)
+        starts_out = np.insert(self.starts, pos, add_starts)
+        lens_out = np.insert(self.lens, pos, add_lens)
+        self.write(uids_out, starts_out, lens_out, encoded)
+        return len(new_paths)
+
+    def write(self, uids, starts, lens, extra_blob):
+        # 写入临时文件后整体替换，中途失败不会损坏原索引
+        tmp_path = self.path + '.tmp'
+        blob_size = len(self.blob) + sum(len(b) for b in extra_blob)
+        algo = self.algo_name.encode('utf-8')[:32]
+        with open(tmp_path, 'wb') as f:
+            f.write(struct.pack(INDEX_HEADER_FMT, INDEX_MAGIC, INDEX_VERSION, int(self.case_sensitive),
+                                self.seed, len(uids), 0, blob_size, algo))
+            f.write(self.blob)
+            f.writelines(extra_blob)
+            f.write(b'\0' * (-(INDEX_HEADER_SIZE + blob_size) % 8))
+            f.write(starts.astype('<u8').tobytes())
+            f.write(uids.astype('<u4').tobytes())
+            f.write(lens.astype('<u4').tobytes())
+        self.close()
+        os.replace(tmp_path, self.path)
+        self.load()
+
+def open_name_index(index_dir, algo_name, case_sensitive, seed):
+    """打开（或新建）某个算法配置对应的反查索引"""
+    os.makedirs(index_dir, exist_ok=True)
+    path = os.path.join(index_dir, index_file_name(algo_name, case_sensitive, seed))
+    return NameIndex(path, algo_name, case_sensitive, seed)
+
+def update_name_index(index_dir, paths, algo_name, case_sensitive=False, seed=None, uids=None):
+    """
+    将一批路径合并进反查索引。已算好的哈希可通过 uids 传入，避免重复计算。
+    返回新增的名称数。
+    """
+    if uids is None:
+        uids = calc_hash_batch(algo_name, paths, case_sensitive, seed)
+    with open_name_index(index_dir, algo_name, case_sensitive, seed) as index:
+        return index.merge(paths, uids)
@@ -0,0 +1,288 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import concurrent.futures
+import numpy as np
+from hash_algorithms import calc_hash_batch, WdfpckHasher
+from wdf_parser import parse_wdf_index
+from name_index import open_name_index
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COMMON_NAMES_FILE = os.path.join(ROOT_DIR, '通用文件名.txt')
+# 每个分片的候选数，也是断点续跑的最小粒度
+SHARD_SIZE = 200000
+
+def number_range(start, stop, width=0):
+    """生成数字段候选，如 number_range(0, 100, 2) -> '00'..'99'"""
+    return [str(n).zfill(width) for n in range(start, stop)]
+
+def unique(items):
+    # 去重并保持顺序
+    return list(dict.fromkeys(items))
+
+class NameGrammar:
+    """
+    候选路径文法：目录前缀 × 文件名主干 × 数字段 × 后缀名。
+    候选总数为四者数量之积，第 i 个候选按混合进制展开（后缀名变化最快），
+    因此任意区间 [start, stop) 都可以独立生成，便于分片与断点续跑。
+    """
+    def __init__(self, prefixes, stems, numbers=None, exts=None):
+        self.prefixes = unique(prefixes)
+        self.stems = unique(stems)
+        self.numbers = unique(numbers) if numbers else ['']
+        self.exts = unique(exts) if exts else ['']
+
+    def __len__(self):
+        return len(self.prefixes) * len(self.stems) * len(self.numbers) * len(self.exts)
+
+    def to_dict(self):
+        return {'prefixes': self.prefixes, 'stems': self.stems, 'numbers': self.numbers, 'exts': self.exts}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['prefixes'], d['stems'], d['numbers'], d['exts'])
+
+    def candidates(self, start, stop):
+        """
+        生成 [start, stop) 范围内的候选，按前缀分组返回 [(前缀, [后缀...])]，
+        同一前缀下的候选可从一次前缀快照续算哈希。
+        """
+        stems, numbers, exts = self.stems, self.numbers, self.exts
+        per_prefix = len(stems) * len(numbers) * len(exts)
+        per_stem = len(numbers) * len(exts)
+        groups = []
+        if per_prefix == 0:
+            return groups
+        for p in range(start // per_prefix, (stop - 1) // per_prefix + 1):
+            base = p * per_prefix
+            lo = max(start, base) - base
+            hi = min(stop, base + per_prefix) - base
+            suffixes = [
+                stems[k // per_stem] + numbers[(k // len(exts)) % len(numbers)] + exts[k % len(exts)]
+                for k in range(lo, hi)
+            ]
+            groups.append((self.prefixes[p], suffixes))
+        return groups
+
+def load_common_exts(path=COMMON_NAMES_FILE):
+    """读取 通用文件名.txt 中的后缀名列表"""
+    if not os.path.isfile(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip().startswith('.')]
+
+def default_grammar(stems, numbers=None, prefixes=None, exts=None):
+    """
+    以 ui_path_scanner 的 PREFIXES/COMMON_EXTS 和 通用文件名.txt 为种子构造文法，
+    显式传入的 prefixes/exts 会追加在种子之后。
+    """
+    if ROOT_DIR not in sys.path:
+        sys.path.append(ROOT_DIR)
+    import ui_path_scanner
+    seed_prefixes = list(ui_path_scanner.PREFIXES) + list(prefixes or [])
+    seed_exts = list(ui_path_scanner.COMMON_EXTS) + load_common_exts() + list(exts or [])
+    return NameGrammar(seed_prefixes, stems, numbers, seed_exts)
+
+def load_unmatched_uids(wdf_path, algo_name, case_sensitive=False, seed=None, index_dir=None, known_paths=None):
+    """
+    取WDF中尚未找回名称的uid（升序 uint32 数组）。
+    已知名称来自反查索引目录 index_dir 和/或路径列表 known_paths。
+    """
+    uids = np.unique(np.array([e['uid'] for e in parse_wdf_index(wdf_path)], dtype=np.uint32))
+    if index_dir:
+        with open_name_index(index_dir, algo_name, case_sensitive, seed) as index:
+            uids = uids[index.lookup_rows(uids) < 0]
+    if known_paths:
+        known = calc_hash_batch(algo_name, known_paths, case_sensitive, seed)
+        uids = uids[~np.isin(uids, known)]
+    return uids
+
+# ---- 进程池工作函数（通过 initializer 在每个子进程中只传一次文法与目标集合）----
+_worker = {}
+
+def init_worker(grammar_dict, algo_name, case_sensitive, seed, targets):
+    _worker['grammar'] = NameGrammar.from_dict(grammar_dict)
+    _worker['algo'] = (algo_name, case_sensitive, seed)
+    _worker['targets'] = targets
+
+def scan_shard(shard_id, start, stop):
+    """哈希一个分片内的全部候选，返回 (分片号, 候选数, [(路径, uid)...])"""
+    grammar = _worker['grammar']
+    algo_name, case_sensitive, seed = _worker['algo']
+    targets = _worker['targets']
+    hits = []
+    for prefix, suffixes in grammar.candidates(start, stop):
+        if algo_name == 'wdfpck_hash':
+            hashes = WdfpckHasher(prefix).finish_batch(suffixes)
+        else:
+            hashes = calc_hash_batch(algo_name, [prefix + s for s in suffixes], case_sensitive, seed)
+        pos = np.searchsorted(targets, hashes)
+        pos[pos >= len(targets)] = 0
+        for row in np.nonzero(targets[pos] == hashes)[0].tolist():
+            hits.append((prefix + suffixes[row], int(hashes[row])))
+    return shard_id, stop - start, hits
+
+class RecoveryCheckpoint:
+    """
+    断点文件：记录最低未完成分片号与其后已完成的分片号。
+    指纹不一致（文法、算法或目标集合变化）时视为新任务。
+    """
+    def __init__(self, path, fingerprint):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.next_shard = 0
+        self.done_ahead = set()
+        self.hits = 0
+        if path and os.path.isfile(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('fingerprint') == fingerprint:
+                self.next_shard = data['next_shard']
+                self.done_ahead = set(data['done_ahead'])
+                self.hits = data.get('hits', 0)
+
+    def is_done(self, shard_id):
+        return shard_id < self.next_shard or shard_id in self.done_ahead
+
+    def mark_done(self, shard_id):
+        self.done_ahead.add(shard_id)
+        while self.next_shard in self.done_ahead:
+            self.done_ahead.discard(self.next_shard)
+            self.next_shard += 1
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'fingerprint': self.fingerprint, 'next_shard': self.next_shard,
+                       'done_ahead': sorted(self.done_ahead), 'hits': self.hits}, f)
+        os.replace(tmp_path, self.path)
+
+def recovery_fingerprint(grammar, algo_name, case_sensitive, seed, targets, shard_size):
+    h = hashlib.sha1()
+    h.update(json.dumps([grammar.to_dict(), algo_name, bool(case_sensitive), seed, shard_size],
+                        ensure_ascii=False).encode('utf-8'))
+    h.update(np.ascontiguousarray(targets, dtype='<u4').tobytes())
+    return h.hexdigest()
+
+def recover_names(
+    targets, grammar, algo_name='wdfpck_hash', case_sensitive=False, seed=None,
+    workers=None, shard_size=SHARD_SIZE, checkpoint_path=None,
+    on_hit=None, on_progress=None, should_stop=None
+):
+    """
+    多进程组合枚举候选路径，找回未命名uid的名称。
+    targets: 待找回的uid集合
+    on_hit(path, uid): 每找到一个命中立即回调（流式输出）
+    on_progress(done, total, rate): 每完成一个分片回调，rate 为候选数/秒
+    should_stop(): 返回 True 时在当前分片完成后停止，进度保留在断点文件中
+    返回本次运行找到的 [(路径, uid)]。
+    """
+    targets = np.unique(np.asarray(targets, dtype=np.uint32))
+    total = len(grammar)
+    shard_count = (total + shard_size - 1) // shard_size
+    checkpoint = RecoveryCheckpoint(
+        checkpoint_path, recovery_fingerprint(grammar, algo_name, case_sensitive, seed, targets, shard_size))
+    pending = (s for s in range(shard_count) if not checkpoint.is_done(s))
+    done = sum(min(shard_size, total - s * shard_size) for s in range(shard_count) if checkpoint.is_done(s))
+    found = []
+    if not len(targets) or done >= total:
+        return found
+    workers = workers or os.cpu_count() or 1
+    start_time = time.time()
+    scanned = 0
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=init_worker,
+        initargs=(grammar.to_dict(), algo_name, case_sensitive, seed, targets)
+    ) as executor:
+        running = set()
+        stopping = False
+        while True:
+            # 在途分片数限制为进程数的两倍，避免一次性提交全部分片
+            while not stopping and len(running) < workers * 2:
+                shard_id = next(pending, None)
+                if shard_id is None:
+                    break
+                start = shard_id * shard_size
+                running.add(executor.submit(scan_shard, shard_id, start, min(start + shard_size, total)))
+            if not running:
+                break
+            finished, running = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                shard_id, count, hits = future.result()
+                for path, uid in hits:
+                    found.append((path, uid))
+                    if on_hit:
+                        on_hit(path, uid)
+                checkpoint.hits += len(hits)
+                checkpoint.mark_done(shard_id)
+                checkpoint.save()
+                done += count
+                scanned += count
+                if on_progress:
+                    elapsed = time.time() - start_time
+                    on_progress(done, total, scanned / elapsed if elapsed > 0 else 0)
+            if should_stop and should_stop():
+                stopping = True
+    return found
+
+def read_lines(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+def main():
+    parser = argparse.ArgumentParser(description='组合枚举找回WDF中未命名的资源名称')
+    parser.add_argument('wdf', help='WDF包路径')
+    parser.add_argument('--stems', required=True, help='文件名主干列表文件（每行一个）')
+    parser.add_argument('--prefixes', help='追加的目录前缀列表文件')
+    parser.add_argument('--exts', help='追加的后缀名列表文件')
+    parser.add_argument('--range', default='', help='数字段，如 0-99 或 0-99:2（补零宽度）')
+    parser.add_argument('--lst', help='已知名称的lst文件，其命中的uid不再枚举')
+    parser.add_argument('--index-dir', help='反查索引目录，命中结果会合并进索引')
+    parser.add_argument('--algo', default='wdfpck_hash')
+    parser.add_argument('--case-sensitive', action='store_true')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE)
+    parser.add_argument('--checkpoint', help='断点文件路径')
+    parser.add_argument('--out', help='命中结果输出文件（path,0xUID，追加写入）')
+    args = parser.parse_args()
+
+    numbers = None
+    if args.range:
+        span, _, width = args.range.partition(':')
+        lo, _, hi = span.partition('-')
+        numbers = number_range(int(lo), int(hi) + 1, int(width or 0))
+    grammar = default_grammar(
+        read_lines(args.stems), numbers,
+        read_lines(args.prefixes) if args.prefixes else None,
+        read_lines(args.exts) if args.exts else None)
+    known = read_lines(args.lst) if args.lst else None
+    targets = load_unmatched_uids(args.wdf, args.algo, args.case_sensitive, args.seed, args.index_dir, known)
+    print(f'未命名uid: {len(targets)}，候选总数: {len(grammar)}')
+
+    out_f = open(args.out, 'a', encoding='utf-8') if args.out else None
+    def on_hit(path, uid):
+        print(f'命中: {path} -> 0x{uid:08X}')
+        if out_f:
+            out_f.write(f'{path},0x{uid:08X}\n')
+            out_f.flush()
+    def on_progress(done, total, rate):
+        print(f'进度: {done}/{total} ({done * 100 / total:.1f}%)  速度: {rate:,.0f} 候选/秒')
+    try:
+        hits = recover_names(targets, grammar, args.algo, args.case_sensitive, args.seed,
+                             args.workers, args.shard_size, args.checkpoint, on_hit, on_progress)
+    finally:
+        if out_f:
+            out_f.close()
+    if args.index_dir and hits:
+        with open_name_index(args.index_dir, args.algo, args.case_sensitive, args.seed) as index:
+            index.merge([p for p, _ in hits], [u for _, u in hits])
+    print(f'完成，本次命中 {len(hits)} 条')
+
+if __name__ == '__main__':
+    main()
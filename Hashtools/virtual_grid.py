@@ -0,0 +1,338 @@
+import csv
+import tkinter as tk
+from tkinter import ttk, font as tkfont
+import numpy as np
+
+# Treeview 最小行高（像素），样式未指定 rowheight 时按字体行距推算
+ROW_HEIGHT = 20
+
+class GridModel:
+    """
+    按列存放的表格数据：每列一个 Python 列表，另有一个行号数组 view 表示当前筛选/排序后的可见顺序。
+    排序和筛选只改 view，不移动数据；排序/筛选用的键在首次使用时生成并缓存，追加行时增量补齐。
+    只应在界面线程中修改。
+    """
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.data = {c: [] for c in self.columns}
+        self.view = np.empty(0, dtype=np.int64)
+        self.filtered = False
+        self.sort_key = None  # (列名, 是否降序)
+        self._filter = None   # (列名, 文本) 或 (None, 布尔数组)
+        self._keys = {}
+
+    def __len__(self):
+        return len(self.view)
+
+    @property
+    def total(self):
+        return len(self.data[self.columns[0]]) if self.columns else 0
+
+    def set_columns(self, columns):
+        self.columns = list(columns)
+        self.clear()
+
+    def clear(self):
+        self.data = {c: [] for c in self.columns}
+        self.view = np.empty(0, dtype=np.int64)
+        self.filtered = False
+        self.sort_key = None
+        self._filter = None
+        self._keys = {}
+
+    def set_rows(self, rows):
+        """用行元组列表替换全部数据"""
+        self.clear()
+        self.extend(rows)
+
+    def extend(self, rows):
+        """追加行：新行按当前筛选条件过滤，有排序时归并到可见顺序中"""
+        if not rows:
+            return
+        start = self.total
+        for k, c in enumerate(self.columns):
+            self.data[c].extend([r[k] for r in rows])
+        resort = self._extend_keys(start)
+        new = np.arange(start, self.total, dtype=np.int64)
+        if self._filter:
+            new = new[self.match(start)]
+        if resort:
+            # 数值列中出现了文本，整列改按文本排序
+            self.view = np.concatenate([self.view, new])
+            self.sort(*self.sort_key)
+        elif self.sort_key:
+            self.view = self.merge_sorted(new)
+        else:
+            self.view = np.concatenate([self.view, new])
+
+    def _extend_keys(self, start):
+        """把已缓存的排序/筛选键补齐到新行，返回是否需要整体重排"""
+        resort = False
+        for name in list(self._keys):
+            if isinstance(name, tuple):
+                self._keys[name].extend(str(v).lower() for v in self.data[name[1]][start:])
+                continue
+            key = self._keys[name]
+            part = self.make_key(self.data[name][start:], key.dtype == np.float64)
+            if part is None:
+                del self._keys[name]
+                resort = resort or (self.sort_key is not None and self.sort_key[0] == name)
+            else:
+                self._keys[name] = np.concatenate([key, part])
+        return resort
+
+    def merge_sorted(self, rows):
+        """
+        把新行按当前排序插入可见顺序，结果与整体重排相同：
+        升序时相同键的行按行号先后，降序时整体反转。
+        """
+        name, descending = self.sort_key
+        key = self.sort_array(name)
+        view = self.view[::-1] if descending else self.view
+        rows = rows[np.argsort(key[rows], kind='stable')]
+        # 新行的行号都更大，相同键时排在已有行之后
+        merged = np.insert(view, np.searchsorted(key[view], key[rows], side='right'), rows)
+        return merged[::-1].copy() if descending else merged
+
+    def column(self, name):
+        """整列数据（全部行，不受筛选影响）"""
+        return self.data[name]
+
+    def row(self, i):
+        """可见顺序中第 i 行"""
+        r = int(self.view[i])
+        return tuple(self.data[c][r] for c in self.columns)
+
+    def rows(self, start=0, stop=None):
+        return [self.row(i) for i in range(start, min(len(self.view), stop if stop is not None else len(self.view)))]
+
+    @staticmethod
+    def make_key(values, numeric):
+        # 数值键为 float64 数组（空值按0），文本键为 object 数组，不按最长文本分配定长内存；
+        # numeric=True 但含有无法转换的值时返回 None
+        if numeric:
+            try:
+                return np.array([0 if v == '' or v is None else v for v in values], dtype=np.float64)
+            except (TypeError, ValueError):
+                return None
+        key = np.empty(len(values), dtype=object)
+        key[:] = [str(v) for v in values]
+        return key
+
+    def sort_array(self, name):
+        # 全部为数字（空值按0）时按数值排序，否则按文本排序
+        if name not in self._keys:
+            values = self.data[name]
+            key = self.make_key(values, True)
+            self._keys[name] = key if key is not None else self.make_key(values, False)
+        return self._keys[name]
+
+    def text_list(self, name):
+        lower_name = ('lower', name)
+        if lower_name not in self._keys:
+            self._keys[lower_name] = [str(v).lower() for v in self.data[name]]
+        return self._keys[lower_name]
+
+    def sort(self, name, descending=False):
+        key = self.sort_array(name)[self.view]
+        order = np.argsort(key, kind='stable')
+        self.view = self.view[order[::-1]] if descending else self.view[order]
+        self.sort_key = (name, descending)
+
+    def match(self, start=0):
+        """当前筛选条件在第 start 行及以后各行上的布尔数组"""
+        name, arg = self._filter
+        if name is None:
+            # 筛选数组之外的新行视为不匹配
+            mask = np.zeros(self.total - start, dtype=bool)
+            part = arg[start:]
+            mask[:len(part)] = part
+            return mask
+        text = arg.lower()
+        texts = self.text_list(name)
+        return np.fromiter((text in s for s in texts[start:]), dtype=bool, count=len(texts) - start)
+
+    def filter(self, name, text):
+        """只保留该列包含 text（不区分大小写）的行；text 为空时取消筛选"""
+        if not text:
+            self.reset_view()
+            return
+        self._filter = (name, text)
+        self.apply_filter()
+
+    def filter_mask(self, mask):
+        """按全部行上的布尔数组筛选，保持当前排序"""
+        self._filter = (None, np.asarray(mask, dtype=bool))
+        self.apply_filter()
+
+    def apply_filter(self):
+        condition = self._filter
+        self.reset_view()
+        self._filter = condition
+        self.view = self.view[self.match()[self.view]]
+        self.filtered = True
+
+    def reset_view(self):
+        """取消筛选，保持当前排序"""
+        self.view = np.arange(self.total, dtype=np.int64)
+        self.filtered = False
+        self._filter = None
+        if self.sort_key:
+            self.sort(*self.sort_key)
+
+    def iter_rows(self, visible_only=True):
+        if visible_only:
+            for i in range(len(self.view)):
+                yield self.row(i)
+        else:
+            yield from zip(*(self.data[c] for c in self.columns))
+
+    def export_csv(self, path, headers=None, visible_only=True, encoding='utf-8-sig'):
+        with open(path, 'w', newline='', encoding=encoding) as f:
+            writer = csv.writer(f)
+            writer.writerow(headers or self.columns)
+            writer.writerows(self.iter_rows(visible_only))
+
+class VirtualGrid(ttk.Frame):
+    """
+    虚拟表格：Treeview 中只保留一屏的行，滚动时改写这些行的内容，
+    数据全部在 GridModel 中，行数再多插入和滚动的开销都不变。
+    columns: [(列名, 标题, 宽度)]；点击表头按该列排序（再次点击反向）；
+    filter_bar=True 时在表格上方提供按列筛选的输入框。
+    """
+    def __init__(self, master, columns, filter_bar=True, **kwargs):
+        super().__init__(master, **kwargs)
+        self.model = GridModel([c[0] for c in columns])
+        self.first = 0
+        self.items = []
+        if filter_bar:
+            bar = ttk.Frame(self)
+            bar.pack(fill='x')
+            ttk.Label(bar, text='筛选:').pack(side='left')
+            self.filter_column = ttk.Combobox(bar, state='readonly', width=14)
+            self.filter_column.pack(side='left', padx=2)
+            self.filter_var = tk.StringVar()
+            entry = ttk.Entry(bar, textvariable=self.filter_var, width=30)
+            entry.pack(side='left', padx=2)
+            entry.bind('<Return>', lambda e: self.apply_filter())
+            ttk.Button(bar, text='筛选', command=self.apply_filter).pack(side='left', padx=2)
+            self.count_label = ttk.Label(bar, text='')
+            self.count_label.pack(side='left', padx=6)
+        else:
+            self.filter_column = None
+            self.count_label = None
+        body = ttk.Frame(self)
+        body.pack(fill='both', expand=True)
+        self.tree = ttk.Treeview(body, show='headings', selectmode='browse')
+        self.tree.pack(side='left', fill='both', expand=True)
+        self.scrollbar = ttk.Scrollbar(body, orient='vertical', command=self.yview)
+        self.scrollbar.pack(side='right', fill='y')
+        self.set_columns(columns)
+        self.tree.bind('<Configure>', lambda e: self.resize())
+        self.tree.bind('<MouseWheel>', self.on_wheel)
+        self.tree.bind('<Button-4>', lambda e: self.scroll(-3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll(3))
+        self.tree.bind('<Prior>', lambda e: self.scroll(-len(self.items)))
+        self.tree.bind('<Next>', lambda e: self.scroll(len(self.items)))
+
+    def set_columns(self, columns):
+        """更换列定义（清空数据）"""
+        columns = [c if isinstance(c, tuple) else (c, c, 120) for c in columns]
+        self.titles = {name: title for name, title, _ in columns}
+        self.model.set_columns([c[0] for c in columns])
+        self.tree['columns'] = [c[0] for c in columns]
+        for name, title, width in columns:
+            self.tree.heading(name, text=title, command=lambda n=name: self.sort_by(n))
+            self.tree.column(name, width=width, anchor='w')
+        if self.filter_column is not None:
+            self.filter_column['values'] = [c[1] for c in columns]
+            if columns:
+                self.filter_column.current(0)
+        self.first = 0
+        self.refresh()
+
+    def row_height(self):
+        style = ttk.Style()
+        height = style.lookup('Treeview', 'rowheight')
+        if height:
+            return int(height)
+        return max(ROW_HEIGHT, tkfont.Font(font=style.lookup('Treeview', 'font') or 'TkDefaultFont').metrics('linespace') + 2)
+
+    def resize(self):
+        # 可见行数 = 控件高度 / 行高，扣掉表头一行
+        rows = max(1, self.tree.winfo_height() // self.row_height() - 1)
+        if rows != len(self.items):
+            self.tree.delete(*self.tree.get_children())
+            self.items = [self.tree.insert('', 'end', values=()) for _ in range(rows)]
+            self.refresh()
+
+    def refresh(self):
+        """按当前滚动位置重绘可见行，数据变化后调用"""
+        n = len(self.model)
+        self.first = max(0, min(self.first, n - len(self.items)))
+        for k, item in enumerate(self.items):
+            i = self.first + k
+            self.tree.item(item, values=self.model.row(i) if i < n else ())
+        if n:
+            self.scrollbar.set(self.first / n, min(1.0, (self.first + len(self.items)) / n))
+        else:
+            self.scrollbar.set(0, 1)
+        if self.count_label is not None:
+            shown = f'{n}/{self.model.total}' if self.model.filtered else f'{n}'
+            self.count_label.config(text=f'{shown} 行')
+
+    def scroll(self, rows):
+        self.first += rows
+        self.refresh()
+        return 'break'
+
+    def on_wheel(self, event):
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def yview(self, *args):
+        if args[0] == 'moveto':
+            self.first = int(float(args[1]) * len(self.model))
+        elif args[0] == 'scroll':
+            step = len(self.items) if args[2] == 'pages' else 1
+            self.first += int(args[1]) * step
+        self.refresh()
+
+    def sort_by(self, name):
+        descending = self.model.sort_key == (name, False)
+        self.model.sort(name, descending)
+        for col, title in self.titles.items():
+            mark = (' ▼' if descending else ' ▲') if col == name else ''
+            self.tree.heading(col, text=title + mark)
+        self.first = 0
+        self.refresh()
+
+    def apply_filter(self):
+        names = list(self.titles)
+        if not names:
+            return
+        index = self.filter_column.current() if self.filter_column is not None else 0
+        self.model.filter(names[max(index, 0)], self.filter_var.get().strip())
+        self.first = 0
+        self.refresh()
+
+    def set_rows(self, rows):
+        self.model.set_rows(rows)
+        self.first = 0
+        self.refresh()
+
+    def extend(self, rows):
+        self.model.extend(rows)
+        self.refresh()
+
+    def clear(self):
+        self.model.clear()
+        self.first = 0
+        self.refresh()
+
+    def selected_row(self):
+        """当前选中行的数据，未选中时返回 None"""
+        selection = self.tree.selection()
+        if not selection or selection[0] not in self.items:
+            return None
+        i = self.first + self.items.index(selection[0])
+        return self.model.row(i) if i < len(self.model) else None
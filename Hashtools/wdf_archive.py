@@ -0,0 +1,160 @@
+import os
+import mmap
+import struct
+import numpy as np
+
+# 已知的WDF文件头（PFDW/AFDW 为反序写法）
+WDF_MAGICS = (b'WDFP', b'PFDW', b'WDFA', b'AFDW')
+WDF_HEADER_FMT = '<4sII'  # magic, 文件数, 索引偏移
+WDF_HEADER_SIZE = 12
+
+# 索引项：16字节为 uid/offset/size/space，32字节在其后附带16字节内嵌文件名
+WDF_ENTRY_DTYPE_16 = np.dtype([('uid', '<u4'), ('offset', '<u4'), ('size', '<u4'), ('space', '<u4')])
+WDF_ENTRY_DTYPE_32 = np.dtype([('uid', '<u4'), ('offset', '<u4'), ('size', '<u4'), ('space', '<u4'), ('name', 'S16')])
+
+def is_wdf_magic(magic):
+    # 宽松判断：只要包含WDF即可
+    return b'WDF' in magic or b'WDF' in magic[::-1]
+
+def entries_fit(entries, file_size):
+    # 所有资源都落在文件范围内才认为索引项宽度正确
+    end = entries['offset'].astype(np.uint64) + entries['size']
+    return bool((end <= file_size).all())
+
+def names_plausible(names):
+    """
+    32字节索引项的内嵌文件名字段（S16数组）是否都像文件名：
+    以 NUL 结尾、NUL 之后全为0、NUL 之前是可打印的 UTF-8/GBK 文本
+    """
+    raw = np.frombuffer(names.tobytes(), dtype=np.uint8).reshape(-1, 16)
+    after_nul = np.maximum.accumulate(raw == 0, axis=1)
+    if not after_nul[:, -1].all() or raw[after_nul].any():
+        return False
+    text = raw[~after_nul]
+    if ((text < 0x20) | (text == 0x7f)).any():
+        return False
+    for name in names[(raw >= 0x80).any(axis=1)].tolist():
+        try:
+            name.decode('utf-8')
+        except UnicodeDecodeError:
+            try:
+                name.decode('gbk')
+            except UnicodeDecodeError:
+                return False
+    return True
+
+class WdfArchive:
+    """
+    统一的WDF读取器：mmap 打开文件，自动识别 WDFP/PFDW/WDFA/AFDW 文件头和
+    索引项宽度（16/32字节），一次调用把整个索引解码为 numpy 结构化数组。
+    索引数组和资源数据都是 mmap 上的零拷贝视图。
+    """
+    def __init__(self, path, entry_size=None):
+        self.path = path
+        self.file_size = os.path.getsize(path)
+        if self.file_size < WDF_HEADER_SIZE:
+            raise ValueError('文件头长度不足')
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._order = None
+        try:
+            self.magic, self.count, self.index_offset = struct.unpack_from(WDF_HEADER_FMT, self._mm, 0)
+            if not is_wdf_magic(self.magic):
+                raise ValueError(f'不是有效的WDF文件，文件头为: {self.magic}')
+            self.entry_size = entry_size or self.detect_entry_size()
+            dtype = WDF_ENTRY_DTYPE_32 if self.entry_size == 32 else WDF_ENTRY_DTYPE_16
+            # 索引区被截断时只取完整的索引项
+            available = max(0, (self.file_size - self.index_offset) // self.entry_size)
+            self.entries = np.frombuffer(self._mm, dtype=dtype, count=min(self.count, available),
+                                         offset=min(self.index_offset, self.file_size))
+        except Exception:
+            self.close()
+            raise
+
+    def detect_entry_size(self):
+        remain = self.file_size - self.index_offset
+        if self.count == 0 or remain < 0:
+            return 16
+        # 16字节索引后面跟着足够多的数据时，按32字节读出的正好是隔一项取一项，也能落在文件范围内，
+        # 所以32字节只在内嵌名都像文件名、且名字字段按16字节索引项读不成资源时才采用
+        if self.count * 32 <= remain:
+            entries = np.frombuffer(self._mm, dtype=WDF_ENTRY_DTYPE_32, count=self.count, offset=self.index_offset)
+            rows = np.frombuffer(self._mm, dtype=WDF_ENTRY_DTYPE_16, count=self.count * 2, offset=self.index_offset)
+            name_rows = rows[1::2]
+            name_rows_fit = name_rows.tobytes().strip(b'\x00') and entries_fit(name_rows, self.file_size)
+            if entries_fit(entries, self.file_size) and names_plausible(entries['name']) and not name_rows_fit:
+                return 32
+        if self.count * 16 <= remain:
+            entries = np.frombuffer(self._mm, dtype=WDF_ENTRY_DTYPE_16, count=self.count, offset=self.index_offset)
+            if entries_fit(entries, self.file_size):
+                return 16
+        # 两种宽度都读不出合理的索引时，按索引区是否恰好到文件末尾判定
+        for size in (32, 16):
+            if remain == self.count * size:
+                return size
+        return 16
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.entries = None
+        self._order = None
+        if getattr(self, '_mm', None) is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                # 外部仍持有零拷贝视图时，交给垃圾回收释放映射
+                pass
+            self._mm = None
+        if getattr(self, '_file', None) is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def has_names(self):
+        return self.entry_size == 32
+
+    def names(self):
+        """内嵌文件名列表（16字节索引项没有内嵌名，全部为空串）"""
+        if not self.has_names:
+            return [''] * len(self.entries)
+        return [n.split(b'\x00')[0].decode('utf-8', errors='ignore') for n in self.entries['name'].tolist()]
+
+    def to_dicts(self):
+        """转换为 parse_wdf_index 兼容的 [{uid, offset, size, space}] 列表"""
+        e = self.entries
+        return [
+            {'uid': uid, 'offset': offset, 'size': size, 'space': space}
+            for uid, offset, size, space in zip(
+                e['uid'].tolist(), e['offset'].tolist(), e['size'].tolist(), e['space'].tolist())
+        ]
+
+    def lookup(self, uids):
+        """批量查找uid对应的索引行号，未命中为-1"""
+        if self._order is None:
+            self._order = np.argsort(self.entries['uid'], kind='stable')
+        sorted_uids = self.entries['uid'][self._order]
+        uids = np.asarray(uids, dtype=np.uint32)
+        if not len(sorted_uids):
+            return np.full(len(uids), -1, dtype=np.int64)
+        pos = np.searchsorted(sorted_uids, uids)
+        pos[pos >= len(sorted_uids)] = 0
+        return np.where(sorted_uids[pos] == uids, self._order[pos], -1)
+
+    def payload(self, row):
+        """按索引行号取资源数据（mmap 上的零拷贝 memoryview）"""
+        offset = int(self.entries['offset'][row])
+        size = int(self.entries['size'][row])
+        return memoryview(self._mm)[offset:offset + size]
+
+    def read(self, uid):
+        """按uid取资源数据，不存在时返回 None"""
+        row = int(self.lookup([uid])[0])
+        return self.payload(row) if row >= 0 else None
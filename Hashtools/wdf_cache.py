@@ -0,0 +1,166 @@
+import os
+import io
+import json
+import zlib
+import struct
+import hashlib
+import numpy as np
+from wdf_archive import WdfArchive, WDF_HEADER_FMT, WDF_HEADER_SIZE
+from wdf_packer import uid_batch_func
+
+# 旁路缓存：<包名>.wdf.cache，numpy npz 格式（不使用 pickle）
+#   meta: JSON，含包指纹和每种算法配置下已哈希的路径数及其摘要
+#   entries: 解码后的索引
+#   <key>_uids / <key>_rows: 每种算法配置下路径列表的哈希及其在索引中的行号（未命中-1）
+CACHE_VERSION = 1
+CACHE_SUFFIX = '.cache'
+# 计算索引校验和时最多读取的字节数（索引区不在文件末尾时避免读入大量资源数据）
+MAX_INDEX_BYTES = 64 * 1024 * 1024
+
+def cache_path(wdf_path):
+    return wdf_path + CACHE_SUFFIX
+
+def archive_fingerprint(wdf_path):
+    """包指纹：(大小, mtime, 文件头, 索引区crc32)，任一变化缓存即失效"""
+    st = os.stat(wdf_path)
+    with open(wdf_path, 'rb') as f:
+        header = f.read(WDF_HEADER_SIZE)
+        crc = 0
+        if len(header) == WDF_HEADER_SIZE:
+            _, _, index_offset = struct.unpack(WDF_HEADER_FMT, header)
+            f.seek(index_offset)
+            crc = zlib.crc32(f.read(min(max(0, st.st_size - index_offset), MAX_INDEX_BYTES)))
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'header': header.hex(), 'index_crc': crc}
+
+def paths_digest(paths):
+    h = hashlib.sha1()
+    for p in paths:
+        h.update(p.encode('utf-8', errors='surrogatepass'))
+        h.update(b'\n')
+    return h.hexdigest()
+
+def match_key(algo_name, case_sensitive, seed):
+    tag = f'{algo_name}|{int(bool(case_sensitive))}|{seed}'
+    return 'm' + hashlib.sha1(tag.encode('utf-8')).hexdigest()[:12]
+
+class WdfCache:
+    """
+    WDF包的旁路缓存：保存解码后的索引和 lst→uid 的哈希/命中结果。
+    包指纹不变时直接复用；同一算法配置下新路径列表只是在旧列表后追加时，只哈希新增部分。
+    缓存目录不可写时静默跳过保存。
+    """
+    def __init__(self, wdf_path):
+        self.wdf_path = wdf_path
+        self.path = cache_path(wdf_path)
+        self.fingerprint = archive_fingerprint(wdf_path)
+        self.meta = {'version': CACHE_VERSION, 'fingerprint': self.fingerprint, 'entry_size': 0, 'matches': {}}
+        self.arrays = {}
+        self.dirty = False
+        self.hits = {'index': False, 'hashed': 0, 'reused': 0}
+        self.load()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.save()
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                meta = json.loads(bytes(data['meta']).decode('utf-8'))
+                if meta.get('version') != CACHE_VERSION or meta.get('fingerprint') != self.fingerprint:
+                    return
+                self.arrays = {k: data[k] for k in data.files if k != 'meta'}
+                self.meta = meta
+                self.hits['index'] = 'entries' in self.arrays
+        except (OSError, ValueError, KeyError):
+            # 缓存损坏时当作不存在
+            self.arrays = {}
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp_path = self.path + '.tmp'
+        try:
+            buf = io.BytesIO()
+            meta = np.frombuffer(json.dumps(self.meta).encode('utf-8'), dtype=np.uint8)
+            np.savez(buf, meta=meta, **self.arrays)
+            with open(tmp_path, 'wb') as f:
+                f.write(buf.getbuffer())
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @property
+    def entries(self):
+        """解码后的索引（numpy 结构化数组），无有效缓存时读包并写入缓存"""
+        if 'entries' not in self.arrays:
+            with WdfArchive(self.wdf_path) as archive:
+                self.arrays['entries'] = np.array(archive.entries)
+                self.meta['entry_size'] = archive.entry_size
+            self.meta['matches'] = {}
+            self.dirty = True
+        return self.arrays['entries']
+
+    def to_dicts(self):
+        """与 parse_wdf_index 相同的 [{uid, offset, size, space}] 列表"""
+        e = self.entries
+        return [
+            {'uid': uid, 'offset': offset, 'size': size, 'space': space}
+            for uid, offset, size, space in zip(
+                e['uid'].tolist(), e['offset'].tolist(), e['size'].tolist(), e['space'].tolist())
+        ]
+
+    def lookup(self, uids):
+        # 与 WdfArchive.lookup 相同：同一uid取最前一行，未命中为-1
+        entries = self.entries
+        order = np.argsort(entries['uid'], kind='stable')
+        sorted_uids = entries['uid'][order]
+        uids = np.asarray(uids, dtype=np.uint32)
+        if not len(sorted_uids):
+            return np.full(len(uids), -1, dtype=np.int64)
+        pos = np.searchsorted(sorted_uids, uids)
+        pos[pos >= len(sorted_uids)] = 0
+        return np.where(sorted_uids[pos] == uids, order[pos], -1)
+
+    def match(self, paths, algo_name, case_sensitive=False, seed=None):
+        """
+        计算路径列表的uid及其在索引中的行号，返回 (uids, rows)。
+        缓存中同一配置的路径列表是本次列表的前缀时，只哈希新增的路径。
+        """
+        paths = list(paths)
+        key = match_key(algo_name, case_sensitive, seed)
+        info = self.meta['matches'].get(key)
+        reuse = 0
+        if info and info['count'] <= len(paths) and f'{key}_uids' in self.arrays:
+            if paths_digest(paths[:info['count']]) == info['digest']:
+                reuse = info['count']
+        if reuse == len(paths) and reuse:
+            self.hits['reused'] = reuse
+            return self.arrays[f'{key}_uids'], self.arrays[f'{key}_rows']
+        new_uids = np.asarray(uid_batch_func(algo_name, case_sensitive, seed)(paths[reuse:]), dtype=np.uint32)
+        new_rows = self.lookup(new_uids)
+        if reuse:
+            uids = np.concatenate([self.arrays[f'{key}_uids'], new_uids])
+            rows = np.concatenate([self.arrays[f'{key}_rows'], new_rows])
+        else:
+            uids, rows = new_uids, new_rows
+        self.arrays[f'{key}_uids'] = uids
+        self.arrays[f'{key}_rows'] = rows.astype(np.int64)
+        self.meta['matches'][key] = {'algo': algo_name, 'case_sensitive': bool(case_sensitive), 'seed': seed,
+                                     'count': len(paths), 'digest': paths_digest(paths)}
+        self.dirty = True
+        self.hits['hashed'] = len(paths) - reuse
+        self.hits['reused'] = reuse
+        return uids, self.arrays[f'{key}_rows']
+
+    def describe(self):
+        """缓存命中情况的简短说明，用于日志"""
+        index = '索引命中缓存' if self.hits['index'] else '索引已重建'
+        return f"{index}，复用 {self.hits['reused']} 条哈希，新计算 {self.hits['hashed']} 条"
@@ -0,0 +1,254 @@
+import os
+import time
+import sqlite3
+import argparse
+import numpy as np
+from wdf_archive import WdfArchive
+from wdf_vfs import list_archives
+from name_index import NameIndex
+
+# 目录库结构：
+#   archives: 每个WDF包一行，大小/mtime 不变时重建跳过该包
+#   entries:  全部索引项，size_class 为 bit_length(size)，便于按 2 的幂分桶统计；name 为包内嵌名
+#   names:    已知名称（反查索引 .uidx 和包内嵌名），同一uid可有多个名称；
+#             内嵌名（source='embedded'）由 entries.name 汇总而来，包删除或重新入库后重建
+# 结构变化时递增 SCHEMA_VERSION，旧版本的目录库整体重建
+SCHEMA_VERSION = 2
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS archives (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    file_size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    magic TEXT NOT NULL,
+    entry_size INTEGER NOT NULL,
+    count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    archive_id INTEGER NOT NULL REFERENCES archives(id) ON DELETE CASCADE,
+    row INTEGER NOT NULL,
+    uid INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    space INTEGER NOT NULL,
+    size_class INTEGER NOT NULL,
+    name TEXT,
+    PRIMARY KEY (archive_id, row)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_uid ON entries(uid);
+CREATE INDEX IF NOT EXISTS entries_size ON entries(size);
+CREATE TABLE IF NOT EXISTS names (
+    uid INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    ext TEXT NOT NULL,
+    source TEXT NOT NULL,
+    PRIMARY KEY (uid, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS names_ext ON names(ext, uid);
+CREATE INDEX IF NOT EXISTS names_name ON names(name COLLATE NOCASE);
+"""
+
+def connect(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA foreign_keys=ON')
+    if conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+        conn.executescript('DROP TABLE IF EXISTS entries; DROP TABLE IF EXISTS names; DROP TABLE IF EXISTS archives;')
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    conn.executescript(SCHEMA)
+    return conn
+
+def name_ext(name):
+    return os.path.splitext(name.replace('\\', '/'))[1].lower()
+
+def size_classes(sizes):
+    # bit_length：0 字节为 0，1 字节为 1，[2^(k-1), 2^k) 为 k
+    sizes = np.asarray(sizes, dtype=np.uint64)
+    return np.where(sizes > 0, np.floor(np.log2(np.maximum(sizes, 1))).astype(np.int64) + 1, 0)
+
+def load_archive(conn, path):
+    """把一个包的索引（含内嵌名）写入目录库，返回 (写入的条目数, 内嵌名个数)；包未变化时返回 (0, None)"""
+    st = os.stat(path)
+    path = os.path.abspath(path)
+    row = conn.execute('SELECT id, file_size, mtime_ns FROM archives WHERE path = ?', (path,)).fetchone()
+    if row and row[1] == st.st_size and row[2] == st.st_mtime_ns:
+        return 0, None
+    if row:
+        conn.execute('DELETE FROM archives WHERE id = ?', (row[0],))
+    with WdfArchive(path) as archive:
+        e = np.array(archive.entries)
+        names = archive.names()
+        cur = conn.execute(
+            'INSERT INTO archives (path, file_size, mtime_ns, magic, entry_size, count) VALUES (?, ?, ?, ?, ?, ?)',
+            (path, st.st_size, st.st_mtime_ns, archive.magic.decode('latin-1'), archive.entry_size, len(e)))
+    archive_id = cur.lastrowid
+    conn.executemany(
+        'INSERT OR REPLACE INTO entries (archive_id, row, uid, offset, size, space, size_class, name) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        zip([archive_id] * len(e), range(len(e)), e['uid'].tolist(), e['offset'].tolist(),
+            e['size'].tolist(), e['space'].tolist(), size_classes(e['size']).tolist(),
+            [name or None for name in names]))
+    return len(e), sum(1 for name in names if name)
+
+def rebuild_embedded_names(conn):
+    """按 entries.name 重建内嵌名，已删除或重新入库的包留下的旧名称随之清除"""
+    conn.execute("DELETE FROM names WHERE source = 'embedded'")
+    rows = conn.execute('SELECT DISTINCT uid, name FROM entries WHERE name IS NOT NULL').fetchall()
+    conn.executemany('INSERT OR IGNORE INTO names (uid, name, ext, source) VALUES (?, ?, ?, ?)',
+                     ((uid, name, name_ext(name), 'embedded') for uid, name in rows))
+    return len(rows)
+
+def load_name_indexes(conn, index_dir, algo_name):
+    """
+    把反查索引目录下 algo_name 算法的 .uidx 名称写入目录库，只保留目录库中出现过的uid。
+    其他算法算出的uid与包内的uid不是同一套，碰巧相同也不是同一个文件，不入库；
+    之前以其他算法入库的名称一并删除。
+    """
+    conn.execute("DELETE FROM names WHERE source NOT IN ('embedded', ?)", (algo_name,))
+    known = np.array([uid for (uid,) in conn.execute('SELECT DISTINCT uid FROM entries')], dtype=np.uint32)
+    total = 0
+    for file_name in sorted(f for f in os.listdir(index_dir) if f.endswith('.uidx')):
+        with NameIndex(os.path.join(index_dir, file_name)) as index:
+            if index.algo_name != algo_name:
+                continue
+            rows = np.nonzero(np.isin(index.uids, known))[0].tolist()
+            uids = index.uids[rows].tolist() if rows else []
+            names = [index.name_at(row) for row in rows]
+            source = index.algo_name
+        conn.executemany('INSERT OR IGNORE INTO names (uid, name, ext, source) VALUES (?, ?, ?, ?)',
+                         ((uid, name, name_ext(name), source) for uid, name in zip(uids, names)))
+        total += len(names)
+    return total
+
+def build_catalog(db_path, sources, index_dir=None, algo_name='wdf_string_id', log_func=print):
+    """
+    建立/增量更新目录库。sources 为 .wdf 文件或目录（目录下全部 .wdf，不递归）。
+    已入库且大小、mtime 未变的包跳过；磁盘上已不存在的包从库中删除，其他已入库的包保留。
+    index_dir: 反查索引目录，其中 algo_name 算法（包内uid所用的算法）的名称一并入库（内嵌名总是入库）。
+    返回统计信息 {archives, skipped, entries, names, seconds}。
+    """
+    start_time = time.time()
+    paths = []
+    for source in sources:
+        paths.extend(list_archives(source) if os.path.isdir(source) else [source])
+    stats = {'archives': 0, 'skipped': 0, 'entries': 0, 'names': 0}
+    conn = connect(db_path)
+    try:
+        with conn:
+            gone = [(aid,) for aid, path in conn.execute('SELECT id, path FROM archives') if not os.path.exists(path)]
+            conn.executemany('DELETE FROM archives WHERE id = ?', gone)
+            for path in paths:
+                count, embedded = load_archive(conn, path)
+                if embedded is None:
+                    stats['skipped'] += 1
+                    continue
+                stats['archives'] += 1
+                stats['entries'] += count
+                stats['names'] += embedded
+                log_func(f"入库: {os.path.basename(path)}，{count} 条")
+            if gone or stats['archives']:
+                rebuild_embedded_names(conn)
+            if index_dir and os.path.isdir(index_dir):
+                stats['names'] += load_name_indexes(conn, index_dir, algo_name)
+        conn.execute('ANALYZE')
+    finally:
+        conn.close()
+    stats['seconds'] = time.time() - start_time
+    log_func(f"目录库已更新: 入库 {stats['archives']} 个包（未变化跳过 {stats['skipped']} 个），"
+             f"条目 {stats['entries']}，名称 {stats['names']}，用时 {stats['seconds']:.2f} 秒")
+    return stats
+
+# 常用查询，均返回 (列名, 行列表)
+def query(conn, sql, params=()):
+    cur = conn.execute(sql, params)
+    return [d[0] for d in cur.description], cur.fetchall()
+
+def find_uid(conn, uid):
+    """某个uid所在的包及其已知名称"""
+    return query(conn, """
+        SELECT a.path, e.row, e.offset, e.size, e.space,
+               (SELECT group_concat(name, ' ; ') FROM names n WHERE n.uid = e.uid) AS names
+        FROM entries e JOIN archives a ON a.id = e.archive_id
+        WHERE e.uid = ? ORDER BY a.path""", (uid,))
+
+def find_name(conn, pattern, limit=100):
+    """按名称查找（LIKE 语法，% 为通配符，不区分大小写）"""
+    return query(conn, """
+        SELECT n.name, printf('0x%08X', n.uid) AS uid, a.path, e.size
+        FROM names n JOIN entries e ON e.uid = n.uid JOIN archives a ON a.id = e.archive_id
+        WHERE n.name LIKE ? ORDER BY n.name LIMIT ?""", (pattern, limit))
+
+def largest(conn, ext=None, limit=20):
+    """最大的资源，给出 ext（如 .dds）时只统计该后缀的已知名称"""
+    if ext:
+        ext = ext.lower() if ext.startswith('.') else '.' + ext.lower()
+        return query(conn, """
+            SELECT e.size, n.name, printf('0x%08X', e.uid) AS uid, a.path
+            FROM names n JOIN entries e ON e.uid = n.uid JOIN archives a ON a.id = e.archive_id
+            WHERE n.ext = ? ORDER BY e.size DESC LIMIT ?""", (ext, limit))
+    return query(conn, """
+        SELECT e.size, printf('0x%08X', e.uid) AS uid, a.path
+        FROM entries e JOIN archives a ON a.id = e.archive_id
+        ORDER BY e.size DESC LIMIT ?""", (limit,))
+
+def size_histogram(conn, archive=None):
+    """按 2 的幂分桶的大小分布，另给出每桶的预留空间（space - size）合计"""
+    where, params = ('WHERE a.path LIKE ?', (f'%{archive}%',)) if archive else ('', ())
+    return query(conn, f"""
+        SELECT CASE e.size_class WHEN 0 THEN '0' ELSE printf('<%d', 1 << e.size_class) END AS bucket,
+               count(*) AS files, sum(e.size) AS bytes, sum(max(e.space - e.size, 0)) AS slack
+        FROM entries e JOIN archives a ON a.id = e.archive_id {where}
+        GROUP BY e.size_class ORDER BY e.size_class""", params)
+
+def format_rows(columns, rows):
+    lines = [' | '.join(columns)]
+    lines.extend(' | '.join('' if v is None else str(v) for v in row) for row in rows)
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description='WDF索引目录库（SQLite）')
+    parser.add_argument('db', help='目录库文件（.sqlite）')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p = sub.add_parser('build', help='建立/增量更新目录库')
+    p.add_argument('sources', nargs='+', help='.wdf 文件或目录')
+    p.add_argument('--index-dir', help='反查索引目录，其中的名称一并入库')
+    p.add_argument('--algo', default='wdf_string_id', help='包内uid所用的哈希算法，只导入该算法的反查索引')
+    p = sub.add_parser('uid', help='查找uid所在的包')
+    p.add_argument('uid', help='uid（0x开头为十六进制）')
+    p = sub.add_parser('name', help='按名称查找（LIKE 语法）')
+    p.add_argument('pattern')
+    p.add_argument('-n', type=int, default=100)
+    p = sub.add_parser('largest', help='最大的资源')
+    p.add_argument('--ext', help='只看某个后缀，如 .dds')
+    p.add_argument('-n', type=int, default=20)
+    p = sub.add_parser('hist', help='按大小分桶统计')
+    p.add_argument('--archive', help='只统计路径包含该字符串的包')
+    p = sub.add_parser('sql', help='执行任意只读查询')
+    p.add_argument('sql')
+    args = parser.parse_args()
+    if args.cmd == 'build':
+        build_catalog(args.db, args.sources, args.index_dir, args.algo)
+        return
+    if not os.path.isfile(args.db):
+        parser.error(f'目录库不存在: {args.db}')
+    conn = sqlite3.connect(f'file:{args.db}?mode=ro', uri=True)
+    try:
+        start_time = time.time()
+        if args.cmd == 'uid':
+            columns, rows = find_uid(conn, int(args.uid, 0))
+        elif args.cmd == 'name':
+            columns, rows = find_name(conn, args.pattern, args.n)
+        elif args.cmd == 'largest':
+            columns, rows = largest(conn, args.ext, args.n)
+        elif args.cmd == 'hist':
+            columns, rows = size_histogram(conn, args.archive)
+        else:
+            columns, rows = query(conn, args.sql)
+        print(format_rows(columns, rows))
+        print(f"{len(rows)} 行，用时 {(time.time() - start_time) * 1000:.1f} ms")
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+import os
+import time
+import argparse
+import numpy as np
+from wdf_archive import WdfArchive, WDF_HEADER_SIZE
+from wdf_packer import WdfWriter, DEFAULT_ALIGN, uid_batch_func
+
+# 字节区间的分类
+KIND_HEADER = 'header'
+KIND_LIVE = 'live'          # 索引项 [offset, offset+size) 引用的数据
+KIND_SLACK = 'slack'        # 索引项 [offset+size, offset+space) 的预留空间
+KIND_INDEX = 'index'        # 索引表
+KIND_ORPHANED = 'orphaned'  # 没有任何索引项引用的空洞（删除/搬移后残留）
+
+def merge_intervals(starts, ends):
+    """合并重叠或相接的区间，返回 [(start, end)]（按起点升序）"""
+    merged = []
+    order = np.argsort(starts, kind='stable')
+    for s, e in zip(np.asarray(starts)[order].tolist(), np.asarray(ends)[order].tolist()):
+        if e <= s:
+            continue
+        if merged and s <= merged[-1][1]:
+            if e > merged[-1][1]:
+                merged[-1][1] = e
+        else:
+            merged.append([s, e])
+    return [(s, e) for s, e in merged]
+
+def subtract_intervals(a, b):
+    """有序区间列表 a 去掉 b 覆盖的部分"""
+    result = []
+    j = 0
+    for s, e in a:
+        while j < len(b) and b[j][1] <= s:
+            j += 1
+        k = j
+        cur = s
+        while k < len(b) and b[k][0] < e:
+            if b[k][0] > cur:
+                result.append((cur, b[k][0]))
+            cur = max(cur, b[k][1])
+            k += 1
+        if cur < e:
+            result.append((cur, e))
+    return result
+
+def analyze_wdf(wdf_path):
+    """
+    把WDF包的每个字节归类为 header/live/slack/index/orphaned。
+    live 取各索引项的 [offset, offset+size)，slack 为 [offset+size, offset+space) 中未被 live 覆盖的部分，
+    其余不属于文件头和索引表的字节都是 orphaned。多个索引项共用同一段数据时只计一次，另计入 shared。
+    返回 {file_size, ranges: [(start, end, kind)], bytes: {kind: 字节数}, shared, waste, waste_ratio}。
+    """
+    with WdfArchive(wdf_path) as archive:
+        file_size = archive.file_size
+        entries = np.array(archive.entries)
+        index_start = min(archive.index_offset, file_size)
+        index_end = min(archive.index_offset + archive.count * archive.entry_size, file_size)
+    offsets = entries['offset'].astype(np.int64)
+    sizes = entries['size'].astype(np.int64)
+    spaces = entries['space'].astype(np.int64)
+    live = merge_intervals(np.minimum(offsets, file_size), np.minimum(offsets + sizes, file_size))
+    shared = int(np.minimum(sizes, np.maximum(0, file_size - offsets)).sum()) - sum(e - s for s, e in live)
+    slack = merge_intervals(np.minimum(offsets + sizes, file_size), np.minimum(offsets + np.maximum(spaces, sizes), file_size))
+    fixed = merge_intervals([0, index_start], [min(WDF_HEADER_SIZE, file_size), index_end])
+    slack = subtract_intervals(subtract_intervals(slack, live), fixed)
+    live = subtract_intervals(live, fixed)
+    used = merge_intervals([s for s, _ in live + slack + fixed], [e for _, e in live + slack + fixed])
+    orphaned = subtract_intervals([(0, file_size)], used)
+    ranges = [(s, e, KIND_LIVE) for s, e in live] + [(s, e, KIND_SLACK) for s, e in slack]
+    ranges += [(s, e, KIND_ORPHANED) for s, e in orphaned]
+    ranges += [(0, min(WDF_HEADER_SIZE, file_size), KIND_HEADER)]
+    if index_end > index_start:
+        ranges.append((index_start, index_end, KIND_INDEX))
+    ranges.sort()
+    totals = dict.fromkeys((KIND_HEADER, KIND_LIVE, KIND_SLACK, KIND_INDEX, KIND_ORPHANED), 0)
+    for s, e, kind in ranges:
+        totals[kind] += e - s
+    waste = totals[KIND_SLACK] + totals[KIND_ORPHANED]
+    return {'file_size': file_size, 'entries': len(entries), 'ranges': ranges, 'bytes': totals,
+            'shared': shared, 'waste': waste, 'waste_ratio': waste / file_size if file_size else 0.0}
+
+def format_report(report):
+    mb = lambda n: n / 1048576
+    b = report['bytes']
+    orphan_holes = sum(1 for _, _, kind in report['ranges'] if kind == KIND_ORPHANED)
+    return (f"文件 {mb(report['file_size']):.1f} MB，{report['entries']} 条资源: "
+            f"有效 {mb(b[KIND_LIVE]):.1f} MB，预留 {mb(b[KIND_SLACK]):.1f} MB，"
+            f"孤立 {mb(b[KIND_ORPHANED]):.1f} MB（{orphan_holes} 段），索引 {mb(b[KIND_INDEX]):.2f} MB，"
+            f"共用 {mb(report['shared']):.1f} MB；浪费 {mb(report['waste']):.1f} MB（{report['waste_ratio'] * 100:.1f}%）")
+
+def export_map_to_txt(report, out_path):
+    """将字节区间分布导出为文本（start, end, kind）"""
+    with open(out_path, 'w', encoding='utf-8') as f:
+        for s, e, kind in report['ranges']:
+            f.write(f"{s},{e},{kind}\n")
+
+def load_access_order(path, algo_name='wdf_string_id', case_sensitive=False, seed=None):
+    """
+    读取访问顺序文件，每行一个包内路径或 0x 开头的uid，返回uid列表。
+    路径按 algo_name 计算uid，需与打包时一致。
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    names = [line for line in lines if not line.lower().startswith('0x')]
+    hashed = iter(uid_batch_func(algo_name, case_sensitive, seed)(names).tolist()) if names else iter(())
+    return [int(line, 16) if line.lower().startswith('0x') else next(hashed) for line in lines]
+
+def compact_wdf(wdf_path, out_path=None, order=None, align=DEFAULT_ALIGN, log_func=print):
+    """
+    流式重写WDF包：资源连续排列（space 为对齐后的大小），去掉预留空间和孤立空洞，重新生成索引。
+    order: 可选的uid访问顺序，列出的资源排在最前面，其余按原偏移顺序；
+    多个uid共用同一段数据时只写一份。out_path 省略时原地替换（先写临时文件）。
+    返回统计信息 {files, before, after, saved, seconds}。
+    """
+    start_time = time.time()
+    out_path = out_path or wdf_path
+    with WdfArchive(wdf_path) as archive:
+        magic = archive.magic
+        entry_size = archive.entry_size
+        entries = np.array(archive.entries)
+        names = archive.names()
+        before = archive.file_size
+    rows = list(np.argsort(entries['offset'], kind='stable').tolist())
+    if order:
+        row_of = {}
+        for row, uid in enumerate(entries['uid'].tolist()):
+            row_of.setdefault(uid, row)
+        first = list(dict.fromkeys(row_of[uid] for uid in order if uid in row_of))
+        picked = set(first)
+        rows = first + [row for row in rows if row not in picked]
+    written = {}  # (原offset, size) -> 新条目
+    with WdfWriter(out_path, align, entry_size, magic) as writer:
+        with open(wdf_path, 'rb') as src:
+            for row in rows:
+                e = entries[row]
+                uid, offset, size = int(e['uid']), int(e['offset']), int(e['size'])
+                key = (offset, size)
+                if key in written:
+                    writer.add_ref(uid, *written[key], names[row])
+                    continue
+                new_offset = writer.pos
+                src.seek(offset)
+                writer.add_stream(uid, src, size, names[row])
+                written[key] = (new_offset, size, writer.pos - new_offset)
+    after = os.path.getsize(out_path)
+    seconds = time.time() - start_time
+    log_func(f"整理完成: {len(rows)} 条资源，{before / 1048576:.1f} MB -> {after / 1048576:.1f} MB，"
+             f"节省 {(before - after) / 1048576:.1f} MB，用时 {seconds:.2f} 秒")
+    return {'files': len(rows), 'before': before, 'after': after, 'saved': before - after, 'seconds': seconds}
+
+def main():
+    parser = argparse.ArgumentParser(description='WDF包碎片分析与整理')
+    parser.add_argument('wdf', help='.wdf文件')
+    parser.add_argument('--map', help='把字节区间分布导出为文本')
+    parser.add_argument('--compact', nargs='?', const='', metavar='输出路径',
+                        help='整理为连续存放，省略输出路径时原地替换')
+    parser.add_argument('--order', help='访问顺序文件（每行一个包内路径或0x开头的uid）')
+    parser.add_argument('--algo', default='wdf_string_id', help='访问顺序文件中路径的uid算法')
+    parser.add_argument('--case-sensitive', action='store_true')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--align', type=int, default=DEFAULT_ALIGN)
+    args = parser.parse_args()
+    report = analyze_wdf(args.wdf)
+    print(format_report(report))
+    if args.map:
+        export_map_to_txt(report, args.map)
+    if args.compact is not None:
+        order = load_access_order(args.order, args.algo, args.case_sensitive, args.seed) if args.order else None
+        out_path = args.compact or args.wdf
+        compact_wdf(args.wdf, out_path, order, args.align)
+        print(format_report(analyze_wdf(out_path)))
+
+if __name__ == '__main__':
+    main()
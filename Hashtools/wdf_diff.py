@@ -0,0 +1,124 @@
+import time
+import hashlib
+import argparse
+from wdf_parser import parse_wdf_index
+from wdf_archive import WdfArchive
+from wdf_packer import WdfWriter, COPY_CHUNK
+
+# 增量包的文件头，条目格式与普通WDF相同；被删除的uid记为偏移/大小/空间均为0的条目
+DELTA_MAGIC = b'WDFD'
+
+def is_tombstone(entry):
+    return entry['offset'] == 0 and entry['size'] == 0 and entry['space'] == 0
+
+def hash_range(f, offset, size):
+    h = hashlib.blake2b(digest_size=16)
+    f.seek(offset)
+    remain = size
+    while remain > 0:
+        chunk = f.read(min(COPY_CHUNK, remain))
+        if not chunk:
+            break
+        h.update(chunk)
+        remain -= len(chunk)
+    return h.digest()
+
+def hash_entries(wdf_path, entries):
+    """按偏移顺序计算一组资源的内容哈希，返回 {uid: digest}"""
+    digests = {}
+    with open(wdf_path, 'rb') as f:
+        for e in sorted(entries, key=lambda e: e['offset']):
+            digests[e['uid']] = hash_range(f, e['offset'], e['size'])
+    return digests
+
+def diff_wdf(old_path, new_path, trust_offsets=False):
+    """
+    按uid比较两个WDF包的索引（parse_wdf_index 结构）。
+    大小不同直接判定为修改；大小相同时读取两边的资源计算内容哈希。
+    trust_offsets=True 时偏移和大小都相同即视为未变、跳过哈希，仅适用于确知新包只追加写入的情况：
+    原地更新（wdf_updater 写回原位置）或重新打包都会保留偏移和大小，此时跳过哈希会漏掉修改。
+    返回 {added, removed, changed: [uid], unchanged, hashed, old, new: {uid: entry}}。
+    """
+    old = {e['uid']: e for e in parse_wdf_index(old_path)}
+    new = {e['uid']: e for e in parse_wdf_index(new_path)}
+    added = sorted(uid for uid in new if uid not in old)
+    removed = sorted(uid for uid in old if uid not in new)
+    changed = []
+    unchanged = 0
+    to_hash = []
+    for uid in sorted(uid for uid in new if uid in old):
+        o, n = old[uid], new[uid]
+        if o['size'] != n['size']:
+            changed.append(uid)
+        elif trust_offsets and o['offset'] == n['offset']:
+            unchanged += 1
+        else:
+            to_hash.append(uid)
+    if to_hash:
+        old_digests = hash_entries(old_path, [old[uid] for uid in to_hash])
+        new_digests = hash_entries(new_path, [new[uid] for uid in to_hash])
+        for uid in to_hash:
+            if old_digests[uid] != new_digests[uid]:
+                changed.append(uid)
+            else:
+                unchanged += 1
+        changed.sort()
+    return {'added': added, 'removed': removed, 'changed': changed, 'unchanged': unchanged,
+            'hashed': len(to_hash), 'old': old, 'new': new}
+
+def format_diff(diff):
+    return (f"新增 {len(diff['added'])}，删除 {len(diff['removed'])}，修改 {len(diff['changed'])}，"
+            f"未变 {diff['unchanged']}（计算内容哈希 {diff['hashed']} 条）")
+
+def export_diff_to_txt(diff, out_path):
+    """
+    将比较结果导出为文本：类型(added/removed/changed), uid, 旧大小, 新大小
+    """
+    with open(out_path, 'w', encoding='utf-8') as f:
+        for kind in ('added', 'removed', 'changed'):
+            for uid in diff[kind]:
+                old_size = diff['old'][uid]['size'] if uid in diff['old'] else ''
+                new_size = diff['new'][uid]['size'] if uid in diff['new'] else ''
+                f.write(f"{kind},0x{uid:08X},{old_size},{new_size}\n")
+
+def write_delta(new_path, diff, out_path, log_func=print):
+    """
+    把新增和修改的资源（取自新包）写成增量包，删除的uid写为空条目。
+    增量包可用 wdf_updater.apply_delta 应用到旧包上。
+    """
+    start_time = time.time()
+    total = 0
+    # 新包带内嵌文件名时增量包也保留，应用到32字节索引的包上时写回名称
+    with WdfArchive(new_path) as archive:
+        entry_size = archive.entry_size
+        names = dict(zip(archive.entries['uid'].tolist(), archive.names()))
+    with WdfWriter(out_path, entry_size=entry_size, magic=DELTA_MAGIC) as writer, open(new_path, 'rb') as src:
+        entries = sorted((diff['new'][uid] for uid in diff['added'] + diff['changed']), key=lambda e: e['offset'])
+        for e in entries:
+            src.seek(e['offset'])
+            writer.add_stream(e['uid'], src, e['size'], names.get(e['uid'], ''))
+            total += e['size']
+        for uid in diff['removed']:
+            writer.add_tombstone(uid)
+    log_func(f"增量包已写出: {out_path}，资源 {len(entries)} 个 {total / 1048576:.1f} MB，"
+             f"删除 {len(diff['removed'])} 个，用时 {time.time() - start_time:.2f} 秒")
+    return {'files': len(entries), 'deleted': len(diff['removed']), 'bytes': total}
+
+def main():
+    parser = argparse.ArgumentParser(description='比较两个WDF包的索引，可生成增量包')
+    parser.add_argument('old', help='旧版本.wdf')
+    parser.add_argument('new', help='新版本.wdf')
+    parser.add_argument('--report', help='把新增/删除/修改列表导出为文本')
+    parser.add_argument('--delta', help='写出增量包的路径')
+    parser.add_argument('--trust-offsets', action='store_true',
+                        help='偏移和大小都相同时视为未变、不比较内容（仅适用于新包只追加写入的情况）')
+    args = parser.parse_args()
+    diff = diff_wdf(args.old, args.new, trust_offsets=args.trust_offsets)
+    print(format_diff(diff))
+    if args.report:
+        export_diff_to_txt(diff, args.report)
+    if args.delta:
+        write_delta(args.new, diff, args.delta)
+
+if __name__ == '__main__':
+    main()
@@ -1,49 +1,59 @@
 import os
+import sys
 import struct
-from hash_algorithms import calc_hash
+import argparse
+import contextlib
+from hash_algorithms import calc_hash_batch
 from wdf_parser import parse_wdf_index
+from name_index import open_name_index
+from wdf_vfs import WdfNamespace
+from wdf_cache import WdfCache
+from wdf_extract import (
+    extract_planned, extract_parallel, extract_to_sink, extract_dedup, open_sink, is_archive_target, member_name,
+    format_stats, format_dedup, DEDUP_MODES,
+    DEFAULT_GAP, DEFAULT_MAX_READ, DEFAULT_INFLIGHT_BYTES
+)
 
 # 定义BMP/TGA头部结构体
 BMP_FILE_HEADER_FMT = '<HIHHI'  # 14字节
 BMP_INFO_HEADER_FMT = '<IIIHHIIIIII'  # 40字节
 TGA_HEADER_FMT = '<BBBHHBHHHHBB'  # 18字节
-BUFFER_SIZE = 1024
 
-def export_matched_files(wdf_path, matched_items, out_dir):
+def export_matched_files(
+    wdf_path, matched_items, out_dir,
+    gap=DEFAULT_GAP, max_read=DEFAULT_MAX_READ,
+    workers=1, inflight_bytes=DEFAULT_INFLIGHT_BYTES, deflate=False, dedup=None
+):
     """
     wdf_path: WDF包路径
     matched_items: [(path, uid, offset, size)]
-    out_dir: 导出根目录
+    out_dir: 导出根目录；为 .tar/.tar.gz/.tgz/.zip 文件或 '-'（标准输出）时直接流式写入单个包
+    gap/max_read: 合并读取的间隔阈值与单次读取上限
+    workers/inflight_bytes: 大于1个线程时并行导出，及每线程在途字节上限
+    deflate: 写 zip 时是否压缩（默认 stored）
+    dedup: 'hardlink' 或 'reflink' 时按内容去重，重复内容不再写入（统计中含 saved/by_ext）
+    按偏移顺序导出，返回统计信息（含 MB/s）。
     """
-    with open(wdf_path, 'rb') as f:
-        for path, uid, offset, size in matched_items:
-            if not path or offset is None or size is None or size <= 0:
-                continue
-            save_path = os.path.join(out_dir, path)
-            os.makedirs(os.path.dirname(save_path), exist_ok=True)
-            f.seek(offset)
-            ext = os.path.splitext(path)[1].lower()
-            with open(save_path, 'wb') as out_f:
-                remain = size
-                # BMP特殊处理
-                if ext == '.bmp' and remain >= 54:
-                    bmp_file_header = f.read(14)
-                    bmp_info_header = f.read(40)
-                    out_f.write(bmp_file_header)
-                    out_f.write(bmp_info_header)
-                    remain -= 54
-                # TGA特殊处理
-                elif ext == '.tga' and remain >= 18:
-                    tga_header = f.read(18)
-                    out_f.write(tga_header)
-                    remain -= 18
-                # 其他文件无头部特殊处理
-                while remain > 0:
-                    chunk = f.read(min(BUFFER_SIZE, remain))
-                    if not chunk:
-                        break
-                    out_f.write(chunk)
-                    remain -= len(chunk)
+    if dedup and is_archive_target(out_dir):
+        raise ValueError('去重导出只支持导出到目录')
+    if is_archive_target(out_dir):
+        items = [
+            (member_name(path), offset, size)
+            for path, uid, offset, size in matched_items
+            if path and offset is not None and size is not None and size > 0
+        ]
+        with open_sink(out_dir, deflate) as sink:
+            return extract_to_sink(wdf_path, items, sink, gap, max_read)
+    items = [
+        (os.path.join(out_dir, path), offset, size)
+        for path, uid, offset, size in matched_items
+        if path and offset is not None and size is not None and size > 0
+    ]
+    if dedup:
+        return extract_dedup(wdf_path, items, dedup, gap, max_read)
+    if workers > 1:
+        return extract_parallel(wdf_path, items, workers, inflight_bytes)
+    return extract_planned(wdf_path, items, gap, max_read)
 
 def export_by_samples(
     wdf_path, sample_paths, out_dir,
@@ -62,19 +72,19 @@ def export_by_samples(
     index_entries = parse_wdf_index(wdf_path)
     uid_map = {e['uid']: e for e in index_entries}
     matched_items = []
-    for path in sample_paths:
-        hash_val = calc_hash(algo_name, path, case_sensitive, seed)
+    hash_vals = calc_hash_batch(algo_name, sample_paths, case_sensitive, seed)
+    for path, hash_val in zip(sample_paths, hash_vals.tolist()):
         entry = uid_map.get(hash_val)
         if entry:
             matched_items.append(
                 (path, hash_val, entry['offset'], entry['size'])
             )
     # 调用原有导出
-    export_matched_files(wdf_path, matched_items, out_dir)
+    return export_matched_files(wdf_path, matched_items, out_dir)
 
 def export_by_lst(
     wdf_path, lst_path, out_dir,
-    algo_name, case_sensitive=False, seed=None
+    algo_name, case_sensitive=False, seed=None, index_dir=None, deflate=False, dedup=None
 ):
     """
     直接读取lst文件，自动比对并导出命中资源。
@@ -84,18 +94,83 @@ def export_by_lst(
     algo_name: 哈希算法名
     case_sensitive: 是否区分大小写
     seed: 哈希算法种子
+    index_dir: 反查索引目录，给出时把lst名称合并进索引
+    deflate: 导出为 zip 时是否压缩
+    dedup: 导出到目录时按内容去重（'hardlink' 或 'reflink'），导出为 tar/zip 时不可用
+    wdf_path 为目录时挂载其中全部WDF包，整个列表只做一次批量查找。
     """
-    # 解析WDF索引
-    index_entries = parse_wdf_index(wdf_path)
-    uid_map = {e['uid']: e for e in index_entries}
     # 读取lst文件
     with open(lst_path, 'r', encoding='utf-8') as f:
         sample_paths = [line.strip() for line in f if line.strip() and not line.startswith('#')]
-    # 命中比对并导出
-    matched_items = []
-    for path in sample_paths:
-        hash_val = calc_hash(algo_name, path, case_sensitive, seed)
-        entry = uid_map.get(hash_val)
-        if entry:
-            matched_items.append((path, hash_val, entry['offset'], entry['size']))
-    export_matched_files(wdf_path, matched_items, out_dir) 
\ No newline at end of file
+    if os.path.isdir(wdf_path):
+        with WdfNamespace.mount_dir(wdf_path, algo_name=algo_name, case_sensitive=case_sensitive, seed=seed) as ns:
+            if index_dir:
+                with open_name_index(index_dir, algo_name, case_sensitive, seed) as index:
+                    index.merge(sample_paths, ns.hash_paths(sample_paths))
+            if is_archive_target(out_dir):
+                if dedup:
+                    raise ValueError('去重导出只支持导出到目录')
+                with open_sink(out_dir, deflate) as sink:
+                    return ns.extract(sample_paths, '', sink=sink)
+            return ns.extract(sample_paths, out_dir, dedup=dedup)
+    # 索引和哈希结果优先取旁路缓存，lst只是追加了新行时只计算新增部分
+    with WdfCache(wdf_path) as cache:
+        entries = cache.entries
+        hash_vals, rows = cache.match(sample_paths, algo_name, case_sensitive, seed)
+    offsets = entries['offset'].tolist()
+    sizes = entries['size'].tolist()
+    matched_items = [
+        (path, hash_val, offsets[row], sizes[row])
+        for path, hash_val, row in zip(sample_paths, hash_vals.tolist(), rows.tolist()) if row >= 0
+    ]
+    if index_dir:
+        with open_name_index(index_dir, algo_name, case_sensitive, seed) as index:
+            index.merge(sample_paths, hash_vals)
+    return export_matched_files(wdf_path, matched_items, out_dir, deflate=deflate, dedup=dedup)
+
+def export_by_name_index(
+    wdf_path, index_dir, out_dir,
+    algo_name, case_sensitive=False, seed=None
+):
+    """
+    不读lst，直接用反查索引为WDF中的全部uid找回名称并导出命中资源。
+    返回导出统计信息。
+    """
+    index_entries = parse_wdf_index(wdf_path)
+    with open_name_index(index_dir, algo_name, case_sensitive, seed) as index:
+        names = index.lookup([e['uid'] for e in index_entries])
+    matched_items = [
+        (name, e['uid'], e['offset'], e['size'])
+        for name, e in zip(names, index_entries) if name
+    ]
+    return export_matched_files(wdf_path, matched_items, out_dir)
+
+def main():
+    parser = argparse.ArgumentParser(description='按lst从WDF包（或WDF目录）导出命中资源')
+    parser.add_argument('wdf', help='WDF包，或包含多个WDF包的目录')
+    parser.add_argument('lst', help='lst路径列表')
+    parser.add_argument('-o', '--out', help='导出目录或 .tar/.tar.gz/.tgz/.zip 文件，'
+                        '省略且标准输出被重定向时以 tar 写到标准输出')
+    parser.add_argument('--algo', default='wdfpck_hash')
+    parser.add_argument('--case-sensitive', action='store_true')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--deflate', action='store_true', help='zip 使用 deflate 压缩（默认 stored）')
+    parser.add_argument('--dedup', choices=DEDUP_MODES, help='按内容去重，重复资源用硬链接或 reflink')
+    args = parser.parse_args()
+    out = args.out
+    if out is None:
+        if sys.stdout.isatty():
+            parser.error('请用 -o 指定输出，或把标准输出重定向到管道/文件')
+        out = '-'
+    if args.dedup and is_archive_target(out):
+        parser.error('--dedup 只能用于导出到目录')
+    # 标准输出可能是数据流，日志与统计信息都写到标准错误
+    with contextlib.redirect_stdout(sys.stderr):
+        stats = export_by_lst(args.wdf, args.lst, out, args.algo, args.case_sensitive, args.seed,
+                              deflate=args.deflate, dedup=args.dedup)
+        print(format_stats(stats))
+        if 'by_ext' in stats:
+            print(format_dedup(stats))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,670 @@
+import os
+import sys
+import time
+import zlib
+import hashlib
+import struct
+import tarfile
+import zipfile
+import threading
+import collections
+import concurrent.futures
+
+# 相邻资源间隔不超过 DEFAULT_GAP 时合并为一次读取（HDD可调大，SSD可调小）
+DEFAULT_GAP = 64 * 1024
+# 单次合并读取的上限，超过此大小的单个资源按块流式拷贝
+DEFAULT_MAX_READ = 16 * 1024 * 1024
+# 流式拷贝（tar 写入、用户态回退拷贝）的单次读写大小
+COPY_CHUNK = 1024 * 1024
+
+def plan_reads(items, gap=DEFAULT_GAP, max_read=DEFAULT_MAX_READ):
+    """
+    按偏移排序资源，把相邻或间隔很小的资源合并为大块顺序读取。
+    items: [(out_path, offset, size, ...)]，元组第4项起为调用方自定义数据
+    返回 [(起点, 终点, [item...])]，按偏移升序。
+    """
+    batches = []
+    cur = None
+    for item in sorted(items, key=lambda it: it[1]):
+        offset, size = item[1], item[2]
+        end = offset + size
+        if cur is not None and offset - cur[1] <= gap and max(end, cur[1]) - cur[0] <= max_read:
+            cur[1] = max(cur[1], end)
+            cur[2].append(item)
+        else:
+            cur = [offset, end, [item]]
+            batches.append(cur)
+    return [(start, end, batch) for start, end, batch in batches]
+
+def read_exact(f, start, view):
+    # 从 start 处读满 view，文件被截断时返回实际读到的字节数
+    f.seek(start)
+    got = 0
+    while got < len(view):
+        n = f.readinto(view[got:])
+        if not n:
+            break
+        got += n
+    return got
+
+class DirCache:
+    """批量建目录：同一目录只调用一次 makedirs"""
+    def __init__(self):
+        self.made = set()
+
+    def ensure(self, file_path):
+        d = os.path.dirname(file_path)
+        if d and d not in self.made:
+            os.makedirs(d, exist_ok=True)
+            self.made.add(d)
+
+def remove_existing(path):
+    # 输出前先删除旧文件而不是原地截断：上次去重导出留下的硬链接共享同一 inode，截断会改写其他文件
+    if os.path.lexists(path):
+        os.remove(path)
+
+def open_output(path):
+    """以新文件打开输出路径（先删除已有文件）"""
+    remove_existing(path)
+    return open(path, 'wb')
+
+def new_stats():
+    return {'files': 0, 'bytes': 0, 'read_bytes': 0, 'reads': 0, 'seconds': 0.0, 'mb_per_s': 0.0}
+
+def finish_stats(stats, start_time):
+    stats['seconds'] = time.time() - start_time
+    if stats['seconds'] > 0:
+        stats['mb_per_s'] = stats['bytes'] / 1048576 / stats['seconds']
+    return stats
+
+def format_stats(stats):
+    text = (f"导出 {stats['files']} 个文件，{stats['bytes'] / 1048576:.1f} MB，"
+            f"读取 {stats['reads']} 次共 {stats['read_bytes'] / 1048576:.1f} MB，"
+            f"用时 {stats['seconds']:.2f} 秒，{stats['mb_per_s']:.1f} MB/s")
+    if stats.get('skipped'):
+        text += f"，跳过已完成 {stats['skipped']} 个"
+    if stats.get('methods'):
+        text += '，拷贝方式: ' + ', '.join(f'{k}×{v}' for k, v in stats['methods'].items())
+    return text
+
+def stream_range(f, start, end, view, stats):
+    # 超大资源按块读取，每次产出 view 上的一段（下次迭代前有效）
+    pos = start
+    while pos < end:
+        got = read_exact(f, pos, view[:min(len(view), end - pos)])
+        if not got:
+            break
+        stats['reads'] += 1
+        stats['read_bytes'] += got
+        yield view[:got]
+        pos += got
+
+def iter_planned(f, items, gap=DEFAULT_GAP, max_read=DEFAULT_MAX_READ, stats=None):
+    """
+    按合并读取计划依次产出 (item, chunks)，chunks 为资源数据的 memoryview 分块。
+    数据位于复用的读缓冲区中，必须在取下一项之前消费完。
+    """
+    stats = stats if stats is not None else new_stats()
+    view = memoryview(bytearray(max_read))
+    for start, end, batch in plan_reads(items, gap, max_read):
+        length = end - start
+        if length > max_read:
+            # 单个超大资源：按块流式拷贝，不整块读入内存
+            yield batch[0], stream_range(f, start, end, view, stats)
+            continue
+        got = read_exact(f, start, view[:length])
+        stats['reads'] += 1
+        stats['read_bytes'] += got
+        for item in batch:
+            lo = item[1] - start
+            hi = min(lo + item[2], got)
+            yield item, (view[lo:max(lo, hi)],)
+
+def extract_planned(
+    wdf_path, items, gap=DEFAULT_GAP, max_read=DEFAULT_MAX_READ,
+    on_file=None, on_error=None
+):
+    """
+    按偏移顺序合并读取并拆分写出资源。
+    items: [(out_path, offset, size, ...)]
+    on_file(item): 每写完一个文件回调
+    on_error(item, exc): 单个文件写出失败或数据不完整时回调（不中断整体导出）
+    返回统计信息 {files, bytes, read_bytes, reads, seconds, mb_per_s}。
+    """
+    stats = new_stats()
+    start_time = time.time()
+    dirs = DirCache()
+    with open(wdf_path, 'rb', buffering=0) as f:
+        for item, chunks in iter_planned(f, items, gap, max_read, stats):
+            try:
+                dirs.ensure(item[0])
+                written = 0
+                with open_output(item[0]) as out_f:
+                    for chunk in chunks:
+                        out_f.write(chunk)
+                        written += len(chunk)
+                if written != item[2]:
+                    # 包被截断等情况下读到的数据不足，删除不完整的输出，不能算作成功
+                    remove_existing(item[0])
+                    raise IOError(f"数据不完整: 应为 {item[2]} 字节，实际 {written} 字节")
+                stats['files'] += 1
+                stats['bytes'] += written
+                if on_file:
+                    on_file(item)
+            except Exception as e:
+                if on_error:
+                    on_error(item, e)
+    return finish_stats(stats, start_time)
+
+# ---- 去重导出：相同内容只写一次，其余用硬链接/reflink ----
+# Linux FICLONE ioctl，在 btrfs/xfs 等文件系统上共享数据块
+FICLONE = 0x40049409
+DEDUP_MODES = ('hardlink', 'reflink')
+
+def fast_digest(chunks):
+    h = hashlib.blake2b(digest_size=16)
+    for chunk in chunks:
+        h.update(chunk)
+    return h.digest()
+
+def link_file(src_path, dst_path, mode='hardlink'):
+    """把 dst_path 建为 src_path 的硬链接或 reflink，不支持时抛出 OSError"""
+    if mode == 'reflink':
+        import fcntl
+        with open(src_path, 'rb') as src, open_output(dst_path) as dst:
+            try:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            except OSError:
+                dst.close()
+                os.remove(dst_path)
+                raise
+    else:
+        remove_existing(dst_path)
+        os.link(src_path, dst_path)
+
+def chunks_size(chunks):
+    return sum(len(chunk) for chunk in chunks)
+
+def extract_dedup(
+    wdf_path, items, mode='hardlink', gap=DEFAULT_GAP, max_read=DEFAULT_MAX_READ,
+    on_file=None, on_error=None, seen=None
+):
+    """
+    去重导出：边读边按 (大小, blake2b) 计算指纹，每份内容只写一次，
+    重复内容用硬链接（mode='hardlink'）或 reflink（mode='reflink'）指向第一份；
+    偏移和大小相同的资源直接视为重复，不再计算指纹。链接失败时退回普通写入。
+    数据不完整（包被截断）的资源报告给 on_error，不参与去重也不计入统计。
+    seen: 指纹 -> 第一份文件路径，多个包共用同一个 dict 时跨包去重。
+    返回统计信息，另含 written（实际写入字节）、saved（节省字节）、linked（链接数）
+    和按扩展名汇总的 by_ext。
+    """
+    stats = new_stats()
+    stats.update({'written': 0, 'saved': 0, 'linked': 0, 'by_ext': {}})
+    start_time = time.time()
+    dirs = DirCache()
+    first = seen if seen is not None else {}    # 指纹 -> 第一份文件路径
+    by_range = {}   # (offset, size) -> 指纹
+    with open(wdf_path, 'rb', buffering=0) as f:
+        for item, chunks in iter_planned(f, items, gap, max_read, stats):
+            out_path, offset, size = item[0], item[1], item[2]
+            ext = os.path.splitext(out_path)[1].lower() or '(无扩展名)'
+            try:
+                dirs.ensure(out_path)
+                key = by_range.get((offset, size))
+                if key is None and isinstance(chunks, tuple):
+                    # 已整块读入缓冲区的资源先算指纹；超大资源边写边算
+                    got = chunks_size(chunks)
+                    if got != size:
+                        remove_existing(out_path)
+                        raise IOError(f"数据不完整: 应为 {size} 字节，实际 {got} 字节")
+                    key = (size, fast_digest(chunks))
+                src = first.get(key) if key is not None else None
+                linked = False
+                if src is not None and src != out_path:
+                    try:
+                        link_file(src, out_path, mode)
+                        linked = True
+                    except OSError:
+                        pass
+                if linked:
+                    written = 0
+                    stats['linked'] += 1
+                else:
+                    h = hashlib.blake2b(digest_size=16) if key is None else None
+                    written = 0
+                    with open_output(out_path) as out_f:
+                        for chunk in chunks:
+                            out_f.write(chunk)
+                            if h:
+                                h.update(chunk)
+                            written += len(chunk)
+                    if written != size:
+                        # 包被截断等情况下读到的数据不足，删除不完整的输出，也不作为去重的源
+                        remove_existing(out_path)
+                        raise IOError(f"数据不完整: 应为 {size} 字节，实际 {written} 字节")
+                    if key is None:
+                        key = (size, h.digest())
+                        if key in first:
+                            # 写完才知道重复的超大资源，改为链接
+                            try:
+                                link_file(first[key], out_path, mode)
+                                stats['linked'] += 1
+                                written = 0
+                            except OSError:
+                                pass
+                ext_stats = stats['by_ext'].setdefault(ext, {'files': 0, 'unique': 0, 'bytes': 0, 'written': 0})
+                if key not in first:
+                    first[key] = out_path
+                    ext_stats['unique'] += 1
+                by_range[(offset, size)] = key
+                stats['files'] += 1
+                stats['bytes'] += size
+                stats['written'] += written
+                ext_stats['files'] += 1
+                ext_stats['bytes'] += size
+                ext_stats['written'] += written
+                if on_file:
+                    on_file(item)
+            except Exception as e:
+                if on_error:
+                    on_error(item, e)
+    stats['saved'] = stats['bytes'] - stats['written']
+    return finish_stats(stats, start_time)
+
+def format_dedup(stats, limit=20):
+    """去重结果：总节省空间、去重率（逻辑大小/实际写入）及按扩展名的明细"""
+    def ratio(total, written):
+        return total / written if written else 1.0
+    lines = [f"去重: 链接 {stats['linked']} 个文件，节省 {stats['saved'] / 1048576:.1f} MB，"
+             f"去重率 {ratio(stats['bytes'], stats['written']):.2f}x"]
+    rows = sorted(stats['by_ext'].items(), key=lambda kv: kv[1]['written'] - kv[1]['bytes'])
+    for ext, e in rows[:limit]:
+        lines.append(f"  {ext:<12} 文件 {e['files']:>7}  唯一 {e['unique']:>7}  "
+                     f"节省 {(e['bytes'] - e['written']) / 1048576:>9.1f} MB  {ratio(e['bytes'], e['written']):.2f}x")
+    return '\n'.join(lines)
+
+# ---- 打包导出：直接流式写入单个 tar/zip，不生成单独的文件 ----
+ARCHIVE_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.zip')
+
+def is_archive_target(out):
+    """导出目标是否为 tar/zip 文件或标准输出('-')"""
+    return out == '-' or str(out).lower().endswith(ARCHIVE_SUFFIXES)
+
+def member_name(path):
+    # 包内成员名统一使用 / 分隔的相对路径
+    return path.replace('\\', '/').lstrip('/')
+
+class ChunkReader:
+    """把 memoryview 分块包装为只读文件对象，供 tarfile 按固定大小读取"""
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.cur = memoryview(b'')
+
+    def read(self, n=-1):
+        parts = []
+        while n < 0 or n > 0:
+            if not len(self.cur):
+                self.cur = next(self.chunks, None)
+                if self.cur is None:
+                    self.cur = memoryview(b'')
+                    break
+                continue
+            take = len(self.cur) if n < 0 else min(n, len(self.cur))
+            parts.append(self.cur[:take])
+            self.cur = self.cur[take:]
+            if n > 0:
+                n -= take
+        if len(parts) == 1:
+            return parts[0]
+        return b''.join(parts)
+
+class TarSink:
+    """流式写 tar（可选 gzip），目标可以是不可 seek 的管道"""
+    def __init__(self, fileobj, gzip=False):
+        self.tar = tarfile.open(fileobj=fileobj, mode='w|gz' if gzip else 'w|', copybufsize=COPY_CHUNK)
+        self.mtime = int(time.time())
+
+    def add(self, name, size, chunks):
+        info = tarfile.TarInfo(member_name(name))
+        info.size = size
+        info.mtime = self.mtime
+        info.mode = 0o644
+        self.tar.addfile(info, ChunkReader(chunks))
+
+    def close(self):
+        self.tar.close()
+
+class ZipSink:
+    """流式写 zip，stored 或 deflate；目标不可 seek 时使用数据描述符"""
+    def __init__(self, fileobj, deflate=False):
+        self.compression = zipfile.ZIP_DEFLATED if deflate else zipfile.ZIP_STORED
+        self.zf = zipfile.ZipFile(fileobj, 'w', compression=self.compression, allowZip64=True)
+        self.date_time = time.localtime()[:6]
+
+    def add(self, name, size, chunks):
+        info = zipfile.ZipInfo(member_name(name), date_time=self.date_time)
+        info.compress_type = self.compression
+        info.file_size = size
+        with self.zf.open(info, 'w', force_zip64=size >= zipfile.ZIP64_LIMIT) as w:
+            for chunk in chunks:
+                w.write(chunk)
+
+    def close(self):
+        self.zf.close()
+
+class open_sink:
+    """
+    打开 tar/zip 导出目标，用法: with open_sink(target) as sink。
+    target 为 '-' 时写到标准输出；格式按扩展名判断（.zip / .tar.gz / .tgz / 其余为 tar）。
+    """
+    def __init__(self, target, deflate=False):
+        self.target = target
+        lower = str(target).lower()
+        if target == '-':
+            # 用进程真正的标准输出，调用方可把 print 重定向到标准错误
+            self.fileobj = sys.__stdout__.buffer
+            self.owned = False
+        else:
+            self.fileobj = open(target, 'wb')
+            self.owned = True
+        if lower.endswith('.zip'):
+            self.sink = ZipSink(self.fileobj, deflate)
+        else:
+            self.sink = TarSink(self.fileobj, gzip=lower.endswith(('.tar.gz', '.tgz')))
+
+    def __enter__(self):
+        return self.sink
+
+    def __exit__(self, *exc):
+        try:
+            self.sink.close()
+        finally:
+            if self.owned:
+                self.fileobj.close()
+            else:
+                self.fileobj.flush()
+
+def extract_to_sink(
+    wdf_path, items, sink, gap=DEFAULT_GAP, max_read=DEFAULT_MAX_READ, on_file=None
+):
+    """
+    按偏移顺序合并读取，把资源直接写入 tar/zip（见 open_sink），不落地单个文件。
+    items: [(成员名, offset, size, ...)]，同名成员只保留偏移最大的一个
+    返回统计信息。写入中途失败会破坏整个包，因此异常直接抛出。
+    """
+    stats = new_stats()
+    start_time = time.time()
+    file_size = os.path.getsize(wdf_path)
+    unique = {}
+    for item in sorted(items, key=lambda it: it[1]):
+        # 资源超出文件范围时按实际可读长度写入，保证成员头中的大小准确
+        size = max(0, min(item[2], file_size - item[1]))
+        unique[item[0]] = (item[0], item[1], size) + tuple(item[3:])
+    with open(wdf_path, 'rb', buffering=0) as f:
+        for item, chunks in iter_planned(f, list(unique.values()), gap, max_read, stats):
+            sink.add(item[0], item[2], chunks)
+            stats['files'] += 1
+            stats['bytes'] += item[2]
+            if on_file:
+                on_file(item)
+    return finish_stats(stats, start_time)
+
+# ---- 并行导出：有界线程池 + 内核态拷贝 ----
+DEFAULT_WORKERS = 4
+# 每个线程允许的在途字节数（已提交但尚未写完）
+DEFAULT_INFLIGHT_BYTES = 32 * 1024 * 1024
+O_BINARY = getattr(os, 'O_BINARY', 0)
+
+def kernel_copy(src_fd, dst_fd, offset, size):
+    """
+    把归档 [offset, offset+size) 直接拷贝到输出fd，返回 (拷贝字节数, 方式)。
+    优先 os.copy_file_range，其次 os.sendfile（Linux），都不可用时用 lseek+read/write。
+    任一方式返回 0 字节（已到包末尾）即停止，返回的字节数可能小于 size，由调用方检查。
+    """
+    if hasattr(os, 'copy_file_range'):
+        try:
+            done = 0
+            while done < size:
+                n = os.copy_file_range(src_fd, dst_fd, size - done, offset + done)
+                if not n:
+                    break
+                done += n
+            return done, 'copy_file_range'
+        except OSError:
+            # 跨文件系统或内核不支持时改用其他方式，已写入的部分从头重写
+            os.lseek(dst_fd, 0, os.SEEK_SET)
+            os.ftruncate(dst_fd, 0)
+    if hasattr(os, 'sendfile') and sys.platform.startswith('linux'):
+        try:
+            done = 0
+            while done < size:
+                n = os.sendfile(dst_fd, src_fd, offset + done, size - done)
+                if not n:
+                    break
+                done += n
+            return done, 'sendfile'
+        except OSError:
+            os.lseek(dst_fd, 0, os.SEEK_SET)
+            os.ftruncate(dst_fd, 0)
+    done = 0
+    os.lseek(src_fd, offset, os.SEEK_SET)
+    while done < size:
+        chunk = os.read(src_fd, min(COPY_CHUNK, size - done))
+        if not chunk:
+            break
+        view = memoryview(chunk)
+        while len(view):
+            n = os.write(dst_fd, view)
+            if not n:
+                raise IOError(f"写入失败: 已写入 {done} 字节")
+            view = view[n:]
+            done += n
+    return done, 'read/write'
+
+class SourceFds:
+    """每个线程持有自己的归档fd（互不干扰读位置），结束时统一关闭"""
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.fds = []
+
+    def get(self):
+        fd = getattr(self.local, 'fd', None)
+        if fd is None:
+            fd = os.open(self.path, os.O_RDONLY | O_BINARY)
+            self.local.fd = fd
+            with self.lock:
+                self.fds.append(fd)
+        return fd
+
+    def close(self):
+        for fd in self.fds:
+            os.close(fd)
+        self.fds = []
+
+def copy_item(sources, item):
+    out_path, offset, size = item[0], item[1], item[2]
+    remove_existing(out_path)
+    dst_fd = os.open(out_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | O_BINARY, 0o644)
+    try:
+        return kernel_copy(sources.get(), dst_fd, offset, size)
+    finally:
+        os.close(dst_fd)
+
+def extract_parallel(
+    wdf_path, items, workers=DEFAULT_WORKERS, inflight_bytes=DEFAULT_INFLIGHT_BYTES,
+    on_file=None, on_error=None
+):
+    """
+    并行导出：有界线程池按偏移顺序提交拷贝任务，尽量在内核态完成拷贝。
+    items: [(out_path, offset, size, ...)]
+    workers: 线程数
+    inflight_bytes: 每个线程的在途字节上限，总上限为 workers * inflight_bytes
+    回调按提交顺序（偏移顺序）触发，输出顺序与线程调度无关。
+    返回统计信息，含实际使用的拷贝方式。
+    """
+    stats = new_stats()
+    stats['methods'] = {}
+    start_time = time.time()
+    # 同一输出路径只保留最后一个，保证结果确定
+    unique = {}
+    for item in sorted(items, key=lambda it: it[1]):
+        unique[item[0]] = item
+    ordered = sorted(unique.values(), key=lambda it: it[1])
+    # 提前批量建目录
+    for d in sorted({os.path.dirname(item[0]) for item in ordered}):
+        if d:
+            os.makedirs(d, exist_ok=True)
+    limit = max(1, workers) * inflight_bytes
+    sources = SourceFds(wdf_path)
+    pending = collections.deque()
+    inflight = [0]
+
+    def collect():
+        item, future = pending.popleft()
+        inflight[0] -= item[2]
+        try:
+            copied, method = future.result()
+            if copied != item[2]:
+                # 包被截断等情况下拷贝不足，删除不完整的输出，不能算作成功
+                remove_existing(item[0])
+                raise IOError(f"数据不完整: 应为 {item[2]} 字节，实际 {copied} 字节")
+            stats['files'] += 1
+            stats['bytes'] += copied
+            stats['read_bytes'] += copied
+            stats['reads'] += 1
+            stats['methods'][method] = stats['methods'].get(method, 0) + 1
+            if on_file:
+                on_file(item)
+        except Exception as e:
+            if on_error:
+                on_error(item, e)
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for item in ordered:
+                while pending and inflight[0] + item[2] > limit:
+                    collect()
+                pending.append((item, executor.submit(copy_item, sources, item)))
+                inflight[0] += item[2]
+            while pending:
+                collect()
+    finally:
+        sources.close()
+    return finish_stats(stats, start_time)
+
+# ---- 可续传导出：只追加的完成日志 ----
+# 日志头记录包的大小和 mtime，包变化后旧日志作废；
+# 之后每完成一个文件追加一条 (uid, offset, size) 记录，每条16字节。
+JOURNAL_MAGIC = b'WDFR'
+JOURNAL_VERSION = 1
+JOURNAL_HEAD_FMT = '<4sIQQ'  # magic, version, 包大小, 包mtime(ns)
+JOURNAL_HEAD_SIZE = struct.calcsize(JOURNAL_HEAD_FMT)
+JOURNAL_REC_FMT = '<IQI'     # uid, offset, size
+JOURNAL_REC_SIZE = struct.calcsize(JOURNAL_REC_FMT)
+# 每追加多少条记录落盘一次，崩溃时最多重做这么多个文件
+JOURNAL_FLUSH_EVERY = 256
+
+def default_uid(item):
+    # 调用方未提供uid时用输出路径的crc32代替
+    return zlib.crc32(item[0].encode('utf-8', errors='surrogatepass'))
+
+class ExtractJournal:
+    """
+    导出完成日志：中断后重新运行时跳过已完成的文件。
+    已记录的文件还要校验磁盘上的大小，被删除或被截断的文件会重新导出。
+    """
+    def __init__(self, path, wdf_path):
+        self.path = path
+        st = os.stat(wdf_path)
+        self.head = struct.pack(JOURNAL_HEAD_FMT, JOURNAL_MAGIC, JOURNAL_VERSION, st.st_size, st.st_mtime_ns)
+        self.done = set()
+        self.pending = 0
+        self.load()
+        self.f = open(path, 'ab')
+        if self.f.tell() == 0:
+            self.f.write(self.head)
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        if data[:JOURNAL_HEAD_SIZE] != self.head:
+            # 包已变化或日志损坏，重新开始
+            os.remove(self.path)
+            return
+        body = data[JOURNAL_HEAD_SIZE:]
+        # 末尾未写完整的记录直接忽略
+        body = body[:len(body) - len(body) % JOURNAL_REC_SIZE]
+        self.done = set(struct.iter_unpack(JOURNAL_REC_FMT, body))
+        if len(body) + JOURNAL_HEAD_SIZE != len(data):
+            with open(self.path, 'r+b') as f:
+                f.truncate(len(body) + JOURNAL_HEAD_SIZE)
+
+    def is_done(self, item, uid):
+        if (uid, item[1], item[2]) not in self.done:
+            return False
+        try:
+            return os.path.getsize(item[0]) == item[2]
+        except OSError:
+            return False
+
+    def record(self, item, uid):
+        self.f.write(struct.pack(JOURNAL_REC_FMT, uid, item[1], item[2]))
+        self.pending += 1
+        if self.pending >= JOURNAL_FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.pending = 0
+
+    def close(self):
+        self.flush()
+        self.f.close()
+
+def extract_resumable(
+    wdf_path, items, journal_path, workers=1, gap=DEFAULT_GAP, max_read=DEFAULT_MAX_READ,
+    inflight_bytes=DEFAULT_INFLIGHT_BYTES, on_file=None, on_error=None, uid_of=default_uid
+):
+    """
+    带完成日志的导出，顺序（workers=1）和并行两种方式都适用。
+    日志中已完成且磁盘大小一致的文件直接跳过，其余照常导出；
+    全部成功后删除日志，有失败时保留日志供下次续传。
+    uid_of(item): 取资源uid，默认用输出路径的crc32。
+    返回统计信息，另含 skipped（跳过数）。
+    """
+    journal = ExtractJournal(journal_path, wdf_path)
+    todo = []
+    skipped = 0
+    for item in items:
+        if journal.is_done(item, uid_of(item)):
+            skipped += 1
+        else:
+            todo.append(item)
+    failed = [0]
+
+    def record(item):
+        journal.record(item, uid_of(item))
+        if on_file:
+            on_file(item)
+
+    def error(item, e):
+        failed[0] += 1
+        if on_error:
+            on_error(item, e)
+
+    try:
+        if workers > 1:
+            stats = extract_parallel(wdf_path, todo, workers, inflight_bytes, record, error)
+        else:
+            stats = extract_planned(wdf_path, todo, gap, max_read, record, error)
+    finally:
+        journal.close()
+    if not failed[0]:
+        os.remove(journal_path)
+    stats['skipped'] = skipped
+    return stats
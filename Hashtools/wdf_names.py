@@ -0,0 +1,142 @@
+import os
+import fnmatch
+import argparse
+import numpy as np
+from wdf_archive import WdfArchive
+
+# 32字节索引项内嵌的文件名长度（超长的名称在打包时已被截断）
+NAME_SIZE = 16
+GLOB_CHARS = '*?['
+
+def name_key(name):
+    """查询名称 → 名称表中的键：取路径最后一段，小写，截断到16字节"""
+    base = name.replace('\\', '/').rsplit('/', 1)[-1].lower()
+    return base.encode('utf-8', errors='ignore')[:NAME_SIZE]
+
+def decode_names(raw):
+    """
+    一次向量化处理全部内嵌名：截断到第一个NUL、ASCII 转小写。
+    raw: 'S16' 数组，返回同形状的 'S16' 数组（numpy 比较时忽略末尾的NUL）。
+    """
+    buf = np.frombuffer(np.ascontiguousarray(raw, dtype=f'S{NAME_SIZE}').tobytes(), dtype=np.uint8)
+    buf = buf.reshape(-1, NAME_SIZE).copy()
+    # 第一个NUL之后的字节可能是残留数据，全部清零
+    after_nul = np.cumsum(buf == 0, axis=1) > 0
+    buf[after_nul] = 0
+    upper = (buf >= ord('A')) & (buf <= ord('Z'))
+    buf[upper] += 32
+    return buf.view(f'S{NAME_SIZE}').ravel()
+
+class EmbeddedNames:
+    """
+    32字节索引项内嵌文件名的有序名称表，按名称（不区分大小写）前缀/通配符查找，
+    直接得到索引行号，不需要lst，也不需要计算哈希。
+    16字节索引项的包没有内嵌名，名称表为空。
+    """
+    def __init__(self, archive):
+        if archive.has_names and len(archive.entries):
+            keys = decode_names(archive.entries['name'])
+        else:
+            keys = np.empty(0, dtype=f'S{NAME_SIZE}')
+        self.order = np.argsort(keys, kind='stable')
+        self.keys = keys[self.order]
+        self.archive = archive
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _range(self, key):
+        """名称以 key 开头的行在有序表中的区间 [lo, hi)"""
+        lo = int(np.searchsorted(self.keys, key, 'left'))
+        if len(key) >= NAME_SIZE:
+            hi = int(np.searchsorted(self.keys, key, 'right'))
+        else:
+            hi = int(np.searchsorted(self.keys, key + b'\xff', 'left'))
+        return lo, hi
+
+    def prefix(self, prefix):
+        """名称以 prefix 开头的索引行号（按名称排序）"""
+        lo, hi = self._range(name_key(prefix))
+        return self.order[lo:hi]
+
+    def find(self, name):
+        """名称完全相同的索引行号（同名资源可能有多条）"""
+        key = name_key(name)
+        lo = int(np.searchsorted(self.keys, key, 'left'))
+        hi = int(np.searchsorted(self.keys, key, 'right'))
+        return self.order[lo:hi]
+
+    def glob(self, pattern):
+        """
+        通配符查找（fnmatch 语法，不区分大小写，只匹配名称本身）。
+        通配符之前的固定部分先用于缩小范围，再逐个匹配。
+        """
+        pattern = pattern.replace('\\', '/').rsplit('/', 1)[-1].lower()
+        cut = min([pattern.find(c) for c in GLOB_CHARS if c in pattern] or [len(pattern)])
+        if cut == len(pattern):
+            return self.find(pattern)
+        lo, hi = self._range(pattern[:cut].encode('utf-8', errors='ignore')[:NAME_SIZE])
+        names = [k.decode('utf-8', errors='ignore') for k in self.keys[lo:hi].tolist()]
+        hit = np.fromiter((fnmatch.fnmatchcase(n, pattern) for n in names), dtype=bool, count=len(names))
+        return self.order[lo:hi][hit]
+
+    def match(self, patterns):
+        """按多个名称/通配符查找，返回 (去重后的行号数组, 未命中的模式列表)"""
+        found = []
+        missing = []
+        for pattern in patterns:
+            rows = self.glob(pattern) if any(c in pattern for c in GLOB_CHARS) else self.find(pattern)
+            if len(rows):
+                found.append(rows)
+            else:
+                missing.append(pattern)
+        rows = np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+        return rows, missing
+
+    def listing(self):
+        """按名称排序的 [(名称, uid)]，名称保留包内原始大小写"""
+        names = self.archive.names()
+        uids = self.archive.entries['uid']
+        return [(names[row], int(uids[row])) for row in self.order.tolist() if names[row]]
+
+    def items(self, rows, out_dir):
+        """
+        把行号转换为导出项 [(out_path, offset, size, name, uid)]。
+        内嵌名只有文件名部分，同名资源第二个起写为 <uid>_<名称>。
+        """
+        names = self.archive.names()
+        entries = self.archive.entries
+        used = set()
+        items = []
+        for row in sorted(int(r) for r in rows):
+            e = entries[row]
+            uid = int(e['uid'])
+            name = names[row] or f'{uid:08X}'
+            out_name = name if name.lower() not in used else f'{uid:08X}_{name}'
+            used.add(out_name.lower())
+            items.append((os.path.join(out_dir, out_name), int(e['offset']), int(e['size']), name, uid))
+        return items
+
+def main():
+    parser = argparse.ArgumentParser(description='按WDF索引内嵌的文件名列出/查找资源（不计算哈希）')
+    parser.add_argument('wdf', help='.wdf文件（32字节索引项）')
+    parser.add_argument('patterns', nargs='*', help='名称或通配符，省略时列出全部')
+    parser.add_argument('--prefix', action='store_true', help='把参数当作名称前缀')
+    args = parser.parse_intermixed_args()
+    with WdfArchive(args.wdf) as archive:
+        table = EmbeddedNames(archive)
+        if not len(table):
+            print('该包没有内嵌文件名（16字节索引项）')
+            return
+        if not args.patterns:
+            rows = table.order
+        elif args.prefix:
+            rows = np.unique(np.concatenate([table.prefix(p) for p in args.patterns]))
+        else:
+            rows, _ = table.match(args.patterns)
+        names = archive.names()
+        for row in rows.tolist():
+            print(f"{names[row]} | {int(archive.entries['uid'][row]):08X} | {int(archive.entries['size'][row])}")
+
+if __name__ == '__main__':
+    main()
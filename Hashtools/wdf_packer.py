@@ -0,0 +1,192 @@
+import os
+import sys
+import time
+import struct
+import argparse
+import concurrent.futures
+import numpy as np
+from hash_algorithms import calc_hash_batch
+from wdf_archive import WDF_HEADER_FMT, WDF_HEADER_SIZE
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 默认对齐与索引项宽度（16字节为 uid/offset/size/space，32字节附带内嵌文件名）
+DEFAULT_ALIGN = 16
+DEFAULT_ENTRY_SIZE = 16
+# 计算uid时每个线程处理的路径数
+HASH_CHUNK = 65536
+COPY_CHUNK = 1024 * 1024
+
+def align_up(n, align):
+    return (n + align - 1) // align * align
+
+def uid_batch_func(algo_name, case_sensitive=False, seed=None):
+    """
+    返回批量计算uid的函数。
+    wdf_string_id 与 core_unipacker.wdf_unpack 解包时使用的算法一致，其余为 calc_hash 支持的算法。
+    """
+    if algo_name == 'wdf_string_id':
+        if ROOT_DIR not in sys.path:
+            sys.path.append(ROOT_DIR)
+        from core_unipacker import wdf_string_id_batch
+        return wdf_string_id_batch
+    return lambda paths: calc_hash_batch(algo_name, paths, case_sensitive, seed)
+
+def compute_uids(paths, algo_name='wdf_string_id', case_sensitive=False, seed=None, threads=1):
+    """分块并行计算路径的uid，返回 numpy.uint32 数组"""
+    func = uid_batch_func(algo_name, case_sensitive, seed)
+    chunks = [paths[i:i + HASH_CHUNK] for i in range(0, len(paths), HASH_CHUNK)]
+    if threads <= 1 or len(chunks) <= 1:
+        parts = [func(chunk) for chunk in chunks]
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+            parts = list(executor.map(func, chunks))
+    return np.concatenate(parts).astype(np.uint32) if parts else np.empty(0, dtype=np.uint32)
+
+def find_collisions(paths, uids):
+    """返回 {uid: [路径...]}，只包含被多个路径共用的uid"""
+    uids = np.asarray(uids, dtype=np.uint32)
+    values, counts = np.unique(uids, return_counts=True)
+    dup = set(values[counts > 1].tolist())
+    collisions = {}
+    for path, uid in zip(paths, uids.tolist()):
+        if uid in dup:
+            collisions.setdefault(uid, []).append(path)
+    return collisions
+
+def collect_files(src_dir):
+    """递归收集目录下的文件，返回 [(相对路径, 绝对路径, 大小)]，相对路径使用 / 分隔"""
+    files = []
+    for dirpath, _, filenames in os.walk(src_dir):
+        for fname in filenames:
+            abs_path = os.path.join(dirpath, fname)
+            rel_path = os.path.relpath(abs_path, src_dir).replace(os.sep, '/')
+            files.append((rel_path, abs_path, os.path.getsize(abs_path)))
+    files.sort(key=lambda f: f[0])
+    return files
+
+class WdfWriter:
+    """
+    流式写出WDF包：资源按 align 对齐依次写入，space 为对齐后的占用空间，
+    close() 时写出按uid排序的索引表并回填文件头。
+    先写入临时文件，完成后整体替换目标文件。
+    """
+    def __init__(self, path, align=DEFAULT_ALIGN, entry_size=DEFAULT_ENTRY_SIZE, magic=b'WDFP'):
+        self.path = path
+        self.tmp_path = path + '.tmp'
+        self.align = max(1, align)
+        self.entry_size = entry_size
+        self.magic = magic
+        self.entries = []  # (uid, offset, size, space, name)
+        self.f = open(self.tmp_path, 'wb')
+        self.f.write(b'\0' * align_up(WDF_HEADER_SIZE, self.align))
+        self.pos = self.f.tell()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def pad(self, size):
+        space = align_up(size, self.align)
+        if space > size:
+            self.f.write(b'\0' * (space - size))
+        return space
+
+    def add_bytes(self, uid, data, name=''):
+        offset = self.pos
+        self.f.write(data)
+        space = self.pad(len(data))
+        self.entries.append((uid, offset, len(data), space, name))
+        self.pos += space
+
+    def add_stream(self, uid, src, size, name=''):
+        """从文件对象流式拷贝 size 字节，不整体读入内存"""
+        offset = self.pos
+        remain = size
+        while remain > 0:
+            chunk = src.read(min(COPY_CHUNK, remain))
+            if not chunk:
+                raise IOError(f'源数据长度不足: {name}')
+            self.f.write(chunk)
+            remain -= len(chunk)
+        space = self.pad(size)
+        self.entries.append((uid, offset, size, space, name))
+        self.pos += space
+
+    def add_ref(self, uid, offset, size, space, name=''):
+        """追加指向已写入数据的索引项（多个uid共用同一份数据时）"""
+        self.entries.append((uid, offset, size, space, name))
+
+    def add_tombstone(self, uid):
+        """增量包中表示删除的条目：偏移/大小/空间均为0（偏移0处是文件头，不会与真实资源混淆）"""
+        self.entries.append((uid, 0, 0, 0, ''))
+
+    def close(self):
+        index_offset = self.pos
+        for uid, offset, size, space, name in sorted(self.entries, key=lambda e: e[0]):
+            entry = struct.pack('<IIII', uid, offset, size, space)
+            if self.entry_size == 32:
+                entry += os.path.basename(name).encode('utf-8')[:16].ljust(16, b'\0')
+            self.f.write(entry)
+        self.f.seek(0)
+        self.f.write(struct.pack(WDF_HEADER_FMT, self.magic, len(self.entries), index_offset))
+        self.f.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self.f.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+def pack_directory(
+    src_dir, out_path, algo_name='wdf_string_id', case_sensitive=False, seed=None,
+    threads=4, align=DEFAULT_ALIGN, entry_size=DEFAULT_ENTRY_SIZE, log_func=print
+):
+    """
+    把目录打包为WDFP包（生成或重建）。
+    先并行计算全部uid并检查冲突，有冲突时不写文件直接报错；
+    资源按路径顺序流式写入，不整体读入内存。
+    返回统计信息 {files, bytes, seconds, mb_per_s}。
+    """
+    start_time = time.time()
+    files = collect_files(src_dir)
+    paths = [f[0] for f in files]
+    uids = compute_uids(paths, algo_name, case_sensitive, seed, threads)
+    collisions = find_collisions(paths, uids)
+    if collisions:
+        detail = '; '.join(f"0x{uid:08X}: {', '.join(p)}" for uid, p in list(collisions.items())[:20])
+        raise ValueError(f'发现 {len(collisions)} 个uid冲突，未写出文件: {detail}')
+    log_func(f"共 {len(files)} 个文件，uid计算完成，开始写出: {out_path}")
+    total = 0
+    with WdfWriter(out_path, align, entry_size) as writer:
+        for (rel_path, abs_path, size), uid in zip(files, uids.tolist()):
+            with open(abs_path, 'rb') as src:
+                writer.add_stream(uid, src, size, rel_path)
+            total += size
+    seconds = time.time() - start_time
+    stats = {'files': len(files), 'bytes': total, 'seconds': seconds,
+             'mb_per_s': total / 1048576 / seconds if seconds > 0 else 0.0}
+    log_func(f"打包完成: {len(files)} 个文件，{total / 1048576:.1f} MB，用时 {seconds:.2f} 秒")
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description='把目录打包为WDF包')
+    parser.add_argument('src', help='资源目录')
+    parser.add_argument('out', help='输出的.wdf路径')
+    parser.add_argument('--algo', default='wdf_string_id', help='uid算法，默认与 core_unipacker 解包一致')
+    parser.add_argument('--case-sensitive', action='store_true')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--threads', type=int, default=4, help='并行计算uid的线程数')
+    parser.add_argument('--align', type=int, default=DEFAULT_ALIGN, help='资源对齐字节数')
+    parser.add_argument('--entry-size', type=int, choices=(16, 32), default=DEFAULT_ENTRY_SIZE,
+                        help='索引项宽度，32 时附带16字节内嵌文件名')
+    args = parser.parse_args()
+    pack_directory(args.src, args.out, args.algo, args.case_sensitive, args.seed,
+                   args.threads, args.align, args.entry_size)
+
+if __name__ == '__main__':
+    main()
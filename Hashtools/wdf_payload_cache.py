@@ -0,0 +1,156 @@
+import threading
+import collections
+import numpy as np
+from wdf_archive import WdfArchive
+from wdf_cache import archive_fingerprint
+
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+# 预读只针对小资源：超过该大小的邻近资源不预读
+DEFAULT_READAHEAD_MAX_SIZE = 256 * 1024
+
+def fingerprint_key(wdf_path):
+    """缓存键中的包标识：包被修改（大小、mtime 或索引变化）后旧的缓存项自然失效"""
+    fp = archive_fingerprint(wdf_path)
+    return (fp['size'], fp['mtime_ns'], fp['header'], fp['index_crc'])
+
+class PayloadCache:
+    """
+    按字节预算淘汰的LRU资源缓存，键为 (包指纹, 解码函数, uid)，值为资源数据（或 decode 后的结果）。
+    占用按原始数据大小计算；单个资源超过预算的一半时不缓存。线程安全。
+    """
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.items = collections.OrderedDict()  # key -> (value, cost)
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'readahead': 0, 'readahead_hits': 0}
+        self._prefetched = set()
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.items
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                self.counters['misses'] += 1
+                return None
+            self.items.move_to_end(key)
+            self.counters['hits'] += 1
+            if key in self._prefetched:
+                self._prefetched.discard(key)
+                self.counters['readahead_hits'] += 1
+            return item[0]
+
+    def put(self, key, value, cost, prefetched=False):
+        if cost > self.max_bytes // 2:
+            return
+        with self.lock:
+            old = self.items.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self.items[key] = (value, cost)
+            self.bytes += cost
+            if prefetched:
+                self._prefetched.add(key)
+                self.counters['readahead'] += 1
+            while self.bytes > self.max_bytes and self.items:
+                evicted, (_, evicted_cost) = self.items.popitem(last=False)
+                self._prefetched.discard(evicted)
+                self.bytes -= evicted_cost
+                self.counters['evictions'] += 1
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            self._prefetched.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats.update(entries=len(self.items), bytes=self.bytes, max_bytes=self.max_bytes)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def describe(self):
+        s = self.stats()
+        return (f"缓存 {s['entries']} 项 {s['bytes'] / 1048576:.1f}/{s['max_bytes'] / 1048576:.1f} MB，"
+                f"命中 {s['hits']}，未命中 {s['misses']}（命中率 {s['hit_rate'] * 100:.1f}%），"
+                f"淘汰 {s['evictions']}，预读 {s['readahead']}（命中 {s['readahead_hits']}）")
+
+class CachedArchive:
+    """
+    带LRU缓存的WDF读取器：read(uid) 先查缓存，未命中时从 mmap 复制数据并放入缓存。
+    readahead: 未命中时顺带缓存按偏移相邻的后续若干个小资源（预览工具常按目录顺序依次点开），
+    预读项读取或解码失败时直接跳过。
+    decode: 可选的解码函数，缓存中保存解码结果（如 packedxml 解析后的文本）。
+    多个 CachedArchive 可共用同一个 PayloadCache，键中带有 decode，原始数据和不同解码结果互不混用。
+    path 也可以是已打开的 WdfArchive（不负责关闭）。
+    """
+    def __init__(self, path, cache=None, readahead=0, readahead_max_size=DEFAULT_READAHEAD_MAX_SIZE, decode=None):
+        self.cache = cache if cache is not None else PayloadCache()
+        self.readahead = readahead
+        self.readahead_max_size = readahead_max_size
+        self.decode = decode
+        self.owns_archive = not isinstance(path, WdfArchive)
+        self.archive = WdfArchive(path) if self.owns_archive else path
+        self.path = self.archive.path
+        self.key = fingerprint_key(self.path)
+        self._by_offset = None
+        self._rank = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.owns_archive:
+            self.archive.close()
+
+    def _load(self, row):
+        with self.archive.payload(row) as view:
+            data = bytes(view)
+        return (self.decode(data) if self.decode else data), len(data)
+
+    def _neighbours(self, row):
+        if self._by_offset is None:
+            self._by_offset = np.argsort(self.archive.entries['offset'], kind='stable')
+            self._rank = np.empty(len(self._by_offset), dtype=np.int64)
+            self._rank[self._by_offset] = np.arange(len(self._by_offset))
+        start = int(self._rank[row]) + 1
+        return self._by_offset[start:start + self.readahead].tolist()
+
+    def read_row(self, row):
+        uid = int(self.archive.entries['uid'][row])
+        key = (self.key, self.decode, uid)
+        value = self.cache.get(key)
+        if value is not None:
+            return value
+        value, cost = self._load(row)
+        # 先放预读项再放本项，预算紧张时被淘汰的是预读项而不是刚读的资源
+        if self.readahead:
+            sizes = self.archive.entries['size']
+            for n in self._neighbours(row):
+                n_key = (self.key, self.decode, int(self.archive.entries['uid'][n]))
+                if int(sizes[n]) <= self.readahead_max_size and n_key not in self.cache:
+                    try:
+                        loaded = self._load(n)
+                    except Exception:
+                        # 相邻资源格式不同等原因解码失败时跳过预读，不影响本次读取
+                        continue
+                    self.cache.put(n_key, *loaded, prefetched=True)
+        self.cache.put(key, value, cost)
+        return value
+
+    def read(self, uid):
+        """按uid取资源数据（bytes 或解码结果），不存在时返回 None"""
+        row = int(self.archive.lookup([uid])[0])
+        return self.read_row(row) if row >= 0 else None
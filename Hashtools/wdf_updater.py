@@ -0,0 +1,329 @@
+import os
+import time
+import zlib
+import struct
+import argparse
+import numpy as np
+from wdf_archive import WdfArchive, WDF_HEADER_FMT, WDF_HEADER_SIZE, WDF_ENTRY_DTYPE_16, WDF_ENTRY_DTYPE_32
+from wdf_packer import DEFAULT_ALIGN, COPY_CHUNK, align_up, compute_uids, find_collisions, collect_files
+from wdf_diff import DELTA_MAGIC, is_tombstone
+
+# 预写日志格式（回滚日志）：
+#   日志头 + 若干 [偏移, 长度, 原始数据] 记录 + 提交记录 [JOURNAL_COMMIT, crc32]
+#   记录保存的是即将被覆盖区域的原始内容；提交记录写入并落盘后才开始修改归档。
+#   打开时若日志完整则按记录回滚并截断到原始长度，不完整说明归档尚未被修改，直接丢弃。
+JOURNAL_MAGIC = b'WDFJ'
+JOURNAL_VERSION = 1
+JOURNAL_HEAD_FMT = '<4sIQ'  # magic, version, 原始文件长度
+JOURNAL_REC_FMT = '<QQ'     # 偏移, 长度
+JOURNAL_REC_SIZE = struct.calcsize(JOURNAL_REC_FMT)
+JOURNAL_COMMIT = 0xFFFFFFFFFFFFFFFF
+# WDF索引项中的偏移为32位
+MAX_ARCHIVE_SIZE = 0xFFFFFFFF
+
+def journal_path(wdf_path):
+    return wdf_path + '.journal'
+
+def copy_range(src, dst, size, crc=None):
+    """从 src 当前位置拷贝 size 字节到 dst，返回 (实际字节数, crc32)"""
+    done = 0
+    while done < size:
+        chunk = src.read(min(COPY_CHUNK, size - done))
+        if not chunk:
+            break
+        dst.write(chunk)
+        if crc is not None:
+            crc = zlib.crc32(chunk, crc)
+        done += len(chunk)
+    return done, crc
+
+def write_journal(wdf_path, f, original_size, ranges):
+    """
+    把 ranges [(偏移, 长度)] 的原始内容写入日志并落盘。
+    f 为以 r+b 打开的归档文件。
+    """
+    with open(journal_path(wdf_path), 'wb') as jf:
+        head = struct.pack(JOURNAL_HEAD_FMT, JOURNAL_MAGIC, JOURNAL_VERSION, original_size)
+        jf.write(head)
+        crc = zlib.crc32(head)
+        for offset, length in ranges:
+            length = max(0, min(length, original_size - offset))
+            if not length:
+                continue
+            rec = struct.pack(JOURNAL_REC_FMT, offset, length)
+            jf.write(rec)
+            crc = zlib.crc32(rec, crc)
+            f.seek(offset)
+            got, crc = copy_range(f, jf, length, crc)
+            if got != length:
+                raise IOError(f'读取原始数据失败: 偏移 {offset}')
+        jf.write(struct.pack(JOURNAL_REC_FMT, JOURNAL_COMMIT, crc))
+        jf.flush()
+        os.fsync(jf.fileno())
+
+def read_journal(path):
+    """
+    解析日志，返回 (原始长度, [(偏移, 长度, 数据起点)])；
+    日志不完整或校验失败时返回 None。
+    """
+    size = os.path.getsize(path)
+    head_size = struct.calcsize(JOURNAL_HEAD_FMT)
+    with open(path, 'rb') as jf:
+        head = jf.read(head_size)
+        if len(head) < head_size:
+            return None
+        magic, version, original_size = struct.unpack(JOURNAL_HEAD_FMT, head)
+        if magic != JOURNAL_MAGIC or version != JOURNAL_VERSION:
+            return None
+        crc = zlib.crc32(head)
+        records = []
+        pos = head_size
+        while pos + JOURNAL_REC_SIZE <= size:
+            rec = jf.read(JOURNAL_REC_SIZE)
+            offset, length = struct.unpack(JOURNAL_REC_FMT, rec)
+            if offset == JOURNAL_COMMIT:
+                return (original_size, records) if length == crc else None
+            crc = zlib.crc32(rec, crc)
+            pos += JOURNAL_REC_SIZE
+            if pos + length > size:
+                return None
+            records.append((offset, length, pos))
+            remain = length
+            while remain:
+                chunk = jf.read(min(COPY_CHUNK, remain))
+                crc = zlib.crc32(chunk, crc)
+                remain -= len(chunk)
+            pos += length
+    return None
+
+def recover_journal(wdf_path, log_func=print):
+    """
+    检查并处理上次未完成的更新。
+    日志完整时把归档回滚到更新前的状态，返回 True；无需回滚返回 False。
+    """
+    path = journal_path(wdf_path)
+    if not os.path.exists(path):
+        return False
+    parsed = read_journal(path)
+    if parsed is None:
+        # 提交记录未落盘，归档尚未被修改
+        os.remove(path)
+        log_func(f"丢弃未完成的更新日志: {path}")
+        return False
+    original_size, records = parsed
+    with open(wdf_path, 'r+b') as f, open(path, 'rb') as jf:
+        for offset, length, data_pos in records:
+            jf.seek(data_pos)
+            f.seek(offset)
+            copy_range(jf, f, length)
+        f.truncate(original_size)
+        f.flush()
+        os.fsync(f.fileno())
+    os.remove(path)
+    log_func(f"检测到中断的更新，已回滚: {wdf_path}")
+    return True
+
+def entry_name(path):
+    # 32字节索引项内嵌16字节文件名
+    return os.path.basename(path.replace('\\', '/')).encode('utf-8')[:16]
+
+def shared_slots(entries, live):
+    """
+    标记与其他有效条目的区域 [offset, offset+max(size, space)) 有重叠的条目。
+    compact_wdf 对内容相同的资源只保留一份数据（WdfWriter.add_ref），这些条目共用同一区域，
+    原位覆盖写会改掉其他条目的内容。
+    """
+    shared = np.zeros(len(entries), dtype=bool)
+    starts = entries['offset'].astype(np.int64)
+    ends = starts + np.maximum(entries['size'], entries['space']).astype(np.int64)
+    rows = np.flatnonzero(live & (ends > starts))
+    if len(rows) < 2:
+        return shared
+    rows = rows[np.argsort(starts[rows], kind='stable')]
+    s, e = starts[rows], ends[rows]
+    # 与前面任一区域重叠：前面区域的最大终点超过本区域起点；与后面重叠：下一个区域的起点在本区域内
+    prev_end = np.maximum.accumulate(e)
+    hit = np.zeros(len(rows), dtype=bool)
+    hit[1:] |= prev_end[:-1] > s[1:]
+    hit[:-1] |= s[1:] < e[:-1]
+    shared[rows] = hit
+    return shared
+
+def update_wdf(
+    wdf_path, puts=None, deletes=None, algo_name='wdf_string_id', case_sensitive=False, seed=None,
+    align=DEFAULT_ALIGN, log_func=print
+):
+    """
+    原地增量更新WDF包，不重新打包。
+    puts: [(包内路径, 源文件路径)]，uid已存在时替换，否则新增
+    deletes: [包内路径]，从索引中删除（资源所占空间保留为空闲区）
+    新资源不超过原条目的 space 且该区域没有被其他条目共用时直接写回原位置，否则追加到数据区末尾；
+    最后重写索引表和文件头。修改前先写回滚日志，中途崩溃后下次打开自动回滚。
+    返回统计信息 {files, deleted, reused, appended, bytes, seconds}。
+    """
+    puts = list(puts or [])
+    deletes = list(deletes or [])
+    put_uids = compute_uids([p for p, _ in puts], algo_name, case_sensitive, seed)
+    collisions = find_collisions([p for p, _ in puts], put_uids)
+    if collisions:
+        detail = '; '.join(f"0x{uid:08X}: {', '.join(p)}" for uid, p in list(collisions.items())[:20])
+        raise ValueError(f'发现 {len(collisions)} 个uid冲突，未修改文件: {detail}')
+    del_uids = compute_uids(deletes, algo_name, case_sensitive, seed)
+    return update_wdf_uids(
+        wdf_path,
+        [(uid, path, src, 0, os.path.getsize(src)) for (path, src), uid in zip(puts, put_uids.tolist())],
+        list(zip(del_uids.tolist(), deletes)),
+        align, log_func)
+
+def update_wdf_uids(wdf_path, puts=None, deletes=None, align=DEFAULT_ALIGN, log_func=print):
+    """
+    按uid原地更新WDF包，update_wdf 和增量包应用都经由这里。
+    puts: [(uid, 包内路径, 源文件, 源偏移, 大小)]，数据取自源文件的 [源偏移, 源偏移+大小)
+    deletes: [(uid, 日志中显示的名称)]
+    """
+    start_time = time.time()
+    recover_journal(wdf_path, log_func)
+    puts = list(puts or [])
+    deletes = list(deletes or [])
+
+    with WdfArchive(wdf_path) as archive:
+        magic = archive.magic
+        index_offset = archive.index_offset
+        entry_size = archive.entry_size
+        entries = np.array(archive.entries)
+    original_size = os.path.getsize(wdf_path)
+    dtype = WDF_ENTRY_DTYPE_32 if entry_size == 32 else WDF_ENTRY_DTYPE_16
+
+    rows = {uid: i for i, uid in enumerate(entries['uid'].tolist())}
+    keep = np.ones(len(entries), dtype=bool)
+    deleted = 0
+    for uid, path in deletes:
+        if uid in rows and keep[rows[uid]]:
+            keep[rows[uid]] = False
+            deleted += 1
+        else:
+            log_func(f"未找到: {path}")
+
+    # 分配位置：能放回原位置的覆盖写，其余从原索引处开始追加
+    live = entries[keep]
+    data_end = index_offset
+    if len(live):
+        data_end = max(data_end, int((live['offset'].astype(np.uint64) + np.maximum(live['size'], live['space'])).max()))
+    pos = align_up(data_end, align)
+    shared = shared_slots(entries, keep)
+    writes = []  # (偏移, 源文件, 源偏移, 大小)
+    new_rows = []
+    reused = appended = total = 0
+    for uid, path, src, src_offset, size in puts:
+        row = rows.get(uid)
+        if row is not None and not shared[row] and \
+                size <= max(int(entries['space'][row]), int(entries['size'][row])):
+            entries['size'][row] = size
+            keep[row] = True
+            writes.append((int(entries['offset'][row]), src, src_offset, size))
+            reused += 1
+        else:
+            space = align_up(size, align)
+            if row is not None:
+                keep[row] = False
+            new_rows.append((uid, pos, size, space, entry_name(path)))
+            writes.append((pos, src, src_offset, size))
+            pos += space
+            appended += 1
+        total += size
+
+    added = np.zeros(len(new_rows), dtype=dtype)
+    for i, (uid, offset, size, space, name) in enumerate(new_rows):
+        added[i]['uid'], added[i]['offset'], added[i]['size'], added[i]['space'] = uid, offset, size, space
+        if entry_size == 32:
+            added[i]['name'] = name
+    index = np.concatenate([entries[keep], added])
+    index = index[np.argsort(index['uid'], kind='stable')]
+    new_index_offset = pos
+    new_size = new_index_offset + index.nbytes
+    if new_size > MAX_ARCHIVE_SIZE:
+        raise ValueError('更新后文件超过4GB，WDF索引无法表示')
+
+    # 原位置覆盖的区域、文件头、原索引及其后的数据都会被改写，先记入日志
+    ranges = [(0, WDF_HEADER_SIZE)]
+    ranges += [(offset, size) for offset, src, src_offset, size in writes if offset < original_size]
+    ranges.append((min(index_offset, original_size), original_size - min(index_offset, original_size)))
+    with open(wdf_path, 'r+b') as f:
+        write_journal(wdf_path, f, original_size, ranges)
+        # 追加区起点的对齐填充置零，避免残留旧索引内容
+        f.seek(data_end)
+        f.write(b'\0' * (align_up(data_end, align) - data_end))
+        for offset, src, src_offset, size in sorted(writes):
+            with open(src, 'rb') as src_f:
+                src_f.seek(src_offset)
+                f.seek(offset)
+                got, _ = copy_range(src_f, f, size)
+                if got != size:
+                    raise IOError(f'源数据长度不足: {src}')
+        f.seek(new_index_offset)
+        f.write(index.tobytes())
+        f.truncate(new_size)
+        f.seek(0)
+        f.write(struct.pack(WDF_HEADER_FMT, magic, len(index), new_index_offset))
+        f.flush()
+        os.fsync(f.fileno())
+    os.remove(journal_path(wdf_path))
+
+    seconds = time.time() - start_time
+    log_func(f"更新完成: 写入 {len(puts)} 个文件（原位 {reused}，追加 {appended}），"
+             f"删除 {deleted} 个，{total / 1048576:.1f} MB，用时 {seconds:.2f} 秒")
+    return {'files': len(puts), 'deleted': deleted, 'reused': reused, 'appended': appended,
+            'bytes': total, 'seconds': seconds}
+
+def apply_delta(wdf_path, delta_path, align=DEFAULT_ALIGN, log_func=print):
+    """
+    应用 wdf_diff.write_delta 生成的增量包：其中的资源按uid替换或新增，空条目表示删除。
+    """
+    with WdfArchive(delta_path) as delta:
+        if delta.magic != DELTA_MAGIC:
+            raise ValueError(f'不是增量包，文件头为: {delta.magic}')
+        entries = delta.to_dicts()
+        names = delta.names()
+    puts = []
+    deletes = []
+    for e, name in zip(entries, names):
+        if is_tombstone(e):
+            deletes.append((e['uid'], f"0x{e['uid']:08X}"))
+        else:
+            puts.append((e['uid'], name, delta_path, e['offset'], e['size']))
+    return update_wdf_uids(wdf_path, puts, deletes, align, log_func)
+
+def main():
+    parser = argparse.ArgumentParser(description='原地增量更新WDF包（替换/新增/删除资源）')
+    parser.add_argument('wdf', help='要更新的.wdf文件')
+    parser.add_argument('--put', action='append', default=[], metavar='包内路径=源文件',
+                        help='替换或新增单个资源，可多次指定')
+    parser.add_argument('--put-dir', help='按相对路径把目录下所有文件写入包内')
+    parser.add_argument('--delete', action='append', default=[], metavar='包内路径', help='删除资源，可多次指定')
+    parser.add_argument('--algo', default='wdf_string_id', help='uid算法，需与打包时一致')
+    parser.add_argument('--case-sensitive', action='store_true')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--align', type=int, default=DEFAULT_ALIGN, help='追加资源的对齐字节数')
+    parser.add_argument('--apply-delta', metavar='增量包', help='应用 wdf_diff 生成的增量包')
+    parser.add_argument('--recover', action='store_true', help='只处理上次中断的更新')
+    args = parser.parse_args()
+    if args.recover:
+        if not recover_journal(args.wdf):
+            print('无需回滚')
+        return
+    if args.apply_delta:
+        apply_delta(args.wdf, args.apply_delta, args.align)
+        if not (args.put or args.put_dir or args.delete):
+            return
+    puts = []
+    for spec in args.put:
+        name, sep, src = spec.partition('=')
+        if not sep:
+            parser.error(f'--put 格式应为 包内路径=源文件: {spec}')
+        puts.append((name, src))
+    if args.put_dir:
+        puts += [(rel_path, abs_path) for rel_path, abs_path, _ in collect_files(args.put_dir)]
+    update_wdf(args.wdf, puts, args.delete, args.algo, args.case_sensitive, args.seed, args.align)
+
+if __name__ == '__main__':
+    main()
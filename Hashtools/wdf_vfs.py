@@ -0,0 +1,211 @@
+import io
+import os
+import time
+import numpy as np
+from wdf_archive import WdfArchive
+from wdf_packer import uid_batch_func
+from wdf_payload_cache import CachedArchive
+from wdf_extract import (
+    extract_planned, extract_parallel, extract_to_sink, extract_dedup, new_stats, finish_stats,
+    DEFAULT_GAP, DEFAULT_MAX_READ, DEFAULT_INFLIGHT_BYTES
+)
+
+def list_archives(directory, priority=None):
+    """
+    列出目录下的.wdf文件（不递归），按文件名排序。
+    priority: 优先的文件名列表，排在最前面并保持给定顺序。
+    """
+    names = sorted(f for f in os.listdir(directory) if f.lower().endswith('.wdf'))
+    if priority:
+        first = [p for p in priority if p in names]
+        names = first + [n for n in names if n not in first]
+    return [os.path.join(directory, n) for n in names]
+
+class WdfNamespace:
+    """
+    把多个WDF包挂载为一个虚拟命名空间：内存中只保留一份合并后的uid索引，
+    同一uid出现在多个包中时按挂载顺序决定覆盖关系。
+    later_wins=True 时后挂载的包覆盖前面的（补丁包放在后面），
+    False 时按优先级顺序，先挂载的包优先。
+    cache: 可选的 wdf_payload_cache.PayloadCache，给出时 read/open 经过LRU缓存（返回 bytes），
+    readahead 为未命中时顺带缓存的相邻资源数。
+    """
+    def __init__(self, paths, later_wins=True, algo_name='wdf_string_id', case_sensitive=False, seed=None,
+                 cache=None, readahead=0):
+        self.later_wins = later_wins
+        self.cache = cache
+        self.readahead = readahead
+        self.cached = {}
+        self.hash_func = uid_batch_func(algo_name, case_sensitive, seed)
+        self.archives = []
+        try:
+            for path in paths:
+                self.archives.append(WdfArchive(path))
+        except Exception:
+            self.close()
+            raise
+        self.build_index()
+
+    @classmethod
+    def mount_dir(cls, directory, priority=None, later_wins=True, **kwargs):
+        """挂载目录下的全部.wdf；给出 priority 时按优先级顺序，先列出的包优先"""
+        if priority:
+            later_wins = False
+        return cls(list_archives(directory, priority), later_wins, **kwargs)
+
+    def build_index(self):
+        uids = [a.entries['uid'] for a in self.archives]
+        archive_ids = [np.full(len(u), i, dtype=np.int32) for i, u in enumerate(uids)]
+        rows = [np.arange(len(u), dtype=np.int64) for u in uids]
+        uids = np.concatenate(uids) if uids else np.empty(0, dtype=np.uint32)
+        archive_ids = np.concatenate(archive_ids) if archive_ids else np.empty(0, dtype=np.int32)
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+        rank = archive_ids if self.later_wins else -archive_ids
+        # 同一uid内按优先级升序排列，取每组最后一行；同一包内重复uid取最前一行
+        order = np.lexsort((-rows, rank, uids))
+        uids = uids[order]
+        last = np.ones(len(uids), dtype=bool)
+        last[:-1] = uids[1:] != uids[:-1]
+        self.uids = uids[last]
+        self.archive_ids = archive_ids[order][last]
+        self.rows = rows[order][last]
+        self.shadowed = len(uids) - len(self.uids)
+
+    def __len__(self):
+        return len(self.uids)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.cached = {}
+        for archive in self.archives:
+            archive.close()
+        self.archives = []
+
+    def hash_paths(self, paths):
+        return np.asarray(self.hash_func(list(paths)), dtype=np.uint32)
+
+    def lookup(self, uids):
+        """批量查找uid，返回 (包序号数组, 行号数组)，未命中为-1"""
+        uids = np.asarray(uids, dtype=np.uint32)
+        if not len(self.uids):
+            miss = np.full(len(uids), -1, dtype=np.int64)
+            return miss, miss.copy()
+        pos = np.searchsorted(self.uids, uids)
+        pos[pos >= len(self.uids)] = 0
+        hit = self.uids[pos] == uids
+        return np.where(hit, self.archive_ids[pos], -1), np.where(hit, self.rows[pos], -1)
+
+    def resolve(self, paths):
+        """一次批量哈希+查找，返回 [(路径, uid, 包序号, 行号)]，未命中的包序号为-1"""
+        paths = list(paths)
+        uids = self.hash_paths(paths)
+        archive_ids, rows = self.lookup(uids)
+        return list(zip(paths, uids.tolist(), archive_ids.tolist(), rows.tolist()))
+
+    def read(self, uid):
+        """按uid取资源数据（零拷贝 memoryview，启用缓存时为 bytes），不存在时返回 None"""
+        archive_ids, rows = self.lookup([uid])
+        if archive_ids[0] < 0:
+            return None
+        archive_id, row = int(archive_ids[0]), int(rows[0])
+        if self.cache is not None:
+            if archive_id not in self.cached:
+                self.cached[archive_id] = CachedArchive(self.archives[archive_id], self.cache, self.readahead)
+            return self.cached[archive_id].read_row(row)
+        return self.archives[archive_id].payload(row)
+
+    def exists(self, path):
+        return self.lookup(self.hash_paths([path]))[0][0] >= 0
+
+    def open(self, path):
+        """按包内路径打开资源，返回只读的文件对象"""
+        data = self.read(int(self.hash_paths([path])[0]))
+        if data is None:
+            raise FileNotFoundError(path)
+        if isinstance(data, bytes):
+            return io.BytesIO(data)
+        with data:
+            return io.BytesIO(data)
+
+    def archive_of(self, path):
+        """返回资源实际所在的包路径，不存在时返回 None"""
+        archive_ids, _ = self.lookup(self.hash_paths([path]))
+        return self.archives[int(archive_ids[0])].path if archive_ids[0] >= 0 else None
+
+    def to_dicts(self):
+        """合并后的索引，转换为 [{uid, offset, size, space, archive}] 列表"""
+        result = []
+        for archive_id, row in zip(self.archive_ids.tolist(), self.rows.tolist()):
+            archive = self.archives[archive_id]
+            e = archive.entries[row]
+            result.append({'uid': int(e['uid']), 'offset': int(e['offset']), 'size': int(e['size']),
+                           'space': int(e['space']), 'archive': archive.path})
+        return result
+
+    def group_items(self, resolved, out_dir):
+        """
+        把 resolve() 的结果按包分组为导出项。
+        返回 ({包路径: [(out_path, offset, size, path, uid)]}, 未命中路径列表)。
+        """
+        groups = {}
+        missing = []
+        for path, uid, archive_id, row in resolved:
+            if archive_id < 0:
+                missing.append(path)
+                continue
+            archive = self.archives[archive_id]
+            entry = archive.entries[row]
+            out_path = os.path.join(out_dir, path.replace('\\', '/').replace('/', os.sep))
+            groups.setdefault(archive.path, []).append((out_path, int(entry['offset']), int(entry['size']), path, uid))
+        return groups, missing
+
+    def extract(
+        self, paths, out_dir, gap=DEFAULT_GAP, max_read=DEFAULT_MAX_READ,
+        workers=1, inflight_bytes=DEFAULT_INFLIGHT_BYTES, on_file=None, on_error=None, on_missing=None,
+        sink=None, dedup=None
+    ):
+        """
+        跨包导出路径列表：一次批量查找后按包分组，每个包内按偏移顺序导出。
+        sink: 给出时（见 wdf_extract.open_sink）全部资源写入同一个 tar/zip，out_dir 作为包内前缀。
+        dedup: 'hardlink' 或 'reflink' 时跨包按内容去重（见 wdf_extract.extract_dedup），不能与 sink 同用。
+        返回合并后的统计信息，另含 missing（未命中数）和 archives（涉及的包数）；去重时另含去重统计。
+        """
+        if dedup and sink is not None:
+            raise ValueError('去重导出只支持导出到目录')
+        start_time = time.time()
+        groups, missing = self.group_items(self.resolve(paths), out_dir)
+        if on_missing:
+            for path in missing:
+                on_missing(path)
+        stats = new_stats()
+        if dedup:
+            stats.update({'written': 0, 'saved': 0, 'linked': 0, 'by_ext': {}})
+        seen = {}
+        for archive_path, items in groups.items():
+            if sink is not None:
+                part = extract_to_sink(archive_path, items, sink, gap, max_read, on_file)
+            elif dedup:
+                part = extract_dedup(archive_path, items, dedup, gap, max_read, on_file, on_error, seen)
+                for key in ('written', 'saved', 'linked'):
+                    stats[key] += part[key]
+                for ext, e in part['by_ext'].items():
+                    total = stats['by_ext'].setdefault(ext, dict.fromkeys(e, 0))
+                    for key, n in e.items():
+                        total[key] += n
+            elif workers > 1:
+                part = extract_parallel(archive_path, items, workers, inflight_bytes, on_file, on_error)
+            else:
+                part = extract_planned(archive_path, items, gap, max_read, on_file, on_error)
+            for key in ('files', 'bytes', 'read_bytes', 'reads'):
+                stats[key] += part[key]
+            for method, n in part.get('methods', {}).items():
+                stats.setdefault('methods', {})
+                stats['methods'][method] = stats['methods'].get(method, 0) + n
+        stats['missing'] = len(missing)
+        stats['archives'] = len(groups)
+        return finish_stats(stats, start_time)
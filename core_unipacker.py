@@ -1,5 +1,14 @@
 import os
-import struct
+import sys
+import contextlib
+
+# 共用 Hashtools 目录下的 WDF 相关模块
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Hashtools'))
+from wdf_archive import WdfArchive, WDF_MAGICS
+from wdf_extract import (
+    extract_planned, extract_parallel, extract_to_sink, extract_resumable, extract_dedup,
+    open_sink, is_archive_target, member_name, format_stats, format_dedup, DEFAULT_GAP, DEFAULT_MAX_READ, DEFAULT_INFLIGHT_BYTES
+)
 
 def string_adjust(s):
     s = s.strip().replace('/', '\\').replace('\\\\', '\\').lower()
@@ -52,45 +61,261 @@ def wdf_string_id(s):
     v = esi ^ edi
     return v & 0xFFFFFFFF
 
-def wdf_unpack(wdf_path, lst_path, log_func, progress_func):
+# 批量哈希每次处理的行数，控制字矩阵的内存占用
+BATCH_CHUNK = 65536
+
+def wdf_string_id_batch(strings):
+    """
+    wdf_string_id 的批量版本：把整组路径打包成补零的 uint32 字矩阵，
+    所有行同时做 rol/xor/乘法轮运算，结果与逐条调用逐位一致。
+    返回 numpy.uint32 数组。
+    """
+    import numpy as np
+    strings = list(strings)
+    result = np.empty(len(strings), dtype=np.uint32)
+    a = np.uint32(0x2040801)
+    b_ = np.uint32(0x804021)
+    c = np.uint32(0xBFEF7FDF)
+    d = np.uint32(0x7DFEFBFF)
+    for start in range(0, len(strings), BATCH_CHUNK):
+        encoded = [string_adjust(s).encode('utf-8')[:256] for s in strings[start:start + BATCH_CHUNK]]
+        count = len(encoded)
+        lens = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=count)
+        n_words = (lens + 3) // 4
+        width = int(n_words.max()) + 2
+        flat = np.zeros(count * width * 4, dtype=np.uint8)
+        data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        if data.size:
+            # 每个字节的目标位置 = 行起点 + 行内偏移
+            starts = np.cumsum(lens) - lens
+            row_base = np.arange(count, dtype=np.int64) * (width * 4)
+            flat[np.repeat(row_base - starts, lens) + np.arange(data.size, dtype=np.int64)] = data
+        m = flat.view('<u4').reshape(count, width).astype(np.uint32)
+        rows = np.arange(count)
+        m[rows, n_words] = 0x9BE74448
+        m[rows, n_words + 1] = 0x66F42C48
+        esi = np.full(count, 0x37A8470E, dtype=np.uint32)
+        edi = np.full(count, 0x7758B42B, dtype=np.uint32)
+        v = 0xF4FA8928
+        for ecx in range(width):
+            v = ((v << 1) | (v >> 31)) & 0xFFFFFFFF
+            ebx = np.uint32(0x267B0B11 ^ v)
+            active = ecx < n_words + 2
+            eax = m[:, ecx]
+            esi_x = esi ^ eax
+            edi_x = edi ^ eax
+            edx = ((ebx + edi_x) | a) & c
+            new_esi = esi_x * edx + edx
+            edx = ((ebx + esi_x) | b_) & d
+            new_edi = edi_x * edx + edx
+            new_edi += np.where(new_edi + edx < new_edi, np.uint32(2), np.uint32(0))
+            esi = np.where(active, new_esi, esi)
+            edi = np.where(active, new_edi, edi)
+        result[start:start + count] = esi ^ edi
+    return result
+
+def wdf_unpack(wdf_path, lst_path, log_func, progress_func, index_dir=None,
+               gap=DEFAULT_GAP, max_read=DEFAULT_MAX_READ,
+               workers=1, inflight_bytes=DEFAULT_INFLIGHT_BYTES, out=None, resume=False, dedup=None,
+               by_name=False):
+    """
+    index_dir: 可选的反查索引目录。给出时lst中的名称会合并进索引，
+    并且索引中已知、但lst未列出的资源也一并解包（此时 lst_path 可为空）。
+    gap/max_read: 按偏移合并读取的间隔阈值与单次读取上限。
+    workers/inflight_bytes: 大于1个线程时并行导出（内核态拷贝），及每线程在途字节上限。
+    wdf_path 为目录时挂载其中全部WDF包统一解包，见 wdf_unpack_dir。
+    out: 输出位置，默认为WDF同名目录；为 .tar/.tar.gz/.tgz/.zip 或 '-'（标准输出）时
+    流式写入单个包，不生成单独的文件（此时 log_func 不应写标准输出）。
+    resume: 解包到目录时记录完成日志（<输出目录>.journal），中断后再次运行跳过已完成的文件。
+    dedup: 'hardlink' 或 'reflink' 时按内容去重，相同内容只写一次（顺序导出）。
+    by_name: 按索引内嵌的文件名匹配（32字节索引项），lst每行为名称或通配符，见 wdf_unpack_by_name。
+    """
+    if by_name and not os.path.isdir(wdf_path):
+        return wdf_unpack_by_name(wdf_path, lst_path, log_func, progress_func, out=out,
+                                  gap=gap, max_read=max_read, workers=workers, inflight_bytes=inflight_bytes)
+    if os.path.isdir(wdf_path):
+        return wdf_unpack_dir(wdf_path, lst_path, log_func, progress_func, index_dir,
+                              gap=gap, max_read=max_read, workers=workers, inflight_bytes=inflight_bytes,
+                              out=out, resume=resume, dedup=dedup)
     wdf_dir = os.path.dirname(os.path.abspath(wdf_path))
     wdf_name = os.path.splitext(os.path.basename(wdf_path))[0]
-    base_dir = os.path.join(wdf_dir, wdf_name)
-    with open(lst_path, 'r', encoding='utf-8') as f:
-        lst_lines = [line.strip() for line in f if line.strip()]
-    with open(wdf_path, 'rb') as f:
-        header = f.read(12)
-        valid_magic = [b'WDFP', b'PFDW', b'WDFA', b'AFDW']
-        if len(header) < 12 or header[:4] not in valid_magic:
-            log_func(f"不是有效的WDF文件！实际头部: {header[:4]}")
+    base_dir = out or os.path.join(wdf_dir, wdf_name)
+    to_sink = is_archive_target(base_dir)
+    lst_lines = []
+    if lst_path:
+        with open(lst_path, 'r', encoding='utf-8') as f:
+            lst_lines = [line.strip() for line in f if line.strip()]
+    try:
+        archive = WdfArchive(wdf_path)
+    except ValueError as e:
+        log_func(f"不是有效的WDF文件！{e}")
+        return
+    with archive:
+        if archive.magic not in WDF_MAGICS:
+            log_func(f"不是有效的WDF文件！实际头部: {archive.magic}")
             return
-        file_count = struct.unpack('<i', header[4:8])[0]
-        index_offset = struct.unpack('<I', header[8:12])[0]
-        f.seek(index_offset)
-        index_data = f.read(file_count * 32)
-        file_table = []
-        for i in range(file_count):
-            entry = index_data[i*32:(i+1)*32]
-            uid = struct.unpack('<I', entry[:4])[0]
-            offset = struct.unpack('<I', entry[4:8])[0]
-            size = struct.unpack('<I', entry[8:12])[0]
-            space = struct.unpack('<I', entry[12:16])[0]
-            file_table.append({'uid': uid, 'offset': offset, 'size': size, 'space': space})
-        uid_map = {e['uid']: e for e in file_table}
-        for idx, path in enumerate(lst_lines, 1):
-            uid = wdf_string_id(path)
-            entry = uid_map.get(uid)
-            if entry:
-                try:
-                    f.seek(entry['offset'])
-                    data = f.read(entry['size'])
+        # lst的哈希和命中行号优先取旁路缓存，lst只是追加了新行时只计算新增部分
+        from wdf_cache import WdfCache
+        with WdfCache(wdf_path) as cache:
+            uids, lst_rows = cache.match(lst_lines, 'wdf_string_id')
+        log_func(f"缓存: {cache.describe()}")
+        uids = uids.tolist()
+        pairs = list(zip(lst_lines, uids))
+        if index_dir:
+            from name_index import open_name_index
+            with open_name_index(index_dir, 'wdf_string_id', False, 0) as index:
+                added = index.merge(lst_lines, uids)
+                listed = set(uids)
+                rest = [uid for uid in archive.entries['uid'].tolist() if uid not in listed]
+                known = [(name, uid) for name, uid in zip(index.lookup(rest), rest) if name]
+            pairs.extend(known)
+            log_func(f"反查索引: 新增 {added} 个名称，额外命中 {len(known)} 条")
+        rows = lst_rows.tolist() + archive.lookup([uid for _, uid in pairs[len(lst_lines):]]).tolist()
+        items = []
+        for (path, uid), row in zip(pairs, rows):
+            if row >= 0:
+                if to_sink:
+                    out_path = member_name(path)
+                else:
                     out_path = os.path.join(base_dir, path.replace('/', os.sep))
-                    os.makedirs(os.path.dirname(out_path), exist_ok=True)
-                    with open(out_path, 'wb') as fout:
-                        fout.write(data)
-                    log_func(f"解包: {path} -> {out_path}")
-                except Exception as e:
-                    log_func(f"解包失败: {path}，错误: {e}")
+                entry = archive.entries[row]
+                items.append((out_path, int(entry['offset']), int(entry['size']), path, uid))
             else:
                 log_func(f"未找到: {path}")
-            progress_func(idx * 100 // len(lst_lines)) 
\ No newline at end of file
+    # 按偏移顺序合并读取，避免在大文件中来回寻道
+    done = [len(pairs) - len(items)]
+    def on_file(item):
+        done[0] += 1
+        log_func(f"解包: {item[3]} -> {item[0]}")
+        progress_func(done[0] * 100 // len(pairs))
+    def on_error(item, e):
+        done[0] += 1
+        log_func(f"解包失败: {item[3]}，错误: {e}")
+        progress_func(done[0] * 100 // len(pairs))
+    if to_sink:
+        with open_sink(base_dir) as sink:
+            stats = extract_to_sink(wdf_path, items, sink, gap, max_read, on_file)
+    elif dedup:
+        stats = extract_dedup(wdf_path, items, dedup, gap, max_read, on_file, on_error)
+        log_func(format_dedup(stats))
+    elif resume:
+        stats = extract_resumable(wdf_path, items, base_dir + '.journal', workers, gap, max_read,
+                                  inflight_bytes, on_file, on_error, uid_of=lambda item: item[4])
+    elif workers > 1:
+        stats = extract_parallel(wdf_path, items, workers, inflight_bytes, on_file, on_error)
+    else:
+        stats = extract_planned(wdf_path, items, gap, max_read, on_file, on_error)
+    log_func(format_stats(stats))
+
+def wdf_unpack_by_name(wdf_path, lst_path, log_func, progress_func, out=None,
+                       gap=DEFAULT_GAP, max_read=DEFAULT_MAX_READ,
+                       workers=1, inflight_bytes=DEFAULT_INFLIGHT_BYTES):
+    """
+    按索引内嵌的文件名解包，不需要哈希：lst每行为名称或通配符（如 *.dds），
+    省略 lst 时解包全部有内嵌名的资源。内嵌名只有文件名部分，输出不保留目录结构。
+    """
+    from wdf_names import EmbeddedNames
+    wdf_dir = os.path.dirname(os.path.abspath(wdf_path))
+    wdf_name = os.path.splitext(os.path.basename(wdf_path))[0]
+    base_dir = out or os.path.join(wdf_dir, wdf_name)
+    to_sink = is_archive_target(base_dir)
+    patterns = []
+    if lst_path:
+        with open(lst_path, 'r', encoding='utf-8') as f:
+            patterns = [line.strip() for line in f if line.strip()]
+    try:
+        archive = WdfArchive(wdf_path)
+    except ValueError as e:
+        log_func(f"不是有效的WDF文件！{e}")
+        return
+    with archive:
+        table = EmbeddedNames(archive)
+        if not len(table):
+            log_func("该WDF包没有内嵌文件名（16字节索引项），请使用lst解包")
+            return
+        rows, missing = table.match(patterns) if patterns else (table.order, [])
+        items = table.items(rows, '' if to_sink else base_dir)
+    log_func(f"内嵌名称表: {len(table)} 条，匹配 {len(items)} 个资源")
+    for pattern in missing:
+        log_func(f"未找到: {pattern}")
+    done = [0]
+    def on_file(item):
+        done[0] += 1
+        log_func(f"解包: {item[3]} -> {item[0]}")
+        progress_func(done[0] * 100 // len(items))
+    def on_error(item, e):
+        done[0] += 1
+        log_func(f"解包失败: {item[3]}，错误: {e}")
+        progress_func(done[0] * 100 // len(items))
+    if to_sink:
+        with open_sink(base_dir) as sink:
+            stats = extract_to_sink(wdf_path, items, sink, gap, max_read, on_file)
+    elif workers > 1:
+        stats = extract_parallel(wdf_path, items, workers, inflight_bytes, on_file, on_error)
+    else:
+        stats = extract_planned(wdf_path, items, gap, max_read, on_file, on_error)
+    log_func(format_stats(stats))
+
+def wdf_unpack_dir(wdf_dir, lst_path, log_func, progress_func, index_dir=None, later_wins=True,
+                   gap=DEFAULT_GAP, max_read=DEFAULT_MAX_READ,
+                   workers=1, inflight_bytes=DEFAULT_INFLIGHT_BYTES, out=None, resume=False, dedup=None):
+    """
+    挂载目录下全部WDF包为一个命名空间，整个lst只做一次批量哈希和查找，
+    资源按所在包分组导出到 <目录>_unpack 下（或 out 指定的目录/tar/zip）。
+    later_wins: 同一uid出现在多个包中时以后面的包（按文件名排序）为准。
+    """
+    from wdf_vfs import WdfNamespace
+    base_dir = out or os.path.abspath(wdf_dir).rstrip(os.sep) + '_unpack'
+    to_sink = is_archive_target(base_dir)
+    lst_lines = []
+    if lst_path:
+        with open(lst_path, 'r', encoding='utf-8') as f:
+            lst_lines = [line.strip() for line in f if line.strip()]
+    with WdfNamespace.mount_dir(wdf_dir, later_wins=later_wins) as ns:
+        if not ns.archives:
+            log_func(f"目录中没有WDF文件: {wdf_dir}")
+            return
+        log_func(f"挂载 {len(ns.archives)} 个WDF包，共 {len(ns)} 条资源，被覆盖 {ns.shadowed} 条")
+        paths = list(lst_lines)
+        if index_dir:
+            from name_index import open_name_index
+            uids = ns.hash_paths(lst_lines).tolist()
+            with open_name_index(index_dir, 'wdf_string_id', False, 0) as index:
+                added = index.merge(lst_lines, uids)
+                listed = set(uids)
+                rest = [uid for uid in ns.uids.tolist() if uid not in listed]
+                known = [name for name in index.lookup(rest) if name]
+            paths.extend(known)
+            log_func(f"反查索引: 新增 {added} 个名称，额外命中 {len(known)} 条")
+        groups, missing = ns.group_items(ns.resolve(paths), '' if to_sink else base_dir)
+        archive_paths = list(groups)
+    for path in missing:
+        log_func(f"未找到: {path}")
+    done = [len(missing)]
+    def on_file(item):
+        done[0] += 1
+        log_func(f"解包: {item[3]} -> {item[0]}")
+        progress_func(done[0] * 100 // len(paths))
+    def on_error(item, e):
+        done[0] += 1
+        log_func(f"解包失败: {item[3]}，错误: {e}")
+        progress_func(done[0] * 100 // len(paths))
+    # 导出到 tar/zip 时所有包共用一个输出
+    with open_sink(base_dir) if to_sink else contextlib.nullcontext() as sink:
+        for archive_path in archive_paths:
+            items = groups[archive_path]
+            log_func(f"从 {os.path.basename(archive_path)} 解包 {len(items)} 个文件")
+            if sink is not None:
+                stats = extract_to_sink(archive_path, items, sink, gap, max_read, on_file)
+            elif dedup:
+                stats = extract_dedup(archive_path, items, dedup, gap, max_read, on_file, on_error)
+                log_func(format_dedup(stats))
+            elif resume:
+                journal_path = f'{base_dir}.{os.path.basename(archive_path)}.journal'
+                stats = extract_resumable(archive_path, items, journal_path, workers, gap, max_read,
+                                          inflight_bytes, on_file, on_error, uid_of=lambda item: item[4])
+            elif workers > 1:
+                stats = extract_parallel(archive_path, items, workers, inflight_bytes, on_file, on_error)
+            else:
+                stats = extract_planned(archive_path, items, gap, max_read, on_file, on_error)
+            log_func(format_stats(stats))
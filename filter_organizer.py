@@ -2,8 +2,13 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, font
 import csv
 import os
+import sys
 from collections import Counter
 
+# 共用 Hashtools 目录下的虚拟表格组件
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Hashtools'))
+from virtual_grid import VirtualGrid
+
 A4_WIDTH = 1122  # A4横向像素（约96dpi）
 A4_HEIGHT = 794
 FONT_FAMILY = "微软雅黑"
@@ -18,7 +23,6 @@ class FilterOrganizerApp:
         self.suffixes = set()
         self.data = []
         self.headers = []
-        self.stop_refresh = False
 
         # 字体
         self.default_font = font.Font(family=FONT_FAMILY, size=FONT_SIZE)
@@ -71,11 +75,9 @@ class FilterOrganizerApp:
         self.table_frame.grid(row=2, column=0, sticky="nsew", padx=(20, 5), pady=(0, 20))
         self.table_frame.grid_rowconfigure(0, weight=1)
         self.table_frame.grid_columnconfigure(0, weight=1)
-        self.table = ttk.Treeview(self.table_frame, show="headings")
+        # 虚拟表格：全部行都在模型中，只渲染可见的一屏
+        self.table = VirtualGrid(self.table_frame, [])
         self.table.grid(row=0, column=0, sticky="nsew")
-        self.scrollbar = ttk.Scrollbar(self.table_frame, orient="vertical", command=self.table.yview)
-        self.table.configure(yscroll=self.scrollbar.set)
-        self.scrollbar.grid(row=0, column=1, sticky="ns")
         style = ttk.Style()
         style.configure("Treeview", font=(FONT_FAMILY, FONT_SIZE))
         style.configure("Treeview.Heading", font=(FONT_FAMILY, FONT_SIZE, "bold"))
@@ -98,8 +100,6 @@ class FilterOrganizerApp:
         self.suffix_text.configure(yscrollcommand=self.suffix_scrollbar.set)
         self.suffix_scrollbar.grid(row=0, column=1, sticky="ns")
 
-        # 启动定时刷新
-        self.refresh_table()
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def browse_file(self):
@@ -130,23 +130,16 @@ class FilterOrganizerApp:
                 self.data = []
                 self.headers = []
         self.collect_suffixes()
+        self.refresh_table()
 
     def refresh_table(self):
-        # 清空表格
-        for col in self.table["columns"]:
-            self.table.heading(col, text="")
-        self.table.delete(*self.table.get_children())
-        # 设置表头
-        if self.headers:
-            self.table["columns"] = self.headers
-            for col in self.headers:
-                self.table.heading(col, text=col)
-            # 填充数据（只显示前50行）
-            for row in self.data[:50]:
-                self.table.insert("", "end", values=row)
-        # 1秒后再次刷新
-        if not self.stop_refresh:
-            self.root.after(1000, self.refresh_table)
+        # 数据变化后整体装入表格模型；表头变化时重建列（同名列加序号区分）
+        columns = [(f"{i}:{h}", h, 160) for i, h in enumerate(self.headers)]
+        if [c[0] for c in columns] != self.table.model.columns:
+            self.table.set_columns(columns)
+        width = len(columns)
+        # 各行列数不一致时补齐/截断到表头宽度
+        self.table.set_rows([tuple(row[:width]) + ("",) * (width - len(row)) for row in self.data])
 
     def collect_suffixes(self):
         self.suffixes.clear()
@@ -231,16 +224,13 @@ class FilterOrganizerApp:
         save_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")], title="导出CSV文件")
         if save_path:
             try:
-                with open(save_path, "w", newline="", encoding="utf-8-sig") as f:
-                    writer = csv.writer(f)
-                    writer.writerow(self.headers)
-                    writer.writerows(self.data)
+                # 导出全部数据，不受表格当前筛选影响
+                self.table.model.export_csv(save_path, self.headers, visible_only=False)
                 messagebox.showinfo("成功", f"导出成功：{save_path}")
             except Exception as e:
                 messagebox.showerror("错误", f"导出失败: {e}")
 
     def on_close(self):
-        self.stop_refresh = True
         self.root.destroy()
 
     def update_suffix_text(self):
@@ -0,0 +1,157 @@
+import io
+import os
+import sys
+import time
+import random
+import struct
+import argparse
+import packedxml_codec
+from packedxml_reader import PackedXmlReader, decode_packedxml_strict, decode_packedxml_fast, reset_caches
+
+# PackedXml 解码基准：同一批文件分别用逐字节读取的严格解码器和单遍解码器各解一遍，
+# 逐个比较输出是否完全相同，并给出耗时和加速比。
+PACKED_MAGIC = struct.pack('<I', PackedXmlReader.Packed_Header)
+
+def encode_packed(root, dictionary):
+    """
+    把 (标签, 类型, 值, 子节点列表) 形式的树编码为 PackedXml，用于生成测试语料。
+    有子节点的节点在父节点中记为 Element，类型和值是它自身的数据；没有子节点的直接按类型存值。
+    dictionary: 标签名列表，编码时按需追加。
+    """
+    def index_of(name):
+        if name not in dictionary:
+            dictionary.append(name)
+        return dictionary.index(name)
+
+    def encode_value(t, value):
+        if t == 1:
+            return value.encode('utf-8')
+        if t == 2:
+            return struct.pack('<i', value)
+        if t == 3:
+            return struct.pack(f'<{len(value)}f', *value)
+        if t == 4:
+            return b'\x01' if value else b''
+        return value
+
+    def encode_element(node):
+        _, t, value, children = node
+        self_data = encode_value(t, value)
+        head = [struct.pack('<hi', len(children), (t << 28) | len(self_data))]
+        datas = []
+        end = len(self_data)
+        for child in children:
+            data = encode_element(child) if child[3] else encode_value(child[1], child[2])
+            end += len(data)
+            head.append(struct.pack('<hi', index_of(child[0]), ((0 if child[3] else child[1]) << 28) | end))
+            datas.append(data)
+        return b''.join(head) + self_data + b''.join(datas)
+
+    body = encode_element(root)
+    f = io.BytesIO()
+    f.write(PACKED_MAGIC + b'\x00')
+    packedxml_codec.write_dictionary(f, dictionary)
+    f.write(body)
+    return f.getvalue()
+
+def synthetic_model(rng):
+    """生成一个类似 .visual 的树：节点层级和变换矩阵、材质、资源路径、包围盒"""
+    def node(depth):
+        children = [('identifier', 1, f'bone_{rng.randrange(1000)}', []),
+                    ('transform', 3, [rng.uniform(-10, 10) for _ in range(12)], [])]
+        if depth < 3:
+            children.extend(node(depth + 1) for _ in range(rng.randrange(1, 4)))
+        return ('node', 1, '', children)
+
+    def material(k):
+        props = [('identifier', 1, f'mat_{k}', []),
+                 ('fx', 1, 'shaders/std_effects/normalmap.fx', []),
+                 ('collisionFlags', 2, rng.randrange(256), []),
+                 ('materialKind', 2, rng.randrange(16), [])]
+        for name in ('diffuseMap', 'normalMap', 'specularMap'):
+            props.append(('property', 1, name, [('Texture', 1, f'char/tex/{name}_{k}.dds', [])]))
+        props.append(('property', 1, 'doubleSided', [('Bool', 4, rng.random() < 0.5, [])]))
+        props.append(('property', 1, 'uvScale', [('Vector4', 3, [rng.random() for _ in range(4)], [])]))
+        return ('material', 1, '', props)
+
+    groups = [material(k) for k in range(rng.randrange(2, 6))]
+    geometry = [('vertices', 1, 'body.primitives/vertices', []),
+                ('primitive', 1, 'body.primitives/indices', [])]
+    geometry.extend(('primitiveGroup', 2, k, [m]) for k, m in enumerate(groups))
+    render_set = [('treatAsWorldSpaceObject', 4, False, []),
+                  ('node', 1, 'biped', []),
+                  ('geometry', 1, '', geometry)]
+    bounding_box = [('min', 3, [rng.uniform(-5, 0) for _ in range(3)], []),
+                    ('max', 3, [rng.uniform(0, 5) for _ in range(3)], [])]
+    root = [node(0),
+            ('renderSet', 1, '', render_set),
+            ('boundingBox', 1, '', bounding_box),
+            ('hash', 5, bytes(rng.randrange(256) for _ in range(16)), []),
+            ('note', 1, 'a < b & c > d', [])]
+    return encode_packed(('root', 1, '', root), [])
+
+def iter_corpus(paths):
+    """从文件/目录（递归）中取出全部 PackedXml 文件内容"""
+    for path in paths:
+        files = [path] if os.path.isfile(path) else \
+            (os.path.join(d, f) for d, _, names in os.walk(path) for f in names)
+        for file in files:
+            with open(file, 'rb') as f:
+                data = f.read()
+            if data[:4] == PACKED_MAGIC:
+                yield file, data
+
+def run_decoder(decoder, corpus, repeat=1):
+    """
+    解码全部语料 repeat 遍，返回 (最快一遍的耗时, 结果列表)，解码失败的结果为异常对象。
+    每一遍开始前清空单遍解码器跨文件的缓存（字典、解码方案），每一遍都从冷缓存开始计时。
+    """
+    best = None
+    for _ in range(repeat):
+        reset_caches()
+        results = []
+        start = time.perf_counter()
+        for _, data in corpus:
+            try:
+                results.append(decoder(data))
+            except Exception as e:
+                results.append(e)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, results
+
+def same_result(a, b):
+    if isinstance(a, Exception) or isinstance(b, Exception):
+        return type(a) is type(b) and str(a) == str(b)
+    return a == b
+
+def main():
+    parser = argparse.ArgumentParser(description='PackedXml 解码基准：严格解码器与单遍解码器的耗时和输出对比')
+    parser.add_argument('paths', nargs='*', help='PackedXml 文件或目录（递归），省略时使用生成的语料')
+    parser.add_argument('--synthetic', type=int, default=2000, help='未给出路径时生成的文件数')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3, help='每个解码器跑几遍，取最快一遍')
+    args = parser.parse_args()
+    if args.paths:
+        corpus = list(iter_corpus(args.paths))
+    else:
+        rng = random.Random(args.seed)
+        corpus = [(f'synthetic_{i}', synthetic_model(rng)) for i in range(args.synthetic)]
+    if not corpus:
+        print('没有找到 PackedXml 文件')
+        return 1
+    total_bytes = sum(len(data) for _, data in corpus)
+    print(f"语料: {len(corpus)} 个文件，{total_bytes / 1024 / 1024:.1f} MB")
+    strict_time, strict = run_decoder(decode_packedxml_strict, corpus, args.repeat)
+    fast_time, fast = run_decoder(decode_packedxml_fast, corpus, args.repeat)
+    mismatches = [name for (name, _), a, b in zip(corpus, strict, fast) if not same_result(a, b)]
+    for name in mismatches[:20]:
+        print(f"输出不一致: {name}")
+    failed = sum(isinstance(r, Exception) for r in strict)
+    print(f"严格解码: {strict_time:.2f} 秒（解码失败 {failed} 个）")
+    print(f"单遍解码: {fast_time:.2f} 秒")
+    print(f"加速比: {strict_time / fast_time if fast_time else float('inf'):.1f}x，输出不一致 {len(mismatches)} 个")
+    return 1 if mismatches else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -102,7 +102,131 @@ def read_element(f, dictionary, parent):
         offset = read_data(f, dictionary, child, offset, child_desc['data_desc'])
         parent.append(child)
 
+class _Irregular(Exception):
+    """越界、负长度等不规则数据：交给逐字节读取的实现，保证结果和异常与原先完全相同"""
+
+_ELEMENT_HEAD = struct.Struct('<hi')
+_NUMBERS = {1: struct.Struct('<b'), 2: struct.Struct('<h'), 4: struct.Struct('<i'), 8: struct.Struct('<q')}
+_descriptor_structs = {}
+
+def _descriptor_struct(number):
+    s = _descriptor_structs.get(number)
+    if s is None:
+        s = _descriptor_structs[number] = struct.Struct('<' + 'hi' * number)
+    return s
+
+def _escape_text(text):
+    # 与 ElementTree 对文本的转义相同
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    if '<' in text:
+        text = text.replace('<', '&lt;')
+    if '>' in text:
+        text = text.replace('>', '&gt;')
+    return text
+
+def _read_value_at(data, pos, length, t):
+    """
+    与 read_data 中非 Element 类型的读取相同，但直接按偏移读取 data
+    return: (文本, 新的读取位置)
+    """
+    if t == 2:  # Integer
+        number = _NUMBERS.get(length)
+        if number is None:
+            return '0', pos
+        return str(number.unpack_from(data, pos)[0]), pos + length
+    if t == 4:  # Boolean：无论长度都只读一个字节
+        if pos >= len(data):
+            raise _Irregular
+        return ('true' if data[pos] == 1 else 'false'), pos + 1
+    if t == 3:  # Float
+        n = length // 4
+        if n <= 0:
+            return '', pos
+        floats = struct.unpack_from(f'<{n}f', data, pos)
+        return ' '.join(['%.6f'] * n) % floats, pos + n * 4
+    if length < 0 or pos + length > len(data):
+        raise _Irregular
+    chunk = data[pos:pos + length]
+    return (chunk.decode('utf-8', errors='replace') if t == 1 else chunk.hex()), pos + length
+
+def _read_element_at(data, dictionary, parts, pos):
+    """
+    与 read_element 相同，但直接按偏移读取 data，每个元素的子元素描述符一次读出；
+    子元素的 XML 片段依次追加到 parts
+    return: (元素自身的文本, 新的读取位置)
+    """
+    children_number, val = _ELEMENT_HEAD.unpack_from(data, pos)
+    pos += 6
+    descriptors = ()
+    if children_number > 0:
+        descriptors = _descriptor_struct(children_number).unpack_from(data, pos)
+        pos += children_number * 6
+    offset = val & 0xFFFFFFF
+    if val >> 28 == 0:
+        text, pos = _read_element_at(data, dictionary, parts, pos)
+    else:
+        text, pos = _read_value_at(data, pos, offset, val >> 28)
+    for i in range(0, len(descriptors), 2):
+        name = dictionary[descriptors[i]]
+        if name[:1] == '{':
+            raise _Irregular  # ElementTree 会按命名空间处理
+        val = descriptors[i + 1]
+        end = val & 0xFFFFFFF
+        t = val >> 28
+        length = end - offset
+        offset = end
+        if t == 0:
+            children = []
+            child_text, pos = _read_element_at(data, dictionary, children, pos)
+            parts.append(_element_xml(name, child_text, children))
+            continue
+        if t == 1 and 0 < length <= len(data) - pos:
+            child_text = data[pos:pos + length].decode('utf-8', errors='replace')
+            pos += length
+        else:
+            child_text, pos = _read_value_at(data, pos, length, t)
+        if child_text:
+            parts.append(f'<{name}>{_escape_text(child_text)}</{name}>')
+        else:
+            parts.append(f'<{name} />')
+    return text, pos
+
+def _element_xml(name, text, parts):
+    if not text and not parts:
+        return f'<{name} />'
+    return f'<{name}>{_escape_text(text) if text else ""}{"".join(parts)}</{name}>'
+
+def _decode_packedxml_buffer(data, root_name):
+    # 头部 4 字节 + 1 字节，之后是以空串结尾的 NUL 分隔字典
+    pos = 5
+    dictionary = []
+    while True:
+        end = data.find(b'\x00', pos)
+        if end < 0:
+            end = len(data)
+        if end <= pos:
+            pos += 1
+            break
+        dictionary.append(data[pos:end].decode('utf-8'))
+        pos = end + 1
+    if pos > len(data) or root_name[:1] == '{':
+        raise _Irregular
+    parts = []
+    text, _ = _read_element_at(data, dictionary, parts, pos)
+    return _element_xml(root_name, text, parts)
+
 def decode_packedxml(bin_data, root_name='root'):
+    """
+    在 bytes 上按偏移解码，每个元素的子元素描述符一次读出，浮点数组整体读取；
+    遇到不规则数据时改用逐字节读取的实现，结果和异常与之相同
+    """
+    try:
+        return _decode_packedxml_buffer(bytes(bin_data), root_name)
+    except Exception:
+        return _decode_packedxml_stream(bin_data, root_name)
+
+def _decode_packedxml_stream(bin_data, root_name):
     f = io.BytesIO(bin_data)
     header = read_little_endian_int(f)
     f.read(1)
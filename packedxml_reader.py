@@ -1,5 +1,7 @@
 import struct
 import io
+import base64
+import operator
 import xml.etree.ElementTree as ET
 
 class PackedXmlDataType:
@@ -144,4 +146,401 @@ class PackedXmlReader:
 
 def decode_packedxml_strict(bin_data, root_name='root'):
     reader = PackedXmlReader(io.BytesIO(bin_data), root_name)
-    return reader.decode() 
\ No newline at end of file
+    return reader.decode() 
+
+_INTEGERS = {1: struct.Struct('<b'), 2: struct.Struct('<h'), 4: struct.Struct('<i'), 8: struct.Struct('<q')}
+_LEAF_CODES = {1: 'b', 2: 'h', 4: 'i', 8: 'q'}
+_SBYTE = _INTEGERS[1]
+_COUNT = _INTEGERS[2]
+# 浮点数每个 %f（即 %.6f，解析更快）、空格分隔；恰好 12 个（变换矩阵）时按 4 行输出（row0..row3，每行 3 个）
+_TRANSFORM = struct.Struct('<12f')
+_TRANSFORM_TEXT = b''.join(b'<row%d>%%f %%f %%f</row%d>' % (i, i) for i in range(4))
+# 浮点数个数 → (解包器, 文本格式)
+_float_plans = {}
+_FLOAT_PLAN_CACHE_MAX = 256
+# 子元素个数 → 自身描述符和全部子描述符的解包器
+_element_structs = {}
+_ELEMENT_STRUCT_CACHE_MAX = 1024
+# 字典原始字节 → _Tags。同类文件的字典通常完全相同，标签文本和解码方案不必每个文件重新生成
+_dictionaries = {}
+_DICTIONARY_CACHE_MAX = 256
+# 每份字典最多保留的解码方案数；同一元素头出现这么多次之后才生成方案
+_PLAN_CACHE_MAX = 4096
+_PLAN_AFTER = 16
+
+class _Irregular(Exception):
+    """数据与按描述符切分的结果不一致（长度为负、子元素实际长度与描述不符、读过文件末尾等），交给原解码器"""
+
+class _Tags:
+    """一份字典的标签名，对应的开始、结束、空元素标签（UTF-8 字节），以及按元素头缓存的解码方案"""
+    def __init__(self, names):
+        self.names = names
+        encoded = [name.encode('utf-8') for name in names]
+        self.opens = [b'<%s>' % name for name in encoded]
+        self.closes = [b'</%s>' % name for name in encoded]
+        self.empties = [b'<%s />' % name for name in encoded]
+        # 作为格式化模板的一部分时，标签中的 % 需要转义
+        self.literals = [tuple(text.replace(b'%', b'%%') for text in texts)
+                         for texts in zip(self.opens, self.closes, self.empties)]
+        # 变换矩阵连同标签一次格式化
+        self.transforms = [opening + _TRANSFORM_TEXT + closing for opening, closing, _ in self.literals]
+        # 元素头原始字节 → _SubtreePlan，False 表示这个元素头不用方案；seen 记录尚未生成方案的元素头出现的次数
+        self.plans = {}
+        self.seen = {}
+        # 带命名空间的标签由 ElementTree 改写，交给原解码器
+        self.namespaced = any(name[:1] == '{' for name in names)
+
+def reset_caches():
+    """清空跨文件的缓存（基准测试每一遍开始前调用，每一遍都从空缓存开始）"""
+    _dictionaries.clear()
+
+def _escape_text(text):
+    # 与 ElementTree 序列化文本时的转义一致
+    return text.replace(b'&', b'&amp;').replace(b'<', b'&lt;').replace(b'>', b'&gt;')
+
+def _float_plan(n):
+    """n 个浮点数的 (解包器, 文本格式)"""
+    plan = _float_plans.get(n)
+    if plan is None:
+        plan = (struct.Struct(f'<{n}f'), b' '.join([b'%f'] * n))
+        if n <= _FLOAT_PLAN_CACHE_MAX:
+            _float_plans[n] = plan
+    return plan
+
+def _element_struct(child_count):
+    unpacker = struct.Struct('<i' + 'hi' * max(child_count, 0))
+    if len(_element_structs) < _ELEMENT_STRUCT_CACHE_MAX:
+        _element_structs[child_count] = unpacker
+    return unpacker
+
+def _read_value(data, pos, end, t):
+    """读取 pos..end 的非元素类型的值，返回 (转义后的文本, 已序列化的子元素)，行为与 read_element_data 相同"""
+    length = end - pos
+    if length < 0 or end > len(data):
+        raise _Irregular
+    if t == PackedXmlDataType.String:
+        return _escape_text(data[pos:end]), b''
+    if t == PackedXmlDataType.Float:
+        if length & 3:
+            raise _Irregular
+        if length == 48:
+            return b'', _TRANSFORM_TEXT % _TRANSFORM.unpack_from(data, pos)
+        if not length:
+            return b'', b''
+        unpacker, fmt = _float_plan(length >> 2)
+        return fmt % unpacker.unpack_from(data, pos), b''
+    if t == PackedXmlDataType.Integer:
+        if not length:
+            return b'0', b''
+        if length not in _INTEGERS:
+            raise _Irregular
+        return b'%d' % _INTEGERS[length].unpack_from(data, pos)[0], b''
+    if t == PackedXmlDataType.Boolean:
+        if not length:
+            return b'false', b''
+        if length != 1 or data[pos] != 1:
+            raise _Irregular
+        return b'true', b''
+    if t == PackedXmlDataType.Base64:
+        return base64.b64encode(data[pos:end]), b''
+    raise _Irregular
+
+class _SubtreePlan:
+    """
+    一棵子树的解码方案。子树内各元素头确定之后，数据区每一段的类型和长度也就确定了：
+    元素头之后的整段数据一次 unpack_from，再套一个模板一次格式化。
+    内层元素头（以及布尔值的那个字节）作为检查字段一并解出，与生成方案时的数据比较，不同时不能用该方案；模板中以 %.0s 跳过。
+    """
+    def __init__(self, tags, data, pos):
+        self.tags = tags
+        self.codes = ['<']
+        self.parts = []
+        self.guards = []
+        self.texts = []
+        self.fields = 0
+        self.content = 0  # 已写入模板的内容数，用来判断子元素是否为空
+        start = pos + 6 + 6 * max(_COUNT.unpack_from(data, pos)[0], 0)
+        end = self.read_element(data, pos, True)
+        unpacker = struct.Struct(''.join(self.codes))
+        if unpacker.size != end - start:
+            raise _Irregular
+        self.unpack = unpacker.unpack_from
+        self.size = unpacker.size
+        self.template = b''.join(self.parts)
+        self.guard = operator.itemgetter(*self.guards) if self.guards else None
+        self.expected = self.guard(self.unpack(data, start)) if self.guards else None
+        # 字符串字段：拼起来检查一次是否需要转义
+        self.strings = operator.itemgetter(*self.texts) if self.texts else None
+        self.joined = len(self.texts) > 1
+        del self.tags, self.codes, self.parts, self.guards
+
+    def field(self, code, count=1):
+        self.codes.append(code)
+        self.fields += count
+
+    def guard_field(self, size):
+        self.guards.append(self.fields)
+        self.field(f'{size}s')
+        self.parts.append(b'%.0s')
+
+    def emit(self, *parts):
+        self.parts.extend(parts)
+        if any(parts):
+            self.content += 1
+
+    def read_element(self, data, pos, top=False):
+        """与 PackedXmlFastReader.read_elements 中的 read_element 相同的读取顺序，生成模板而不是输出，返回新游标"""
+        child_count = max(_COUNT.unpack_from(data, pos)[0], 0)
+        size = 6 + 6 * child_count
+        if not top:
+            self.guard_field(size)
+        descriptors = _element_struct(child_count).unpack_from(data, pos + 2)
+        base = pos = pos + size
+        offset = 0
+        for name, encoded in [(None, descriptors[0])] + list(zip(descriptors[1::2], descriptors[2::2])):
+            end = encoded & 0xFFFFFFF
+            length = end - offset
+            offset = end
+            if length < 0 or base + end > len(data):
+                raise _Irregular
+            opening, closing, empty = self.tags.literals[name] if name is not None else (b'', b'', b'')
+            t = encoded >> 28
+            if t == PackedXmlDataType.Element:
+                slot = len(self.parts)
+                content = self.content
+                self.parts.append(opening)
+                if self.read_element(data, pos) != base + end:
+                    raise _Irregular
+                if name is not None:
+                    if self.content == content:
+                        self.parts[slot] = empty
+                    else:
+                        self.parts.append(closing)
+                    self.content += 1
+            elif t == PackedXmlDataType.String:
+                if length:
+                    self.texts.append(self.fields)
+                    self.field(f'{length}s')
+                    self.emit(opening, b'%s', closing)
+                else:
+                    self.emit(empty)
+            elif t == PackedXmlDataType.Integer:
+                if not length:
+                    self.emit(opening, b'0', closing)
+                elif length in _LEAF_CODES:
+                    self.field(_LEAF_CODES[length])
+                    self.emit(opening, b'%d', closing)
+                else:
+                    raise _Irregular
+            elif t == PackedXmlDataType.Float:
+                if length & 3:
+                    raise _Irregular
+                n = length >> 2
+                if n:
+                    self.field(f'{n}f', n)
+                    self.emit(opening, _TRANSFORM_TEXT if n == 12 else _float_plan(n)[1], closing)
+                else:
+                    self.emit(empty)
+            elif t == PackedXmlDataType.Boolean:
+                if not length:
+                    self.emit(opening, b'false', closing)
+                elif length == 1 and data[pos] == 1:
+                    self.guard_field(1)
+                    self.emit(opening, b'true', closing)
+                else:
+                    raise _Irregular
+            else:
+                raise _Irregular
+            pos = base + end
+        return pos
+
+    def escape(self, values):
+        values = list(values)
+        for i in self.texts:
+            values[i] = _escape_text(values[i])
+        return tuple(values)
+
+def _subtree_plan(tags, data, pos):
+    """pos 处元素的解码方案；子树中有 Base64、长度不规则等情况时返回 False"""
+    try:
+        return _SubtreePlan(tags, data, pos)
+    except (_Irregular, struct.error):
+        return False
+
+class PackedXmlFastReader:
+    """
+    单遍解码：整个文件放在一个 bytes 上用显式游标读取；字典一次 split 切出，
+    每个元素的自身和子描述符一次 unpack_from 读完，子元素的数据按描述符中的结束位置直接切出；
+    不建 ElementTree，直接拼出与 ET.tostring 相同的 UTF-8 文本，最后统一解码一次。
+    反复出现的元素头（同类文件中的材质、属性、叶子节点等）生成 _SubtreePlan，整棵子树一次解包、一次格式化。
+    输出与 decode_packedxml_strict 相同；数据损坏或不规则时改用 decode_packedxml_strict，异常也与其相同。
+    """
+    def __init__(self, bin_data, root_name='root'):
+        self.data = bytes(bin_data)
+        self.pos = 0
+        self.root_name = root_name
+        self.dictionary = []
+        self.tags = None
+
+    def read_header(self):
+        head = struct.unpack_from('<i', self.data, 0)[0]
+        if head != PackedXmlReader.Packed_Header:
+            raise Exception('File is not packed xml')
+        _SBYTE.unpack_from(self.data, 4)  # skip one byte
+        self.pos = 5
+
+    def read_dictionary(self):
+        # 字典以空串结尾：第一个位置就是 NUL 时为空字典，否则结尾是第一处连续的两个 NUL
+        # 没有结尾时读到文件末尾；名称不会为空，切分后去掉空串即可
+        start = self.pos
+        if self.data[start:start + 1] == b'\x00':
+            end = start + 1
+        else:
+            end = self.data.find(b'\x00\x00', start)
+            end = len(self.data) if end < 0 else end + 2
+        raw = self.data[start:end]
+        self.tags = _dictionaries.get(raw)
+        if self.tags is None:
+            self.tags = _Tags([s.decode('utf-8') for s in raw.split(b'\x00') if s])
+            if len(_dictionaries) >= _DICTIONARY_CACHE_MAX:
+                _dictionaries.clear()
+            _dictionaries[raw] = self.tags
+        self.pos = end
+        return self.tags.names
+
+    def decode(self):
+        try:
+            self.read_header()
+            self.dictionary = self.read_dictionary()
+            if self.root_name[:1] == '{' or self.tags.namespaced:
+                return decode_packedxml_strict(self.data, self.root_name)
+            return self.read_elements(self.root_name)
+        except Exception:
+            # 数据损坏时批量读取与逐项读取先遇到的错误可能不同，交给原解码器抛出相同的异常
+            return decode_packedxml_strict(self.data, self.root_name)
+
+    def read_elements(self, root_tag):
+        """
+        从游标处读取根元素及其全部后代，返回根元素的 XML 文本。
+        输出按顺序追加到一个列表，最后一次拼接；子元素开始时先写开始标签，读完后没有内容时换成空元素标签。
+        文本中的 UTF-8 字节原样输出，两侧总是 ASCII 的标签，整体解码与逐段解码的成败相同。
+        """
+        data = self.data
+        tags = self.tags
+        opens = tags.opens
+        closes = tags.closes
+        empties = tags.empties
+        transforms = tags.transforms
+        plans = tags.plans
+        seen = tags.seen
+        integers = _INTEGERS
+        element_structs = _element_structs
+        transform = _TRANSFORM.unpack_from
+        root = root_tag.encode('utf-8')
+        out = [b'<%s>' % root]
+        append = out.append
+        extend = out.extend
+
+        def read_element(pos):
+            # 与 PackedXmlReader.read_element 相同的读取顺序，返回新游标
+            # 子元素个数几乎总在 0..255 之间，直接取低字节
+            child_count = data[pos] if not data[pos + 1] else _COUNT.unpack_from(data, pos)[0]
+            unpacker = element_structs.get(child_count) or _element_struct(child_count)
+            start = pos + 2 + unpacker.size
+            key = data[pos:start]
+            plan = plans.get(key)
+            if plan is None:
+                sightings = seen.get(key, 0)
+                if sightings < _PLAN_AFTER or len(plans) >= _PLAN_CACHE_MAX:
+                    if len(seen) >= _PLAN_CACHE_MAX:
+                        seen.clear()
+                    seen[key] = sightings + 1
+                else:
+                    plan = plans[key] = _subtree_plan(tags, data, pos)
+            if plan:
+                values = plan.unpack(data, start)
+                if plan.guard is None or plan.guard(values) == plan.expected:
+                    if plan.strings is not None:
+                        text = plan.strings(values)
+                        if plan.joined:
+                            text = b''.join(text)
+                        if 38 in text or 60 in text or 62 in text:  # & < >
+                            values = plan.escape(values)
+                    text = plan.template % values
+                    if text:
+                        append(text)
+                    return start + plan.size
+                # 元素头相同而内层结构不同，这个元素头以后不再用方案
+                plans[key] = False
+            descriptors = unpacker.unpack_from(data, pos + 2)
+            base = pos = start
+            it = iter(descriptors)
+            encoded = next(it)
+            end = base + (encoded & 0xFFFFFFF)
+            t = encoded >> 28
+            if t == PackedXmlDataType.String:
+                if end > pos:
+                    text = data[pos:end]
+                    if 38 in text or 60 in text or 62 in text:
+                        text = _escape_text(text)
+                    append(text)
+                    pos = end
+            elif t == PackedXmlDataType.Element:
+                # 自身数据又是元素时对同一元素递归，内容写在当前标签内
+                pos = read_element(pos)
+                if pos != end:
+                    raise _Irregular
+            else:
+                text, rows = _read_value(data, pos, end, t)
+                if text:
+                    append(text)
+                if rows:
+                    append(rows)
+                pos = end
+            for name, encoded in zip(it, it):
+                end = base + (encoded & 0xFFFFFFF)
+                t = encoded >> 28
+                # 常见的叶子类型就地处理，其余交给 _read_value
+                if t == 1:  # String
+                    if end > pos:
+                        text = data[pos:end]
+                        if 38 in text or 60 in text or 62 in text:
+                            text = _escape_text(text)
+                        extend((opens[name], text, closes[name]))
+                    elif end == pos:
+                        append(empties[name])
+                    else:
+                        raise _Irregular
+                elif t == 3 and end - pos == 48:  # 变换矩阵
+                    append(transforms[name] % transform(data, pos))
+                elif t == 0:  # Element
+                    slot = len(out)
+                    append(opens[name])
+                    if read_element(pos) != end:
+                        raise _Irregular
+                    if len(out) == slot + 1:
+                        out[slot] = empties[name]
+                    else:
+                        append(closes[name])
+                elif t == 2 and end - pos in integers:  # Integer
+                    extend((opens[name], b'%d' % integers[end - pos].unpack_from(data, pos)[0], closes[name]))
+                else:
+                    text, rows = _read_value(data, pos, end, t)
+                    if text or rows:
+                        extend((opens[name], text, rows, closes[name]))
+                    else:
+                        append(empties[name])
+                pos = end
+            return pos
+
+        self.pos = read_element(self.pos)
+        if self.pos > len(data):
+            raise _Irregular
+        if len(out) == 1:
+            return f'<{root_tag} />'
+        append(b'</%s>' % root)
+        return b''.join(out).decode('utf-8')
+
+def decode_packedxml_fast(bin_data, root_name='root'):
+    """与 decode_packedxml_strict 输出相同的快速解码"""
+    return PackedXmlFastReader(bin_data, root_name).decode()
@@ -0,0 +1,203 @@
+import os
+import time
+import tempfile
+import threading
+import subprocess
+import concurrent.futures
+
+# 外部解包工具的并行运行器：lst 分片后多个工具进程同时运行，按输出逐条统计结果。
+# 工具调用方式与原先相同：<工具> x <wdf去掉后缀> <lst>
+DEFAULT_PARALLEL = min(4, os.cpu_count() or 1)
+# 分片太小时进程启动开销占比过高
+MIN_SHARD_SIZE = 200
+# 输出行中出现这些词时认为该行提到的资源解包失败
+FAIL_WORDS = ('fail', 'error', 'not found', 'cannot', "can't", '失败', '错误', '未找到', '找不到')
+TOKEN_STRIP = '"\'[]()<>,;:'
+
+def norm_path(path):
+    return path.strip().replace('\\', '/').lower()
+
+def split_shards(entries, shards):
+    """把条目均匀切成最多 shards 片，保持原顺序（相邻条目通常在包内也相邻）"""
+    shards = max(1, min(shards, (len(entries) + MIN_SHARD_SIZE - 1) // MIN_SHARD_SIZE))
+    size, extra = divmod(len(entries), shards)
+    result = []
+    start = 0
+    for i in range(shards):
+        end = start + size + (1 if i < extra else 0)
+        if end > start:
+            result.append(entries[start:end])
+        start = end
+    return result
+
+def parse_line(line, lookup):
+    """
+    在一行工具输出中找出提到的条目，返回 (条目, 是否成功)，没有提到任何条目时返回 None。
+    lookup: {规范化路径: 原始条目}
+    """
+    tokens = line.lower().replace('\\', '/').split()
+    for i, token in enumerate(tokens):
+        entry = lookup.get(token.strip(TOKEN_STRIP))
+        if entry is not None:
+            # 路径本身可能含有失败词（如 ui/error_icon.dds），只在其余部分中查找
+            rest = ' '.join(tokens[:i] + tokens[i + 1:])
+            return entry, not any(w in rest for w in FAIL_WORDS)
+    return None
+
+def output_file(out_dir, entry):
+    return os.path.join(out_dir, entry.replace('\\', '/').replace('/', os.sep))
+
+def file_state(path):
+    """输出文件的 (mtime_ns, 大小, inode)，不存在时为 None；运行前后比较以判断文件是否由本次运行写出"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+class ShardProgress:
+    """
+    跨分片、跨工具的逐条进度：每个条目在每一遍中第一次有结论时计数一次。
+    stage 为当前这一遍的标识（工具），为 None 时各遍共用计数（失败条目交给下一个工具时）。
+    """
+    def __init__(self, total, progress_func):
+        self.total = total
+        self.progress_func = progress_func
+        self.stage = None
+        self.seen = set()
+        self.lock = threading.Lock()
+
+    def mark(self, entry):
+        with self.lock:
+            key = (self.stage, entry)
+            if key in self.seen:
+                return
+            self.seen.add(key)
+            done = len(self.seen)
+        if self.progress_func:
+            self.progress_func(done * 100 // self.total if self.total else 100)
+
+    def finish(self):
+        if self.progress_func:
+            self.progress_func(100)
+
+def run_shard(tool_path, base, entries, out_dir=None, log_func=None, progress=None):
+    """
+    对一个分片运行一次工具，返回 {ok: set, failed: set, returncode}。
+    输出中没有报告成功的条目，只有本次运行在 out_dir 下新写出或改写了对应文件才算成功，
+    运行前就已存在且未被改动的文件（上次运行或前一个工具留下的）不算。
+    """
+    lookup = {norm_path(e): e for e in entries}
+    before = {e: file_state(output_file(out_dir, e)) for e in entries} if out_dir else {}
+    ok, failed = set(), set()
+    with tempfile.NamedTemporaryFile('w', delete=False, encoding='utf-8', suffix='.lst') as tf:
+        tf.write('\n'.join(entries) + '\n')
+        lst_path = tf.name
+    try:
+        proc = subprocess.Popen([tool_path, 'x', base, lst_path], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                text=True, encoding='utf-8', errors='ignore')
+        for line in proc.stdout:
+            if log_func:
+                log_func(line.rstrip())
+            hit = parse_line(line, lookup)
+            if hit is None:
+                continue
+            entry, success = hit
+            if success:
+                ok.add(entry)
+                failed.discard(entry)
+                if progress:
+                    progress.mark(entry)
+            elif entry not in ok:
+                failed.add(entry)
+        proc.wait()
+        returncode = proc.returncode
+    except OSError as e:
+        if log_func:
+            log_func(f"[工具解包] 工具 {tool_path} 调用失败: {e}")
+        returncode = -1
+    finally:
+        os.remove(lst_path)
+    for entry in entries:
+        if entry in ok or not out_dir:
+            continue
+        path = output_file(out_dir, entry)
+        state = file_state(path)
+        # 只认本次运行写出的文件，避免把残留文件或其他工具写出的文件算作本工具的成功
+        if state is None or state == before[entry] or not os.path.isfile(path):
+            continue
+        ok.add(entry)
+        failed.discard(entry)
+        if progress:
+            progress.mark(entry)
+    failed |= set(entries) - ok
+    return {'ok': ok, 'failed': failed, 'returncode': returncode}
+
+def run_tool_pass(tool_path, base, entries, shards, parallel, out_dir, log_func, progress):
+    """一个工具跑一遍全部条目：分片并行，返回 (成功集合, 失败分片列表)"""
+    ok = set()
+    failed_shards = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=parallel) as pool:
+        futures = {pool.submit(run_shard, tool_path, base, shard, out_dir, log_func, progress): shard
+                   for shard in split_shards(entries, shards)}
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            ok |= result['ok']
+            if result['failed'] or result['returncode'] != 0:
+                failed_shards.append([e for e in futures[future] if e in result['failed']])
+    return ok, [shard for shard in failed_shards if shard]
+
+def run_tools_sharded(tools, base, entries, parallel=DEFAULT_PARALLEL, shards=None, retries=1,
+                      out_dir=None, log_func=print, progress_func=None, fallback=False):
+    """
+    依次用各个工具解包：每个工具把条目分成 shards 片（默认与并行数相同），最多 parallel 个进程同时运行；
+    有失败条目或进程异常退出的分片，只拿失败条目重试 retries 次。
+    默认每个工具都处理全部条目（与原先依次运行各工具相同）；fallback=True 时只把仍失败的条目交给下一个工具。
+    返回合并后的报告 {total, ok, failed: [条目], by_tool: {工具: 该工具本身解出的条目数}, retried, seconds,
+    status: {条目: 第一个成功的工具或None}}。
+    """
+    start_time = time.time()
+    entries = list(dict.fromkeys(e.strip() for e in entries if e.strip()))
+    shards = shards or parallel
+    progress = ShardProgress(len(entries) * (1 if fallback else len(tools)), progress_func)
+    status = dict.fromkeys(entries)
+    by_tool = {}
+    retried = 0
+    pending = entries
+    for tool_path in tools:
+        if fallback and not pending:
+            break
+        if not fallback:
+            progress.stage = tool_path
+        todo = pending if fallback else entries
+        log_func(f"[工具解包] {os.path.basename(tool_path)}: {len(todo)} 条，{min(shards, len(todo))} 片以内，并行 {parallel}")
+        ok, failed_shards = run_tool_pass(tool_path, base, todo, shards, parallel, out_dir, log_func, progress)
+        for _ in range(retries):
+            if not failed_shards:
+                break
+            retry = [e for shard in failed_shards for e in shard if e not in ok]
+            retried += len(failed_shards)
+            log_func(f"[工具解包] 重试 {len(failed_shards)} 个失败分片，共 {len(retry)} 条")
+            more, failed_shards = run_tool_pass(tool_path, base, retry, len(failed_shards), parallel, out_dir, log_func, progress)
+            ok |= more
+        for entry in ok:
+            if status[entry] is None:
+                status[entry] = tool_path
+        by_tool[tool_path] = len(ok)
+        pending = [e for e in pending if e not in ok]
+    progress.finish()
+    report = {'total': len(entries), 'ok': len(entries) - len(pending), 'failed': pending, 'by_tool': by_tool,
+              'retried': retried, 'seconds': time.time() - start_time, 'status': status}
+    log_func(format_report(report))
+    return report
+
+def format_report(report):
+    tools = '，'.join(f"{os.path.basename(t)} {n} 条" for t, n in report['by_tool'].items())
+    return (f"[工具解包] 完成 {report['ok']}/{report['total']} 条（{tools}），失败 {len(report['failed'])} 条，"
+            f"重试分片 {report['retried']} 个，用时 {report['seconds']:.1f} 秒")
+
+def write_report(report, out_path):
+    """每行一个条目：路径,ok/failed,工具"""
+    with open(out_path, 'w', encoding='utf-8') as f:
+        for entry, tool_path in report['status'].items():
+            f.write(f"{entry},{'ok' if tool_path else 'failed'},{os.path.basename(tool_path) if tool_path else ''}\n")
@@ -3,9 +3,13 @@ import re
 import tkinter as tk
 from tkinter import filedialog, END, ttk, messagebox
 import threading
-import csv
 import time
 import concurrent.futures
+import sys
+
+# 共用 Hashtools 目录下的虚拟表格组件
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Hashtools'))
+from virtual_grid import VirtualGrid
 
 # 常用后缀名
 COMMON_EXTS = (
@@ -92,16 +96,8 @@ class PathScannerUI:
         frm_result = tk.Frame(self.root)
         frm_result.pack(fill='both', expand=True, padx=5, pady=2)
         tk.Label(frm_result, text="检索到的路径/地址（列表）").pack(anchor='w')
-        columns = ("序号", "相对路径", "检索路径")
-        self.tree = ttk.Treeview(frm_result, columns=columns, show='headings', height=20)
-        for col in columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=300 if col != "序号" else 60, anchor='w')
-        self.tree.column("序号", width=60, anchor='center')
-        self.tree.pack(side='left', fill='both', expand=True)
-        scrollbar = ttk.Scrollbar(frm_result, orient='vertical', command=self.tree.yview)
-        self.tree.configure(yscroll=scrollbar.set)
-        scrollbar.pack(side='right', fill='y')
+        self.grid = VirtualGrid(frm_result, [("序号", "序号", 60), ("相对路径", "相对路径", 300), ("检索路径", "检索路径", 300)])
+        self.grid.pack(fill='both', expand=True)
         tk.Label(frm_top, textvariable=self.status_var, width=30).pack(side='left', padx=5)
 
     def choose_dir(self):
@@ -122,16 +118,10 @@ class PathScannerUI:
             self.progress['value'] = value
         self.root.after(0, _update)
 
-    def clear_tree(self):
-        def _clear():
-            for i in self.tree.get_children():
-                self.tree.delete(i)
-        self.root.after(0, _clear)
-
-    def insert_tree_row(self, idx, rel_path, match_path):
-        def _insert():
-            self.tree.insert('', 'end', values=(idx, rel_path, match_path))
-        self.root.after(0, _insert)
+    def show_matches(self):
+        # 整体替换表格数据，在界面线程中执行
+        rows = [(idx, rel_path, match_path) for idx, (rel_path, match_path) in enumerate(self.matches, 1)]
+        self.root.after(0, self.grid.set_rows, rows)
 
     def scan_threaded(self):
         self._stop = False
@@ -140,7 +130,7 @@ class PathScannerUI:
 
     def scan(self):
         self.matches.clear()
-        self.clear_tree()
+        self.show_matches()
         scan_dir = self.dir_var.get()
         if not scan_dir or not os.path.isdir(scan_dir):
             self.log("请先选择有效的检索目录！")
@@ -199,10 +189,7 @@ class PathScannerUI:
         speed = self.scanned_files / elapsed if elapsed > 0 else 0
         self.status_var.set(f"速度: {speed:.1f} 文件/秒  用时: {elapsed:.1f} 秒")
         self.log(f"检索完成，共发现 {len(self.matches)} 个路径/地址。")
-
-        self.clear_tree()
-        for idx, (rel_path, match_path) in enumerate(self.matches, 1):
-            self.insert_tree_row(idx, rel_path, match_path)
+        self.show_matches()
 
     def recheck_threaded(self):
         t = threading.Thread(target=self._recheck_impl)
@@ -229,9 +216,7 @@ class PathScannerUI:
                 self.update_progress(idx * 100 // total)
         self.matches = new_matches
         self.update_progress(100)
-        self.clear_tree()
-        for idx, (rel_path, match_path) in enumerate(self.matches, 1):
-            self.insert_tree_row(idx, rel_path, match_path)
+        self.show_matches()
         self.log(f"复检完成，共处理 {total} 条，修改 {changed} 条，新增 {added} 条。")
 
     def model_complete_threaded(self):
@@ -264,9 +249,7 @@ class PathScannerUI:
                 self.update_progress(idx * 100 // total)
         self.matches = new_matches
         self.update_progress(100)
-        self.clear_tree()
-        for idx, (rel_path, match_path) in enumerate(self.matches, 1):
-            self.insert_tree_row(idx, rel_path, match_path)
+        self.show_matches()
         self.log(f"模型补全完成，共处理 {total} 条，新增 {added} 条。")
 
     def export_csv(self):
@@ -277,11 +260,8 @@ class PathScannerUI:
         if not file_path:
             return
         try:
-            with open(file_path, 'w', newline='', encoding='utf-8-sig') as f:
-                writer = csv.writer(f)
-                writer.writerow(["序号", "相对路径", "检索路径"])
-                for idx, (rel_path, match_path) in enumerate(self.matches, 1):
-                    writer.writerow([idx, rel_path, match_path])
+            # 导出全部数据，不受表格当前筛选影响
+            self.grid.model.export_csv(file_path, visible_only=False)
             messagebox.showinfo("导出成功", f"已导出到: {file_path}")
         except Exception as e:
             messagebox.showerror("导出失败", str(e))
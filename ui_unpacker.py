@@ -2,8 +2,11 @@ import os
 import tkinter as tk
 from tkinter import filedialog, END, ttk, messagebox
 import threading
-import struct
-import subprocess
+import sys
+
+# 共用 Hashtools 目录下的 WDF 相关模块
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Hashtools'))
+from virtual_grid import VirtualGrid
 
 class UnpackerUI:
     def __init__(self, root):
@@ -39,6 +42,8 @@ class UnpackerUI:
             setattr(self, varname, tk.StringVar())
             tk.Entry(frm_group, textvariable=getattr(self, varname), width=48, font=("Consolas", 10)).grid(row=row_idx, column=1, padx=6, pady=4, sticky='we')
             tk.Button(frm_group, text="选择", command=choose_func, width=7).grid(row=row_idx, column=2, padx=2, pady=4)
+        # WDF也可以选择目录，挂载其中全部WDF包统一解包
+        tk.Button(frm_group, text="目录", command=self.choose_wdf_dir, width=5).grid(row=0, column=3, padx=2, pady=4)
         frm_group.grid_columnconfigure(1, weight=1)
 
         # 左侧：进度条
@@ -59,6 +64,9 @@ class UnpackerUI:
         btn_unpack.grid(row=0, column=0, padx=6, pady=2, sticky='e')
         btn_tool.grid(row=0, column=1, padx=6, pady=2)
         btn_parse.grid(row=0, column=2, padx=6, pady=2, sticky='w')
+        # 按索引内嵌的文件名解包（32字节索引项），LST可留空或填写名称/通配符
+        self.by_name_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(frm_btn, text="按内嵌名解包（无需哈希）", variable=self.by_name_var).grid(row=1, column=0, columnspan=3, pady=(2, 0))
 
         # 左侧：主日志栏
         frm_log_group = tk.LabelFrame(frm_left, text="工作日志", padx=10, pady=8, font=("微软雅黑", 10, "bold"))
@@ -69,18 +77,23 @@ class UnpackerUI:
         # 右侧：WDF内容日志栏
         frm_wdf_log = tk.LabelFrame(frm_right, text="WDF内容(name/uid)", padx=10, pady=8, font=("微软雅黑", 10, "bold"))
         frm_wdf_log.pack(fill='both', expand=True)
-        self.wdf_log_text = tk.Text(frm_wdf_log, width=32, height=10, state='disabled', font=("Consolas", 10))
-        self.wdf_log_text.pack(fill='both', expand=True)
+        # 虚拟表格：名称表再大也只渲染可见的一屏，可按列排序/筛选
+        self.wdf_grid = VirtualGrid(frm_wdf_log, [('name', 'name', 150), ('uid', 'uid', 80)])
+        self.wdf_grid.pack(fill='both', expand=True)
         # 直接在日志栏下方添加导出LST按钮
         btn_export_lst = tk.Button(frm_right, text="导出LST", command=self.export_lst, height=1, width=10, font=("微软雅黑", 10, "bold"))
         btn_export_lst.pack(pady=(8, 0), anchor='n')
-        self.parsed_names = []
 
     def choose_wdf(self):
         f = filedialog.askopenfilename(title="选择WDF文件", filetypes=[('WDF文件', '*.wdf'), ('所有文件', '*.*')])
         if f:
             self.wdf_var.set(f)
 
+    def choose_wdf_dir(self):
+        d = filedialog.askdirectory(title="选择WDF目录")
+        if d:
+            self.wdf_var.set(d)
+
     def choose_lst(self):
         f = filedialog.askopenfilename(title="选择LST列表文件", filetypes=[('LST文件', '*.lst'), ('所有文件', '*.*')])
         if f:
@@ -116,20 +129,28 @@ class UnpackerUI:
     def unpack(self):
         wdf = self.wdf_var.get()
         lst = self.lst_var.get()
-        if not (os.path.isfile(wdf) and os.path.isfile(lst)):
+        by_name = self.by_name_var.get()
+        if by_name and os.path.isfile(wdf) and not lst:
+            lst = None
+        elif not ((os.path.isfile(wdf) or os.path.isdir(wdf)) and os.path.isfile(lst)):
             self.log("请正确选择WDF和LST路径！")
             return
-        self.log(f"开始解包：\nWDF: {wdf}\nLST: {lst}")
+        self.log(f"开始解包：\nWDF: {wdf}\nLST: {lst or '（全部内嵌名）'}")
         try:
             from core_unipacker import wdf_unpack
-            wdf_unpack(wdf, lst, self.log, self.update_progress)
+            if by_name and os.path.isfile(wdf):
+                wdf_unpack(wdf, lst, self.log, self.update_progress, by_name=True)
+                self.update_progress(100)
+                self.log("解包完成！")
+                return
+            # 记录完成日志，中断后再次解包会跳过已完成的文件
+            wdf_unpack(wdf, lst, self.log, self.update_progress, resume=True)
             self.update_progress(100)
             self.log("解包完成！")
         except Exception as e:
             self.log(f"解包失败: {e}")
 
     def tool_unpack(self):
-        import subprocess
         wdf = self.wdf_var.get()
         lst = self.lst_var.get()
         tool1 = self.tool_var.get()
@@ -140,35 +161,19 @@ class UnpackerUI:
         base = wdf[:-4] if wdf.lower().endswith('.wdf') else wdf
         self.log(f"[工具解包] 1号工具: {tool1} x {base}")
         self.log(f"[工具解包] 2号工具: {tool2} x {base}")
-        def run_tool(tool_path, base, lst, progress_start, progress_end):
+        def run_both_tools():
+            # lst 分片后并行运行，两个工具依次处理全部条目，失败分片重试一次
+            from tool_runner import run_tools_sharded, write_report
             try:
                 with open(lst, 'r', encoding='utf-8') as f:
                     lines = [line.strip() for line in f if line.strip()]
-                import tempfile
-                with tempfile.NamedTemporaryFile('w', delete=False, encoding='utf-8', suffix='.lst') as tf:
-                    for l in lines:
-                        tf.write(l + '\n')
-                    temp_lst = tf.name
-                cmd = [tool_path, 'x', base, temp_lst]
-                proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding='utf-8', errors='ignore')
-                total_lines = 0
-                for line in proc.stdout:
-                    self.log(line.rstrip())
-                    total_lines += 1
-                    # 进度条分段显示
-                    progress = progress_start + (progress_end - progress_start) * min(total_lines, 100) // 100
-                    self.update_progress(progress)
-                proc.wait()
-                self.update_progress(progress_end)
-                if proc.returncode == 0:
-                    self.log(f"[工具解包] 工具 {tool_path} 解包完成！")
-                else:
-                    self.log(f"[工具解包] 工具 {tool_path} 进程异常退出，返回码: {proc.returncode}")
+                report = run_tools_sharded([tool1, tool2], base, lines, out_dir=base,
+                                           log_func=self.log, progress_func=self.update_progress)
+                report_path = base + '_tool_report.txt'
+                write_report(report, report_path)
+                self.log(f"[工具解包] 结果报告: {report_path}")
             except Exception as e:
-                self.log(f"[工具解包] 工具 {tool_path} 调用失败: {e}")
-        def run_both_tools():
-            run_tool(tool1, base, lst, 0, 50)
-            run_tool(tool2, base, lst, 50, 100)
+                self.log(f"[工具解包] 调用失败: {e}")
             self.update_progress(100)
         threading.Thread(target=run_both_tools).start()
 
@@ -178,39 +183,28 @@ class UnpackerUI:
 
     def parse_wdf(self):
         wdf = self.wdf_var.get()
-        self.parsed_names = []
+        self.root.after(0, self.wdf_grid.clear)
         if not os.path.isfile(wdf):
             self.log("请正确选择WDF路径！")
             return
-        self.wdf_log_text.config(state='normal')
-        self.wdf_log_text.delete(1.0, END)
         try:
-            import struct
-            with open(wdf, 'rb') as f:
-                header = f.read(12)
-                # 调试输出header内容
-                print("DEBUG header:", header)
-                if len(header) < 12 or (header[:4] != b'WDFP' and header[:4] != b'PFDW'):
-                    self.wdf_log_text.insert(END, f"不是有效的WDF文件！\n实际头部: {header[:4]}\n")
-                    self.wdf_log_text.config(state='disabled')
+            from wdf_archive import WdfArchive
+            from wdf_names import EmbeddedNames
+            with WdfArchive(wdf) as archive:
+                if archive.magic != b'WDFP' and archive.magic != b'PFDW':
+                    self.log(f"不是有效的WDF文件！实际头部: {archive.magic}")
                     return
-                file_count = struct.unpack('<i', header[4:8])[0]
-                index_offset = struct.unpack('<I', header[8:12])[0]
-                f.seek(index_offset)
-                index_data = f.read(file_count * 32)
-                for i in range(file_count):
-                    entry = index_data[i*32:(i+1)*32]
-                    uid = struct.unpack('<I', entry[:4])[0]
-                    name = entry[16:32].split(b'\x00')[0].decode('utf-8', errors='ignore')
-                    if name:
-                        self.parsed_names.append(name)
-                        self.wdf_log_text.insert(END, f"{name} | {uid:08X}\n")
+                # 一次向量化建立有序名称表，整体交给表格模型
+                listing = EmbeddedNames(archive).listing()
+            self.root.after(0, self.wdf_grid.set_rows, [(name, f"{uid:08X}") for name, uid in listing])
+            self.log(f"解析完成: {len(listing)} 个内嵌文件名")
         except Exception as e:
-            self.wdf_log_text.insert(END, f"解析失败: {e}\n")
-        self.wdf_log_text.config(state='disabled')
+            self.log(f"解析失败: {e}")
 
     def export_lst(self):
-        if not self.parsed_names:
+        # 导出全部解析出的名称，不受表格当前筛选影响
+        model = self.wdf_grid.model
+        if not model.total:
             messagebox.showinfo("无数据", "请先解析WDF文件！")
             return
         file_path = filedialog.asksaveasfilename(defaultextension='.lst', filetypes=[('LST文件', '*.lst')])
@@ -218,7 +212,7 @@ class UnpackerUI:
             return
         try:
             with open(file_path, 'w', encoding='utf-8') as f:
-                for name in self.parsed_names:
+                for name, _ in model.iter_rows(visible_only=False):
                     f.write(name + '\n')
             messagebox.showinfo("导出成功", f"已导出到: {file_path}")
         except Exception as e:
@@ -285,35 +279,25 @@ def wdf_unpack_python(wdf_path, lst_lines, log_func, progress_func):
     wdf_dir = os.path.dirname(os.path.abspath(wdf_path))
     wdf_name = os.path.splitext(os.path.basename(wdf_path))[0]
     base_dir = os.path.join(wdf_dir, wdf_name)
-    with open(wdf_path, 'rb') as f:
-        header = f.read(12)
-        if len(header) < 12 or header[:4] != b'WDFP':
+    from wdf_archive import WdfArchive
+    from core_unipacker import wdf_string_id_batch
+    try:
+        archive = WdfArchive(wdf_path)
+    except ValueError:
+        log_func("不是有效的WDF文件！")
+        return
+    with archive:
+        if archive.magic != b'WDFP':
             log_func("不是有效的WDF文件！")
             return
-        file_count = struct.unpack('<i', header[4:8])[0]
-        index_offset = struct.unpack('<I', header[8:12])[0]
-        f.seek(index_offset)
-        index_data = f.read(file_count * 32)
-        file_table = []
-        for i in range(file_count):
-            entry = index_data[i*32:(i+1)*32]
-            uid = struct.unpack('<I', entry[:4])[0]
-            offset = struct.unpack('<I', entry[4:8])[0]
-            size = struct.unpack('<I', entry[8:12])[0]
-            space = struct.unpack('<I', entry[12:16])[0]
-            name = entry[16:32].split(b'\x00')[0].decode('utf-8', errors='ignore')
-            file_table.append({'uid': uid, 'offset': offset, 'size': size, 'space': space, 'name': name})
-        uid_map = {e['uid']: e for e in file_table}
-        for idx, path in enumerate(lst_lines, 1):
-            uid = wdf_string_id(path)
-            entry = uid_map.get(uid)
-            if entry:
+        uids = wdf_string_id_batch(lst_lines).tolist()
+        rows = archive.lookup(uids).tolist()
+        for idx, (path, row) in enumerate(zip(lst_lines, rows), 1):
+            if row >= 0:
                 try:
-                    f.seek(entry['offset'])
-                    data = f.read(entry['size'])
                     out_path = os.path.join(base_dir, path.replace('/', os.sep))
                     os.makedirs(os.path.dirname(out_path), exist_ok=True)
-                    with open(out_path, 'wb') as fout:
+                    with archive.payload(row) as data, open(out_path, 'wb') as fout:
                         fout.write(data)
                     log_func(f"解包: {path} -> {out_path}")
                 except Exception as e:
@@ -0,0 +1,180 @@
+import os
+import re
+import sys
+import time
+import struct
+import argparse
+import concurrent.futures
+import xml.etree.ElementTree as ET
+
+# 共用 Hashtools 目录下的 WDF 相关模块
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Hashtools'))
+from wdf_vfs import WdfNamespace, list_archives
+from wdf_extract import iter_planned, open_sink, is_archive_target, format_stats, DEFAULT_GAP, DEFAULT_MAX_READ
+from packedxml_reader import PackedXmlReader, decode_packedxml_fast
+
+# 需要读取并解析引用的资源类型，其余（.dds/.primitives 等）只作为叶子导出
+PARSE_EXTS = ('.model', '.visual', '.mfm')
+# 文本中带后缀的资源引用
+REF_EXTS = ('dds', 'tga', 'bmp', 'png', 'jpg', 'texanim', 'visual', 'primitives', 'model', 'mfm', 'fx', 'fxo', 'animation')
+REF_PATTERN = re.compile(r'[\w\-./\\]+\.(?:' + '|'.join(REF_EXTS) + r')\b', re.IGNORECASE)
+# 不带后缀的引用：标签名 → 补上的后缀（.model 中的视觉体和父模型）
+TAG_SUFFIXES = {
+    'nodefullvisual': '.visual',
+    'nodelessvisual': '.visual',
+    'billboardvisual': '.visual',
+    'parent': '.model',
+}
+# .visual 的几何数据与其同名的 .primitives
+SIBLINGS = {'.visual': ('.primitives',)}
+PACKED_MAGIC = struct.pack('<I', PackedXmlReader.Packed_Header)
+
+def norm_ref(path):
+    return path.strip().replace('\\', '/').lstrip('/')
+
+def decode_text(data):
+    """packed XML 先解码为文本，其余按 UTF-8 文本处理"""
+    if data[:4] == PACKED_MAGIC:
+        return decode_packedxml_fast(data)
+    return bytes(data).decode('utf-8', errors='ignore')
+
+def parse_refs(path, data):
+    """
+    从一个资源中解析出引用的资源路径（去重，保持出现顺序）。
+    不带目录的引用（如 .visual 中的 hero.primitives/vertices）相对于该资源所在目录。
+    返回 (引用列表, 推测的同名资源列表)，后者不存在时不算缺失。
+    """
+    refs = []
+    text = decode_text(data)
+    try:
+        for element in ET.fromstring(text).iter():
+            value = (element.text or '').strip()
+            suffix = TAG_SUFFIXES.get(element.tag.lower())
+            if suffix and value and not value.lower().endswith(suffix):
+                refs.append(value + suffix)
+    except (ET.ParseError, ValueError):
+        pass
+    refs.extend(m.group(0) for m in REF_PATTERN.finditer(text))
+    stem, ext = os.path.splitext(path)
+    siblings = [norm_ref(stem + sibling) for sibling in SIBLINGS.get(ext.lower(), ())]
+    directory = norm_ref(path).rpartition('/')[0]
+    refs = [norm_ref(r) for r in refs if r.strip()]
+    refs = [f'{directory}/{r}' if directory and '/' not in r else r for r in refs]
+    return list(dict.fromkeys(refs)), siblings
+
+def read_group(archive_path, items, gap, max_read):
+    """按偏移合并读取一个包中的一批资源，返回 [(item, bytes)]"""
+    result = []
+    with open(archive_path, 'rb', buffering=0) as f:
+        for item, chunks in iter_planned(f, items, gap, max_read):
+            result.append((item, b''.join(bytes(c) for c in chunks)))
+    return result
+
+def resolve_closure(ns, roots, max_depth=None, workers=4, gap=DEFAULT_GAP, max_read=DEFAULT_MAX_READ, log_func=print):
+    """
+    从根路径出发按层（广度优先）求引用闭包：每层一次批量哈希查找，
+    需要解析的资源按包分组、按偏移合并读取，各包并行预读，读完一组就解析一组。
+    返回 (闭包路径列表, 未找到的路径列表, 解析的资源数)。
+    """
+    seen = set()
+    optional = set()
+    closure = []
+    missing = []
+    parsed = 0
+    level = list(dict.fromkeys(norm_ref(r) for r in roots if r.strip()))
+    depth = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        while level and (max_depth is None or depth <= max_depth):
+            to_parse = {}
+            for path, uid, archive_id, row in ns.resolve(level):
+                if uid in seen:
+                    continue
+                seen.add(uid)
+                if archive_id < 0:
+                    if path not in optional:
+                        missing.append(path)
+                    continue
+                closure.append(path)
+                if os.path.splitext(path)[1].lower() in PARSE_EXTS:
+                    archive = ns.archives[archive_id]
+                    entry = archive.entries[row]
+                    to_parse.setdefault(archive.path, []).append((None, int(entry['offset']), int(entry['size']), path, uid))
+            futures = [pool.submit(read_group, archive_path, items, gap, max_read)
+                       for archive_path, items in to_parse.items()]
+            next_level = []
+            for future in concurrent.futures.as_completed(futures):
+                for item, data in future.result():
+                    parsed += 1
+                    try:
+                        refs, siblings = parse_refs(item[3], data)
+                        next_level.extend(refs)
+                        next_level.extend(siblings)
+                        optional.update(siblings)
+                    except Exception as e:
+                        log_func(f"解析失败: {item[3]}，错误: {e}")
+            log_func(f"第 {depth} 层: 命中 {len(closure)} 个，解析 {parsed} 个，下一层 {len(next_level)} 个引用")
+            level = list(dict.fromkeys(next_level))
+            depth += 1
+    return closure, missing, parsed
+
+def extract_closure(wdf_path, roots, out, algo_name='wdf_string_id', case_sensitive=False, seed=None,
+                    max_depth=None, workers=4, gap=DEFAULT_GAP, max_read=DEFAULT_MAX_READ, log_func=print, lst_path=None):
+    """
+    只导出根路径的依赖闭包（如 .model → .visual → .primitives/.dds）。
+    wdf_path: .wdf 文件或目录（挂载其中全部包，后面的包覆盖前面的）。
+    out: 输出目录，或 .tar/.tar.gz/.tgz/.zip/'-'；为空时只求闭包不导出。
+    lst_path: 给出时把闭包路径写成lst。
+    返回 {closure, missing, parsed, seconds, stats}。
+    """
+    start_time = time.time()
+    paths = list_archives(wdf_path) if os.path.isdir(wdf_path) else [wdf_path]
+    with WdfNamespace(paths, True, algo_name, case_sensitive, seed) as ns:
+        closure, missing, parsed = resolve_closure(ns, roots, max_depth, workers, gap, max_read, log_func)
+        for path in missing:
+            log_func(f"未找到: {path}")
+        if lst_path:
+            with open(lst_path, 'w', encoding='utf-8') as f:
+                f.writelines(p + '\n' for p in closure)
+        stats = None
+        if out:
+            # 闭包中的资源按包分组、按偏移顺序一次导出
+            if is_archive_target(out):
+                with open_sink(out) as sink:
+                    stats = ns.extract(closure, '', gap, max_read, sink=sink)
+            else:
+                stats = ns.extract(closure, out, gap, max_read, workers=workers)
+            log_func(format_stats(stats))
+    seconds = time.time() - start_time
+    log_func(f"依赖闭包: {len(roots)} 个根，共 {len(closure)} 个资源，解析 {parsed} 个，未找到 {len(missing)} 个，"
+             f"用时 {seconds:.2f} 秒")
+    return {'closure': closure, 'missing': missing, 'parsed': parsed, 'seconds': seconds, 'stats': stats}
+
+def main():
+    parser = argparse.ArgumentParser(description='按引用关系只导出根资源的依赖闭包（.model/.visual/.primitives/.dds）')
+    parser.add_argument('wdf', help='.wdf文件或目录')
+    parser.add_argument('roots', nargs='+', help='根资源路径，或 @文件（每行一个路径）')
+    parser.add_argument('-o', '--out', help='输出目录或 .tar/.zip/-，省略时只列出闭包')
+    parser.add_argument('--lst', help='把闭包路径写成lst')
+    parser.add_argument('--algo', default='wdf_string_id')
+    parser.add_argument('--case-sensitive', action='store_true')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--max-depth', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+    roots = []
+    for r in args.roots:
+        if r.startswith('@'):
+            with open(r[1:], 'r', encoding='utf-8') as f:
+                roots.extend(line.strip() for line in f if line.strip())
+        else:
+            roots.append(r)
+    # 闭包列表或 tar 数据写标准输出时，日志改写到标准错误
+    log = (lambda msg: print(msg, file=sys.stderr)) if args.out in (None, '-') else print
+    report = extract_closure(args.wdf, roots, args.out, args.algo, args.case_sensitive, args.seed,
+                             args.max_depth, args.workers, log_func=log, lst_path=args.lst)
+    if not args.out and not args.lst:
+        for path in report['closure']:
+            print(path)
+
+if __name__ == '__main__':
+    main()
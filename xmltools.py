@@ -157,9 +157,9 @@ class XMLDecoderApp:
                         self.decode_queue.put(('log', f"文件头检测失败（非PackedXml格式）: {file}"))
                 else:
                     self.decode_queue.put(('log', f"文件过短，无法检测文件头: {file}"))
-                # 优先用严格对标C#源码的PackedXml解码
+                # 优先用严格对标C#源码的PackedXml解码（单遍解码，输出与严格解码器相同）
                 try:
-                    xml_str = packedxml_reader.decode_packedxml_strict(raw, root_name='resources')
+                    xml_str = packedxml_reader.decode_packedxml_fast(raw, root_name='resources')
                     # 格式化美化输出
                     try:
                         pretty_xml = xml.dom.minidom.parseString(xml_str).toprettyxml(indent='  ', encoding='utf-8').decode('utf-8')
@@ -277,7 +277,7 @@ class XMLDecoderApp:
                     # 恢复为：只有文件头为PackedXml才尝试解码
                     if len(raw) >= 4 and int.from_bytes(raw[:4], byteorder='little') == 0x62A14E45:
                         try:
-                            xml_str = packedxml_reader.decode_packedxml_strict(raw, root_name='resources')
+                            xml_str = packedxml_reader.decode_packedxml_fast(raw, root_name='resources')
                             pretty_xml = xml.dom.minidom.parseString(xml_str).toprettyxml(indent='  ', encoding='utf-8').decode('utf-8')
                             pretty_xml = self.remove_xml_declaration(pretty_xml)
                             with open(file, 'w', encoding='utf-8') as fw: